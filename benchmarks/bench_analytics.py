@@ -0,0 +1,76 @@
+"""Analytics store benchmark: synthetic profits, vectorized queries, memory footprint.
+
+Run from the repo root (needs numpy):
+    python -m benchmarks.bench_analytics --rows 1000000 --workers 2000
+
+Fills a ProfitsStore with random profits spread over the last 90 days and
+times the queries the stats screens ask for.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from utils.analytics_store import ProfitsStore, BYTES_PER_ROW
+
+
+def timed(func: Callable[[], object], repeat: int) -> float:
+    """Microseconds per call."""
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def fill(store: ProfitsStore, rows: int, workers: int, batch: int = 10000) -> float:
+    """Append synthetic profits in batches. Returns seconds taken."""
+    services = ["Avito", "Youla", "OLX", "Kufar", "Vinted", "Wallapop"]
+    now = datetime.now(timezone.utc)
+    rnd = random.Random(42)
+    started = time.perf_counter()
+    for first in range(1, rows + 1, batch):
+        store.append([
+            {
+                "id": i,
+                "worker_id": rnd.randint(1, workers),
+                "service_name": rnd.choice(services),
+                "amount": (amount := rnd.uniform(1000, 50000)),
+                "net_profit": amount * 0.7,
+                "created_at": now - timedelta(seconds=rnd.randint(0, 90 * 86400)),
+                "status": "paid" if rnd.random() < 0.8 else "hold",
+            }
+            for i in range(first, min(first + batch, rows + 1))
+        ])
+    return time.perf_counter() - started
+
+
+def main(args: argparse.Namespace) -> None:
+    store = ProfitsStore()
+    load = fill(store, args.rows, args.workers)
+    print(f"\n{len(store)} profits, {args.workers} workers, loaded in {load:.1f}s")
+    print(f"memory: {store.memory_bytes() / 1024 / 1024:.1f} MB allocated, "
+          f"{len(store) * BYTES_PER_ROW / 1024 / 1024:.1f} MB used ({BYTES_PER_ROW} B/row)\n")
+
+    queries = [
+        ("totals all", lambda: store.totals("all")),
+        ("totals day", lambda: store.totals("day")),
+        ("totals worker week", lambda: store.totals("week", worker_id=7)),
+        ("top 10 all", lambda: store.top_workers("all", 10)),
+        ("top 10 month", lambda: store.top_workers("month", 10)),
+        ("by service all", lambda: store.by_service("all")),
+        ("by service worker", lambda: store.by_service("all", worker_id=7)),
+        ("unpaid worker", lambda: store.unpaid(7)),
+    ]
+    print(f"{'query':22} {'ms':>8}")
+    for name, func in queries:
+        print(f"{name:22} {timed(func, args.repeat) / 1000:8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,62 @@
+"""Keyboard building microbenchmark: fresh build vs static / memoized markup.
+
+Run from the repo root:
+    python -m benchmarks.bench_keyboards --calls 20000
+
+Measures the main-menu path (main menu inline keyboard + static reply keyboard)
+and a few other hot keyboards: CPU time per call and memory allocated per call
+(tracemalloc).
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from keyboards.user_kb import get_main_menu_keyboard, get_main_static_keyboard, get_profit_history_keyboard
+from keyboards.admin_kb import get_admin_menu_keyboard
+from keyboards.registration import get_agreement_keyboard
+
+
+def measure(func: Callable[[], object], calls: int) -> Tuple[float, float]:
+    """Returns (microseconds per call, bytes allocated per call)."""
+    func()  # warm up (first cached call builds the markup)
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    cpu = (time.perf_counter() - started) / calls * 1e6
+
+    sample = max(1, calls // 10)
+    keep = [None] * sample  # results stay alive so their allocations are counted
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(sample):
+        keep[i] = func()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    return cpu, max(0.0, allocated / sample)
+
+
+def main(args: argparse.Namespace) -> None:
+    scenarios = [
+        ("main menu (inline + reply)", lambda: (get_main_menu_keyboard(0, True, False), get_main_static_keyboard()),
+         lambda: (get_main_menu_keyboard.__wrapped__(0, True, False), get_main_static_keyboard.__wrapped__())),
+        ("admin menu", get_admin_menu_keyboard, get_admin_menu_keyboard.__wrapped__),
+        ("agreement", get_agreement_keyboard, get_agreement_keyboard.__wrapped__),
+        ("profit history page 3/10", lambda: get_profit_history_keyboard(2, 10),
+         lambda: get_profit_history_keyboard.__wrapped__(2, 10)),
+    ]
+
+    print(f"\n{args.calls} calls per scenario\n")
+    print(f"{'scenario':30} {'build us':>10} {'cached us':>10} {'speedup':>8} {'build B':>9} {'cached B':>9}")
+    for name, cached, fresh in scenarios:
+        build_cpu, build_mem = measure(fresh, args.calls)
+        cached_cpu, cached_mem = measure(cached, args.calls)
+        print(f"{name:30} {build_cpu:10.2f} {cached_cpu:10.2f} {build_cpu / cached_cpu:7.0f}x "
+              f"{build_mem:9.0f} {cached_mem:9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    main(parser.parse_args())
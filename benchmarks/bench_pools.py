@@ -0,0 +1,159 @@
+"""Connection pool benchmark against a local stub of Bot API + PostgREST.
+
+Run from the repo root:
+    python -m benchmarks.bench_pools --messages 2000 --latency 20
+
+Broadcast: N sendMessage calls through W concurrent workers, for several
+bot session configurations.
+Menu: M sequential "menu renders" (3 PostgREST reads + 1 editMessageText),
+for a PostgREST client without keep-alive and for the tuned pool.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from utils.http_pools import TunedAiohttpSession, create_db_http_client, db_stats
+
+TOKEN = "123456:BENCHMARK"
+
+
+# ============================================
+# STUB SERVER
+# ============================================
+
+def create_stub_app(latency: float) -> web.Application:
+    message_id = 0
+
+    async def bot_method(request: web.Request) -> web.Response:
+        nonlocal message_id
+        await asyncio.sleep(latency)
+        message_id += 1
+        return web.json_response({"ok": True, "result": {
+            "message_id": message_id, "date": int(time.time()),
+            "chat": {"id": 1, "type": "private"}, "text": "ok"
+        }})
+
+    async def postgrest(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response([{"id": 1, "status": "active"}])
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", bot_method)
+    app.router.add_get("/rest/v1/{table}", postgrest)
+    return app
+
+
+def start_stub(latency: float, port: int) -> asyncio.AbstractEventLoop:
+    """Run the stub in its own thread: sync PostgREST calls block the bench loop."""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    async def serve():
+        runner = web.AppRunner(create_stub_app(latency), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        ready.set()
+
+    def run():
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return loop
+
+
+# ============================================
+# SCENARIOS
+# ============================================
+
+async def bench_broadcast(session: AiohttpSession, messages: int, workers: int) -> float:
+    bot = Bot(TOKEN, session=session)
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(messages):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            await bot.send_message(1, "benchmark")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+    await session.close()
+    return messages / elapsed
+
+
+def _db_client(base_url: str, keepalive: bool) -> httpx.Client:
+    if keepalive:
+        return create_db_http_client(base_url, {}, http2=False)
+    return httpx.Client(base_url=base_url, limits=httpx.Limits(max_keepalive_connections=0))
+
+
+async def bench_menu(session: AiohttpSession, db: httpx.Client, renders: int) -> float:
+    bot = Bot(TOKEN, session=session)
+    started = time.perf_counter()
+    for _ in range(renders):
+        for table in ("users", "profits", "settings"):
+            db.get(f"/rest/v1/{table}")  # sync, like supabase-py inside handlers
+        await bot.edit_message_text("menu", chat_id=1, message_id=1)
+    elapsed = time.perf_counter() - started
+    await session.close()
+    db.close()
+    return renders / elapsed
+
+
+def stub_session(port: int, cls=AiohttpSession, **kwargs: Any) -> AiohttpSession:
+    return cls(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}"), **kwargs)
+
+
+async def main(args: argparse.Namespace) -> None:
+    stub_loop = start_stub(args.latency / 1000, args.port)
+    results: List[Tuple[str, float, Dict[str, Any]]] = []
+    try:
+        variants = [
+            ("aiogram default (limit=100)", lambda: stub_session(args.port)),
+            ("tuned pool=10", lambda: stub_session(args.port, TunedAiohttpSession, limit=10)),
+            ("tuned pool=50", lambda: stub_session(args.port, TunedAiohttpSession, limit=50)),
+            ("tuned pool=100", lambda: stub_session(args.port, TunedAiohttpSession, limit=100)),
+        ]
+        for name, factory in variants:
+            session = factory()
+            rate = await bench_broadcast(session, args.messages, args.workers)
+            stats = session.pool_stats() if isinstance(session, TunedAiohttpSession) else {}
+            results.append((f"broadcast / {name}", rate, stats))
+
+        base_url = f"http://127.0.0.1:{args.port}"
+        for name, keepalive in (("no keep-alive", False), ("tuned pool", True)):
+            db_stats.__init__("postgrest")
+            session = stub_session(args.port, TunedAiohttpSession)
+            rate = await bench_menu(session, _db_client(base_url, keepalive), args.renders)
+            stats = db_stats.snapshot() if keepalive else {}
+            results.append((f"menu / postgrest {name}", rate, stats))
+    finally:
+        stub_loop.call_soon_threadsafe(stub_loop.stop)
+
+    print(f"\nstub latency {args.latency} ms, {args.messages} messages x {args.workers} workers, {args.renders} menu renders\n")
+    print(f"{'scenario':45} {'ops/s':>10}  pool")
+    for name, rate, stats in results:
+        pool = ", ".join(f"{k}={stats[k]}" for k in ("new_connections", "queued", "avg_wait_ms", "max_wait_ms") if k in stats)
+        print(f"{name:45} {rate:10.1f}  {pool}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--renders", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=20, help="stub response latency, ms")
+    parser.add_argument("--port", type=int, default=18181)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,260 @@
+"""End-to-end load test: the real dispatcher against fake Telegram and Supabase.
+
+Run from the repo root:
+    python -m benchmarks.loadtest --users 2000 --sessions 200 --db-latency 15 --tg-latency 40
+
+Builds the Dispatcher from main.create_dispatcher() (all routers and
+middlewares, FSM in the fsm_states table) and a bot whose session talks
+to a local Bot API fake, with the Supabase client pointed at an in-memory
+PostgREST fake. The outbox, broadcast engine, leaderboard and auto-delete
+loops run as in main.py. Each scenario feeds its sessions concurrently
+(--concurrency updates in flight) and waits for the background work it
+caused (outbox notifications, broadcast jobs) before the counters are read.
+
+Per scenario: updates/s, update latency percentiles, DB round trips and
+Telegram calls per update (counted at the fakes, background work
+included), and the busiest tables/RPCs and Bot API methods. Then the
+latency percentiles of every handler that ran.
+
+A user's steps are spaced by at least --think seconds, otherwise
+ThrottlingMiddleware would drop them.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import config
+
+TOKEN = "123456:BENCHMARK"
+FAKE_JWT = "bench.fake.key"  # create_client проверяет только формат JWT
+
+
+class HandlerTimer:
+    """Inner middleware: wall time of every handler call, by handler name."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.calls = 0
+
+    async def __call__(self, handler: Callable[..., Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        self.calls += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.samples[data["handler"].callback.__name__].append(time.perf_counter() - started)
+
+
+class ErrorCounter(logging.Handler):
+    """Counts ERROR records (handler exceptions end up in the dispatcher's error log)."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+        self.last = ""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+        self.last = record.getMessage()[:120]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    sessions: int
+    updates: int
+    handled: int          # Дошли до хендлера (остальные отброшены троттлингом / без хендлера)
+    seconds: float
+    drain_seconds: float  # Фоновая работа после последнего апдейта (outbox, рассылки)
+    latencies: List[float]
+    db_calls: Counter
+    tg_calls: Counter
+    errors: int
+
+
+def percentiles(values: List[float], *qs: float) -> List[float]:
+    """Nearest-rank percentiles in milliseconds."""
+    if not values:
+        return [0.0 for _ in qs]
+    ordered = sorted(values)
+    return [ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 for q in qs]
+
+
+# ============================================
+# RUNNER
+# ============================================
+
+async def feed_sessions(dp, bot, sessions, concurrency: int, think: float) -> Tuple[List[float], float]:
+    """Feed sessions (steps of one user in order, users in parallel). Returns (update latencies, seconds)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    by_user: Dict[int, list] = defaultdict(list)
+    for session in sessions:
+        by_user[session.user_id].append(session)
+
+    async def run_user(user_sessions) -> None:
+        last = float("-inf")
+        for session in user_sessions:
+            for step in session.steps:
+                delay = last + think - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                async with semaphore:
+                    started = time.perf_counter()
+                    await dp.feed_raw_update(bot, step)
+                    latencies.append(time.perf_counter() - started)
+                # Пауза от ответа бота, как у живого пользователя
+                last = time.monotonic()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_user(s) for s in by_user.values()))
+    return latencies, time.perf_counter() - started
+
+
+async def drain_background(db, timeout: float) -> None:
+    """Wait for queued notifications and broadcast jobs to finish."""
+    from utils.broadcast_engine import broadcast_engine
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        outbox_busy = any(o["status"] in ("pending", "sending") for o in list(db.tables["notification_outbox"]))
+        if not outbox_busy and not broadcast_engine.active_jobs:
+            return
+        await asyncio.sleep(0.05)
+    logging.getLogger(__name__).warning("Background work still running after %.0fs", timeout)
+
+
+async def main(args: argparse.Namespace) -> None:
+    from benchmarks.loadtest.fake_postgrest import FakeDatabase, start_postgrest
+    from benchmarks.loadtest.fake_telegram import FakeTelegram, start_telegram
+    from benchmarks.loadtest.scenarios import SCENARIOS, ADMIN_ID_BASE, seed
+
+    rnd = random.Random(args.seed)
+    admins = [ADMIN_ID_BASE + i for i in range(1, args.admins + 1)]
+    config.ADMIN_IDS.extend(admins)  # Модули импортируют сам список
+    config.SUPABASE_URL = f"http://127.0.0.1:{args.db_port}"
+    config.SUPABASE_KEY = FAKE_JWT
+    config.FSM_STORAGE = args.fsm
+
+    db = FakeDatabase()
+    world = seed(db, args.users, args.profits, admins, rnd)
+    stop_postgrest = start_postgrest(db, args.db_port, args.db_latency / 1000, args.db_jitter / 1000)
+    telegram = FakeTelegram(args.tg_latency / 1000, args.tg_jitter / 1000)
+    stop_telegram = start_telegram(telegram, args.tg_port)
+
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.enums import ParseMode
+    from main import create_dispatcher
+    from utils.http_pools import create_bot_session
+    from utils.rate_limiter import telegram_limiter
+    from utils.outbox import init_outbox, start_outbox, stop_outbox
+    from utils.broadcast_engine import init_broadcast_engine, stop_broadcast_engine
+    from utils.leaderboard import start_leaderboard, stop_leaderboard
+    from utils.auto_delete import auto_delete_scheduler, init_auto_delete, start_auto_delete, stop_auto_delete
+    from utils.media import preload_media
+
+    logging.getLogger().setLevel(args.log_level)
+    # Бот обрывает загрузку отсутствующей картинки - это видно в счётчиках, не ошибка фейка
+    logging.getLogger("aiohttp.server").setLevel(logging.CRITICAL)
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+
+    telegram_limiter.rate = telegram_limiter.capacity = args.send_rate
+    auto_delete_scheduler.store_path = f"{tempfile.mkdtemp(prefix='loadtest')}/auto_delete.sqlite3"
+
+    session = create_bot_session(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{args.tg_port}"))
+    bot = Bot(TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML), session=session)
+    init_outbox(bot)
+    init_broadcast_engine(bot)
+    init_auto_delete(bot)
+
+    dp = create_dispatcher()
+    timer = HandlerTimer()
+    dp.message.middleware(timer)
+    dp.callback_query.middleware(timer)
+
+    tasks = [asyncio.create_task(coro) for coro in (start_outbox(), start_leaderboard(), start_auto_delete())]
+    await preload_media(bot)
+
+    results: List[ScenarioResult] = []
+    try:
+        for name in args.scenarios:
+            sessions = SCENARIOS[name](world, args.broadcasts if name == "broadcast" else args.sessions)
+            db_before, tg_before, errors_before, calls_before = db.snapshot(), telegram.snapshot(), errors.count, timer.calls
+            latencies, elapsed = await feed_sessions(dp, bot, sessions, args.concurrency, args.think)
+            drain_started = time.perf_counter()
+            await drain_background(db, args.drain_timeout)
+            results.append(ScenarioResult(
+                name=name, sessions=len(sessions), updates=len(latencies), handled=timer.calls - calls_before,
+                seconds=elapsed, drain_seconds=time.perf_counter() - drain_started, latencies=latencies,
+                db_calls=db.snapshot() - db_before, tg_calls=telegram.snapshot() - tg_before,
+                errors=errors.count - errors_before,
+            ))
+    finally:
+        await stop_outbox()
+        stop_leaderboard()
+        stop_auto_delete()
+        await stop_broadcast_engine()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await dp.storage.close()
+        await bot.session.close()
+        stop_postgrest()
+        stop_telegram()
+
+    print(f"\n{args.users} users, {args.profits} profits, {args.sessions} sessions per scenario "
+          f"({args.broadcasts} broadcasts), "
+          f"concurrency {args.concurrency}, DB {args.db_latency}+{args.db_jitter} ms, "
+          f"Telegram {args.tg_latency}+{args.tg_jitter} ms, FSM {args.fsm}\n")
+    print(f"{'scenario':14} {'sessions':>8} {'updates':>8} {'handled':>8} {'upd/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'db/upd':>7} {'tg/upd':>7} {'drain s':>8} {'errors':>6}")
+    for r in results:
+        p50, p95, p99 = percentiles(r.latencies, 0.5, 0.95, 0.99)
+        print(f"{r.name:14} {r.sessions:8} {r.updates:8} {r.handled:8} {r.updates / r.seconds:8.1f} "
+              f"{p50:8.1f} {p95:8.1f} {p99:8.1f} {sum(r.db_calls.values()) / r.updates:7.2f} "
+              f"{sum(r.tg_calls.values()) / r.updates:7.2f} {r.drain_seconds:8.1f} {r.errors:6}")
+
+    for r in results:
+        print(f"\n{r.name}: DB " + ", ".join(f"{k} {v / r.updates:.2f}" for k, v in r.db_calls.most_common(args.top)))
+        print(f"{' ' * len(r.name)}  TG " + ", ".join(f"{k} {v / r.updates:.2f}" for k, v in r.tg_calls.most_common(args.top)))
+
+    print(f"\n{'handler':34} {'calls':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for handler, samples in sorted(timer.samples.items(), key=lambda item: -len(item[1])):
+        p50, p95, p99, top = percentiles(samples, 0.5, 0.95, 0.99, 1.0)
+        print(f"{handler:34} {len(samples):7} {p50:8.1f} {p95:8.1f} {p99:8.1f} {top:8.1f}")
+    if errors.count:
+        print(f"\n{errors.count} errors logged, last: {errors.last}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=["top", "menu", "registration", "profit", "broadcast"],
+                        choices=["top", "menu", "registration", "profit", "broadcast"])
+    parser.add_argument("--users", type=int, default=2000, help="seeded active workers (also the broadcast audience)")
+    parser.add_argument("--profits", type=int, default=20000, help="seeded profits")
+    parser.add_argument("--sessions", type=int, default=200, help="user sessions per scenario")
+    parser.add_argument("--broadcasts", type=int, default=2, help="broadcast sessions (each one messages every user)")
+    parser.add_argument("--admins", type=int, default=20, help="synthetic admins (profit / broadcast sessions per admin run in turn)")
+    parser.add_argument("--concurrency", type=int, default=100, help="updates in flight")
+    parser.add_argument("--think", type=float, default=0.55, help="min seconds between one user's updates (throttling)")
+    parser.add_argument("--db-latency", type=float, default=10, help="PostgREST round trip, ms")
+    parser.add_argument("--db-jitter", type=float, default=5, help="extra random PostgREST delay, ms")
+    parser.add_argument("--tg-latency", type=float, default=40, help="Bot API round trip, ms")
+    parser.add_argument("--tg-jitter", type=float, default=20, help="extra random Bot API delay, ms")
+    parser.add_argument("--send-rate", type=float, default=config.BROADCAST_RATE_LIMIT, help="bulk send limit, msg/s")
+    parser.add_argument("--fsm", default="supabase", choices=["supabase", "memory"])
+    parser.add_argument("--drain-timeout", type=float, default=300, help="max wait for outbox / broadcasts, s")
+    parser.add_argument("--top", type=int, default=6, help="busiest tables / methods to list per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db-port", type=int, default=18281)
+    parser.add_argument("--tg-port", type=int, default=18282)
+    parser.add_argument("--log-level", default="WARNING")
+    asyncio.run(main(parser.parse_args()))
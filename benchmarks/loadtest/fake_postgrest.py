@@ -0,0 +1,560 @@
+"""In-memory PostgREST stand-in for the load test.
+
+Speaks the subset of the PostgREST protocol postgrest-py sends for this
+bot: filtered selects with order/limit/offset and exact counts, inserts,
+upserts (merge / ignore duplicates), PATCH, DELETE and /rpc calls. RPCs
+are small Python versions of the SQL functions the handlers depend on,
+computed over the in-memory tables; unknown RPCs answer [] and are
+counted so missing fakes are visible in the report.
+
+Every request waits `latency` (+ random jitter) before answering, like a
+round trip to a real Supabase instance. Runs in its own thread: the
+supabase client is synchronous and blocks the bot's event loop.
+"""
+import asyncio
+import json
+import random
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+# Первичные ключи (для upsert без on_conflict); по умолчанию "id"
+PRIMARY_KEYS: Dict[str, Tuple[str, ...]] = {
+    "bot_settings": ("key",),
+    "fsm_states": ("key",),
+    "processed_updates": ("key",),
+    "broadcast_job_recipients": ("job_id", "user_id"),
+    "profit_sketches": ("scope", "scope_key"),
+    "mentor_stats": ("mentor_user_id",),
+}
+
+# Значения по умолчанию колонок (DEFAULT в схеме)
+DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "users": {"status": "pending", "referral_earnings": 0, "mentor_id": None, "referrer_id": None, "is_deliverable": True},
+    "fsm_states": {"state": None, "data": {}},
+    "profits": {"status": "hold"},
+    "referral_profits": {"status": "hold"},
+    "mentor_profits": {"status": "hold"},
+    "notifications": {"is_read": False},
+    "notification_outbox": {"status": "pending", "attempts": 0, "parse_mode": "HTML", "disable_preview": True},
+    "broadcast_jobs": {"status": "pending", "cursor": 0, "total_count": 0, "sent_count": 0,
+                       "blocked_count": 0, "failed_count": 0, "button_type": "url", "progress_is_photo": False},
+}
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+}
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _coerce(raw: str, sample: Any) -> Any:
+    """Filter value from the query string, typed like the column value (postgrest-py sends str(value))."""
+    if raw in ("null", "None"):
+        return None
+    if isinstance(sample, bool):
+        return raw.lower() == "true"
+    if isinstance(sample, (int, float)):
+        try:
+            return type(sample)(float(raw)) if isinstance(sample, float) else int(raw)
+        except ValueError:
+            return raw
+    return raw.strip('"')
+
+
+def _split_list(raw: str) -> List[str]:
+    """in.(a,b,"c,d") -> ['a', 'b', 'c,d']"""
+    items, current, quoted = [], "", False
+    for ch in raw.strip("()"):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == "," and not quoted:
+            items.append(current)
+            current = ""
+        else:
+            current += ch
+    if current:
+        items.append(current)
+    return items
+
+
+def _matches(row: Dict[str, Any], column: str, expression: str) -> bool:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+    value = row.get(column)
+    if op == "in":
+        result = value in [_coerce(v, value) for v in _split_list(raw)]
+    elif op == "is":
+        result = value is None if raw in ("null", "None") else value == (raw.lower() == "true")
+    elif op in ("like", "ilike"):
+        pattern = raw.replace("*", "%")
+        text = "" if value is None else str(value)
+        if op == "ilike":
+            pattern, text = pattern.lower(), text.lower()
+        if pattern.startswith("%") and pattern.endswith("%") and len(pattern) > 1:
+            result = pattern.strip("%") in text
+        elif pattern.startswith("%"):
+            result = text.endswith(pattern[1:])
+        elif pattern.endswith("%"):
+            result = text.startswith(pattern[:-1])
+        else:
+            result = text == pattern
+    elif op in OPERATORS:
+        result = OPERATORS[op](value, _coerce(raw, value))
+    else:
+        raise ValueError(f"unsupported operator {op}")
+    return not result if negate else result
+
+
+def _project(row: Dict[str, Any], select: Optional[str]) -> Dict[str, Any]:
+    """Column list from ?select=; embeds (alias:fk(cols)) are not resolved."""
+    if not select or select.strip() == "*":
+        return dict(row)
+    result: Dict[str, Any] = {}
+    depth, current, columns = 0, "", []
+    for ch in select:
+        depth += ch == "("
+        depth -= ch == ")"
+        if ch == "," and depth == 0:
+            columns.append(current.strip())
+            current = ""
+        else:
+            current += ch
+    columns.append(current.strip())
+    for column in columns:
+        if column == "*":
+            result.update(row)
+        elif "(" in column:
+            alias = column.split("(")[0].split(":")[0]
+            result[alias] = None
+        else:
+            result[column] = row.get(column)
+    return result
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    return (value is None, value if value is not None else 0)
+
+
+# ============================================
+# DATABASE
+# ============================================
+
+class FakeDatabase:
+    """Tables (lists of dicts), id sequences, RPC implementations and call counters."""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.sequences: Counter = Counter()
+        self.versions: Counter = Counter()  # Счётчик изменений таблицы (сброс кэшей RPC)
+        self._memo: Dict[Tuple[Any, ...], Tuple[int, Any]] = {}
+        self.calls: Counter = Counter()
+        self.lock = threading.Lock()
+        self.rpcs: Dict[str, Callable[..., Any]] = {
+            name[4:]: getattr(self, name) for name in dir(self) if name.startswith("rpc_")
+        }
+
+    # ---------- counters ----------
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.calls[name] += 1
+
+    def snapshot(self) -> Counter:
+        with self.lock:
+            return Counter(self.calls)
+
+    # ---------- rows ----------
+
+    def touch(self, table: str) -> None:
+        self.versions[table] += 1
+
+    def _memoized(self, key: Tuple[Any, ...], table: str, build: Callable[[], Any]) -> Any:
+        """Value of build() cached until `table` changes (RPCs scan profits only once per write)."""
+        version, value = self._memo.get(key, (-1, None))
+        if version != self.versions[table]:
+            value = build()
+            self._memo[key] = (self.versions[table], value)
+        return value
+
+    def insert(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        full = {**DEFAULTS.get(table, {}), **row}
+        if PRIMARY_KEYS.get(table) is None and full.get("id") is None:
+            self.sequences[table] += 1
+            full["id"] = self.sequences[table]
+        elif isinstance(full.get("id"), int):
+            self.sequences[table] = max(self.sequences[table], full["id"])
+        full.setdefault("created_at", now_iso())
+        self.tables[table].append(full)
+        self.touch(table)
+        return full
+
+    def upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: Optional[str],
+               ignore_duplicates: bool) -> List[Dict[str, Any]]:
+        keys = tuple(on_conflict.split(",")) if on_conflict else PRIMARY_KEYS.get(table, ("id",))
+        index = {tuple(r.get(k) for k in keys): r for r in self.tables[table]}
+        written = []
+        for row in rows:
+            existing = index.get(tuple(row.get(k) for k in keys))
+            if existing is None:
+                new = self.insert(table, row)
+                index[tuple(new.get(k) for k in keys)] = new
+                written.append(new)
+            elif not ignore_duplicates:
+                existing.update(row)
+                written.append(existing)
+                self.touch(table)
+        return written
+
+    def select(self, table: str, filters: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        return [r for r in self.tables[table] if all(_matches(r, c, e) for c, e in filters)]
+
+    def users(self, **where: Any) -> List[Dict[str, Any]]:
+        return [u for u in self.tables["users"] if all(u.get(k) == v for k, v in where.items())]
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        index = self._memoized(("user_index",), "users", lambda: {u["id"]: u for u in self.tables["users"]})
+        return index.get(user_id, {})
+
+    def _active_users(self) -> int:
+        return self._memoized(("active_users",), "users", lambda: len(self.users(status="active")))
+
+    # ---------- RPC: FSM ----------
+
+    def rpc_write_fsm_state(self, p_key: str, p_state: Optional[str], p_data: Optional[Dict[str, Any]],
+                            p_set_state: bool, p_set_data: bool, p_ttl_seconds: int) -> None:
+        row = {"key": p_key, "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=p_ttl_seconds)).isoformat()}
+        if p_set_state:
+            row["state"] = p_state
+        if p_set_data:
+            row["data"] = p_data or {}
+        stored = self.upsert("fsm_states", [row], None, False)[0]
+        if stored.get("state") is None and not stored.get("data"):
+            self.tables["fsm_states"] = [r for r in self.tables["fsm_states"] if r["key"] != p_key]
+
+    # ---------- RPC: profits and rankings ----------
+
+    def _profits_since(self, period: str) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        starts = {
+            "day": now.replace(hour=0, minute=0, second=0, microsecond=0),
+            "week": now - timedelta(days=now.weekday()),
+            "month": now.replace(day=1, hour=0, minute=0, second=0, microsecond=0),
+        }
+        start = starts.get(period)
+        rows = self.tables["profits"]
+        if start is None:
+            return rows
+        start_iso = start.isoformat()
+        return [p for p in rows if p["created_at"] >= start_iso]
+
+    def _totals(self, period: str) -> Dict[int, List[float]]:
+        """worker_id -> [profit sum, count] for the period."""
+        def build() -> Dict[int, List[float]]:
+            totals: Dict[int, List[float]] = defaultdict(lambda: [0.0, 0])
+            for p in self._profits_since(period):
+                entry = totals[p["worker_id"]]
+                entry[0] += float(p["net_profit"])
+                entry[1] += 1
+            return totals
+        return self._memoized(("totals", period), "profits", build)
+
+    def _worker_profits(self, worker_id: int) -> List[Dict[str, Any]]:
+        def build() -> Dict[int, List[Dict[str, Any]]]:
+            index: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+            for p in self.tables["profits"]:
+                index[p["worker_id"]].append(p)
+            return index
+        return self._memoized(("by_worker",), "profits", build).get(worker_id, [])
+
+    def rpc_get_top_workers(self, p_period: str = "all", p_limit: int = 10) -> List[Dict[str, Any]]:
+        ranked = sorted(self._totals(p_period).items(), key=lambda item: -item[1][0])[:p_limit]
+        return [
+            {"user_id": uid, "full_name": self._user(uid).get("full_name"),
+             "username": self._user(uid).get("username"), "user_tag": self._user(uid).get("user_tag"),
+             "total_profit": round(total, 2), "profit_count": count}
+            for uid, (total, count) in ranked
+        ]
+
+    def rpc_get_user_stats(self, p_user_id: int) -> List[Dict[str, Any]]:
+        own = self._worker_profits(p_user_id)
+        values = [float(p["net_profit"]) for p in own]
+
+        def since(period: str) -> float:
+            return round(self._totals(period).get(p_user_id, [0.0, 0])[0], 2)
+
+        return [{
+            "total_count": len(values), "total_profit": round(sum(values), 2),
+            "avg_profit": round(sum(values) / len(values), 2) if values else 0,
+            "max_profit": max(values, default=0),
+            "month_profit": since("month"), "week_profit": since("week"), "day_profit": since("day"),
+        }]
+
+    def rpc_get_user_service_breakdown(self, p_user_id: int) -> List[Dict[str, Any]]:
+        totals: Counter = Counter()
+        for p in self._worker_profits(p_user_id):
+            totals[p["service_name"]] += float(p["net_profit"])
+        return [{"service_name": name, "service_profit": round(total, 2)} for name, total in totals.most_common()]
+
+    def rpc_get_user_position(self, p_user_id: int) -> List[Dict[str, Any]]:
+        result: Dict[str, Any] = {"user_tag": self._user(p_user_id).get("user_tag"), "total_users": self._active_users()}
+        for prefix, period in (("overall", "all"), ("monthly", "month")):
+            totals = self._totals(period)
+            mine = totals.get(p_user_id, [0.0, 0])[0]
+            result[f"{prefix}_rank"] = 1 + sum(1 for total, _ in totals.values() if total > mine)
+            result[f"{prefix}_profit"] = round(mine, 2)
+        totals = self._totals("all")
+        counts = sum(count for _, count in totals.values())
+        own = totals.get(p_user_id, [0.0, 0])
+        result["user_avg_profit"] = own[0] / own[1] if own[1] else 0
+        result["team_avg_profit"] = sum(total for total, _ in totals.values()) / counts if counts else 0
+        return [result]
+
+    def rpc_get_user_profit_statuses(self, p_user_id: int) -> List[Dict[str, Any]]:
+        groups: Dict[str, List[float]] = defaultdict(list)
+        for p in self._worker_profits(p_user_id):
+            groups[p["status"]].append(float(p["net_profit"]))
+        return [{"status": s, "profit_count": len(v), "profit_sum": round(sum(v), 2)} for s, v in groups.items()]
+
+    def rpc_get_dashboard_summary(self, p_top_limit: int = 5) -> Dict[str, Any]:
+        periods = {}
+        for period in ("all", "month", "week", "day"):
+            rows = self._profits_since(period)
+            periods[period] = {
+                "total_profit": round(sum(float(p["net_profit"]) for p in rows), 2),
+                "profits_count": len(rows),
+                "active_workers": len({p["worker_id"] for p in rows}),
+            }
+        return {
+            "active_users": self._active_users(), "periods": periods,
+            "top_workers": self.rpc_get_top_workers("all", p_top_limit), "generated_at": now_iso(),
+        }
+
+    def rpc_get_daily_profit_series(self, p_worker_id: Optional[int] = None, p_days: int = 42) -> List[Dict[str, Any]]:
+        start = (datetime.now(timezone.utc) - timedelta(days=p_days)).isoformat()
+        days: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+        for p in self.tables["profits"]:
+            if p["created_at"] >= start and p_worker_id in (None, p["worker_id"]):
+                entry = days[p["created_at"][:10]]
+                entry[0] += float(p["net_profit"])
+                entry[1] += 1
+        return [{"day": d, "profit_sum": round(s, 2), "profit_count": c} for d, (s, c) in sorted(days.items())]
+
+    def rpc_create_profit_with_outbox(self, p_worker_id: int, p_amount: float, p_net_profit: float,
+                                      p_service_name: str, p_idempotency_key: str,
+                                      p_notifications: Optional[List[Dict[str, Any]]] = None) -> int:
+        if self.select("profits", [("idempotency_key", f"eq.{p_idempotency_key}")]):
+            return 0
+        profit = self.insert("profits", {
+            "worker_id": p_worker_id, "amount": p_amount, "net_profit": p_net_profit,
+            "service_name": p_service_name, "idempotency_key": p_idempotency_key,
+        })
+        for n in p_notifications or []:
+            self.insert("notification_outbox", {
+                "kind": n["kind"], "chat_id": int(n["chat_id"]), "text": n["text"],
+                "disable_preview": n.get("disable_preview", True), "profit_id": profit["id"],
+                "dedup_key": f"profit:{profit['id']}:{n['kind']}:{n['chat_id']}", "next_attempt_at": now_iso(),
+            })
+        return profit["id"]
+
+    def rpc_claim_outbox(self, p_limit: int, p_lock_seconds: int) -> List[Dict[str, Any]]:
+        now = now_iso()
+        due = [o for o in self.tables["notification_outbox"]
+               if (o["status"] == "pending" and o.get("next_attempt_at", now) <= now)
+               or (o["status"] == "sending" and (o.get("locked_until") or now) < now)][:p_limit]
+        locked_until = (datetime.now(timezone.utc) + timedelta(seconds=p_lock_seconds)).isoformat()
+        for o in due:
+            o.update(status="sending", attempts=o["attempts"] + 1, locked_until=locked_until)
+        return [dict(o) for o in due]
+
+    # ---------- RPC: referrals and mentors ----------
+
+    def rpc_get_referral_tree_stats(self, p_user_id: int, p_max_depth: int = 3) -> List[Dict[str, Any]]:
+        levels, frontier = [], {p_user_id}
+        totals = self._totals("all")
+        for depth in range(1, p_max_depth + 1):
+            members = [u for u in self.tables["users"] if u.get("referrer_id") in frontier]
+            if not members:
+                break
+            levels.append({
+                "depth": depth, "members": len(members),
+                "active_members": sum(1 for u in members if u["status"] == "active"),
+                "profit_count": sum(totals.get(u["id"], [0, 0])[1] for u in members),
+                "profit_sum": round(sum(totals.get(u["id"], [0.0, 0])[0] for u in members), 2),
+            })
+            frontier = {u["id"] for u in members}
+        return levels
+
+    def rpc_get_referral_roster(self, p_referrer_id: int) -> List[Dict[str, Any]]:
+        totals = self._totals("all")
+        return [
+            {"id": u["id"], "username": u["username"], "full_name": u["full_name"], "user_tag": u.get("user_tag"),
+             "status": u["status"], "created_at": u["created_at"],
+             "profits_count": totals.get(u["id"], [0, 0])[1], "earned": 0}
+            for u in sorted(self.users(referrer_id=p_referrer_id), key=lambda u: u["created_at"], reverse=True)
+        ]
+
+    def rpc_is_user_mentor(self, user_id_param: int) -> bool:
+        return any(m["user_id"] == user_id_param and m.get("is_active", True) for m in self.tables["mentors"])
+
+    def rpc_refresh_mentor_stats(self, p_mentor_user_id: int) -> List[Dict[str, Any]]:
+        mentor_ids = {m["id"] for m in self.tables["mentors"] if m["user_id"] == p_mentor_user_id}
+        students = [u for u in self.tables["users"] if u.get("mentor_id") in mentor_ids]
+        earned = [mp for mp in self.tables["mentor_profits"] if mp["mentor_user_id"] == p_mentor_user_id]
+        row = {
+            "mentor_user_id": p_mentor_user_id, "students_count": len(students),
+            "active_students": sum(1 for u in students if u["status"] == "active"),
+            "active_checked_at": now_iso(),
+            "hold_earned": sum(float(mp["amount"]) for mp in earned if mp["status"] == "hold"),
+            "paid_earned": sum(float(mp["amount"]) for mp in earned if mp["status"] == "paid"),
+            "earned_count": len(earned), "month_earned": 0, "student_profit_sum": 0,
+            "student_profit_count": 0, "top_student_profit": 0, "updated_at": now_iso(),
+        }
+        return self.upsert("mentor_stats", [row], None, False)
+
+    def rpc_get_mentor_students_page(self, p_mentor_user_id: int, p_sort: str = "profit",
+                                     p_limit: int = 10, p_offset: int = 0) -> List[Dict[str, Any]]:
+        mentor_ids = {m["id"] for m in self.tables["mentors"] if m["user_id"] == p_mentor_user_id}
+        students = [u for u in self.tables["users"] if u.get("mentor_id") in mentor_ids]
+        totals = self._totals("all")
+        rows = [
+            {"student_id": u["id"], "username": u["username"], "full_name": u["full_name"],
+             "user_tag": u.get("user_tag"), "total_profit": totals.get(u["id"], [0.0, 0])[0],
+             "profit_count": totals.get(u["id"], [0, 0])[1], "total_count": len(students)}
+            for u in students
+        ]
+        rows.sort(key=lambda r: -r["total_profit"])
+        return rows[p_offset:p_offset + p_limit]
+
+
+# ============================================
+# HTTP
+# ============================================
+
+def _filters(request: web.Request) -> List[Tuple[str, str]]:
+    reserved = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+    return [(k, v) for k, v in request.query.items() if k not in reserved]
+
+
+def _respond(request: web.Request, rows: List[Dict[str, Any]], total: Optional[int] = None) -> web.Response:
+    prefer = request.headers.get("Prefer", "")
+    headers = {}
+    if "count=exact" in prefer:
+        end = max(len(rows) - 1, 0)
+        headers["Content-Range"] = f"0-{end}/{total if total is not None else len(rows)}"
+    if "return=minimal" in prefer:
+        return web.Response(status=204, headers=headers)
+    body: Any = rows
+    if "vnd.pgrst.object" in request.headers.get("Accept", ""):
+        if len(rows) != 1:
+            return web.json_response({"message": "JSON object requested, multiple (or no) rows returned",
+                                      "code": "PGRST116"}, status=406)
+        body = rows[0]
+    return web.json_response(body, headers=headers, dumps=lambda o: json.dumps(o, default=str))
+
+
+def create_postgrest_app(db: FakeDatabase, latency: float, jitter: float = 0.0) -> web.Application:
+    rnd = random.Random(7)
+
+    async def wait() -> None:
+        if latency or jitter:
+            await asyncio.sleep(latency + rnd.uniform(0, jitter))
+
+    async def table_handler(request: web.Request) -> web.Response:
+        table = request.match_info["table"]
+        db.count(f"{request.method} {table}")
+        await wait()
+        query = request.query
+        prefer = request.headers.get("Prefer", "")
+        try:
+            if request.method in ("GET", "HEAD"):
+                rows = db.select(table, _filters(request))
+                for part in reversed((query.get("order") or "").split(",")):
+                    if part:
+                        column, *modifiers = part.split(".")
+                        rows = sorted(rows, key=lambda r: _sort_key(r.get(column)), reverse="desc" in modifiers)
+                total = len(rows)
+                offset = int(query.get("offset", 0))
+                limit = int(query["limit"]) if "limit" in query else None
+                rows = rows[offset:offset + limit if limit is not None else None]
+                return _respond(request, [_project(r, query.get("select")) for r in rows], total)
+
+            if request.method == "POST":
+                body = await request.json()
+                rows = body if isinstance(body, list) else [body]
+                if "resolution=" in prefer:
+                    written = db.upsert(table, rows, query.get("on_conflict"), "ignore-duplicates" in prefer)
+                else:
+                    written = [db.insert(table, r) for r in rows]
+                return _respond(request, [dict(r) for r in written])
+
+            rows = db.select(table, _filters(request))
+            if request.method == "PATCH":
+                changes = await request.json()
+                for r in rows:
+                    r.update(changes)
+            else:
+                ids = {id(r) for r in rows}
+                db.tables[table] = [r for r in db.tables[table] if id(r) not in ids]
+            db.touch(table)
+            return _respond(request, [dict(r) for r in rows])
+        except (ValueError, KeyError) as e:
+            return web.json_response({"message": str(e), "code": "FAKE"}, status=400)
+
+    async def rpc_handler(request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        await wait()
+        body = await request.json() if request.can_read_body else {}
+        func = db.rpcs.get(name)
+        if func is None:
+            db.count(f"RPC {name} (no fake)")
+            return web.json_response([])
+        db.count(f"RPC {name}")
+        return web.json_response(func(**(body or {})), dumps=lambda o: json.dumps(o, default=str))
+
+    app = web.Application()
+    app.router.add_post("/rest/v1/rpc/{name}", rpc_handler)
+    app.router.add_route("*", "/rest/v1/{table}", table_handler)
+    return app
+
+
+def serve_in_thread(app_factory: Callable[[], web.Application], port: int, name: str) -> Callable[[], None]:
+    """Serve an app in a daemon thread with its own loop. Returns a function that shuts it down."""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    runner: Optional[web.AppRunner] = None
+
+    async def serve():
+        nonlocal runner
+        runner = web.AppRunner(app_factory(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        ready.set()
+
+    def run():
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(timeout=10)
+        loop.call_soon_threadsafe(loop.stop)
+
+    threading.Thread(target=run, daemon=True, name=name).start()
+    ready.wait()
+    return stop
+
+
+def start_postgrest(db: FakeDatabase, port: int, latency: float, jitter: float = 0.0) -> Callable[[], None]:
+    return serve_in_thread(lambda: create_postgrest_app(db, latency, jitter), port, "fake-postgrest")
@@ -0,0 +1,94 @@
+"""Local Bot API stand-in for the load test.
+
+Answers every /bot<token>/<method> call after `latency` seconds with a
+result of the right shape (Message for send*/edit*, True for the rest),
+echoing chat, text/caption and reply_markup so aiogram can parse it.
+Counts calls per method. Runs in its own thread so that parsing the
+calls does not count against the bot's event loop.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict
+
+from aiohttp import web
+
+from benchmarks.loadtest.fake_postgrest import serve_in_thread
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "LoadTest", "username": "loadtest_bot"}
+
+
+def _chat(chat_id: Any) -> Dict[str, Any]:
+    chat_id = int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0
+    return {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup", "title": None if chat_id > 0 else "Group"}
+
+
+class FakeTelegram:
+    """Bot API fake: per-method call counters and shaped results."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter = Counter()
+        self.lock = threading.Lock()
+        self.message_id = 1000
+        self._rnd = random.Random(11)
+
+    def snapshot(self) -> Counter:
+        with self.lock:
+            return Counter(self.calls)
+
+    def _message(self, method: str, form: Dict[str, Any]) -> Dict[str, Any]:
+        self.message_id += 1
+        message: Dict[str, Any] = {
+            "message_id": int(form.get("message_id") or self.message_id),
+            "date": int(time.time()),
+            "chat": _chat(form.get("chat_id", 0)),
+            "from": BOT_USER,
+        }
+        if form.get("reply_markup"):
+            markup = json.loads(form["reply_markup"])
+            if "inline_keyboard" in markup:
+                message["reply_markup"] = markup
+        if method in ("sendPhoto", "editMessageCaption", "editMessageMedia"):
+            file_id = f"photo{self.message_id}"
+            message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 1280, "height": 720}]
+            message["caption"] = form.get("caption", "")
+        else:
+            message["text"] = form.get("text", "")
+        return message
+
+    def result(self, method: str, form: Dict[str, Any]) -> Any:
+        if method == "getMe":
+            return BOT_USER
+        if method == "copyMessage":
+            self.message_id += 1
+            return {"message_id": self.message_id}
+        if method == "getChat":
+            return _chat(form.get("chat_id", 0))
+        if method == "getChatMember":
+            return {"status": "member", "user": {"id": int(form.get("user_id", 0)), "is_bot": False, "first_name": "User"}}
+        if method.startswith(("send", "edit")) and method != "sendChatAction":
+            return self._message(method, form)
+        return True
+
+    def create_app(self) -> web.Application:
+        async def bot_method(request: web.Request) -> web.Response:
+            method = request.match_info["method"]
+            with self.lock:
+                self.calls[method] += 1
+            form = dict(await request.post())
+            if self.latency or self.jitter:
+                await asyncio.sleep(self.latency + self._rnd.uniform(0, self.jitter))
+            return web.json_response({"ok": True, "result": self.result(method, form)})
+
+        app = web.Application(client_max_size=64 * 1024 ** 2)  # загрузка фото
+        app.router.add_post("/bot{token}/{method}", bot_method)
+        return app
+
+
+def start_telegram(fake: FakeTelegram, port: int) -> Callable[[], None]:
+    return serve_in_thread(fake.create_app, port, "fake-telegram")
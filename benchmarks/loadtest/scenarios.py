@@ -0,0 +1,204 @@
+"""Synthetic users, seed data and update streams for the load test.
+
+A scenario produces sessions: one user's sequence of raw Telegram
+updates (dicts, as the Bot API would deliver them). Steps of a session
+are fed one after another, so FSM flows advance exactly like a real
+user clicking through them; different sessions run concurrently.
+"""
+import itertools
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from benchmarks.loadtest.fake_postgrest import FakeDatabase
+
+GROUP_CHAT_ID = -1001000000001
+WORKER_ID_BASE = 10_000_000       # Зарегистрированные воркеры
+NEWCOMER_ID_BASE = 20_000_000     # Новые пользователи (воронка регистрации)
+ADMIN_ID_BASE = 90_000_000        # Синтетические админы (добавляются в config.ADMIN_IDS)
+
+SERVICES = ["Avito", "Youla", "OLX", "Kufar", "Vinted", "Wallapop"]
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(500_000)
+
+
+@dataclass
+class Session:
+    user_id: int
+    steps: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class World:
+    """Who exists in the seeded database."""
+    workers: List[int]
+    admins: List[int]
+    service_ids: List[int]
+    rnd: random.Random
+
+    def worker(self) -> int:
+        return self.rnd.choice(self.workers)
+
+
+# ============================================
+# SEED DATA
+# ============================================
+
+def seed(db: FakeDatabase, users: int, profits: int, admins: List[int], rnd: random.Random) -> World:
+    """Fill the fake database: active workers with a referral tree and mentors, services, profits."""
+    now = datetime.now(timezone.utc)
+    workers = [WORKER_ID_BASE + i for i in range(1, users + 1)]
+
+    for uid in admins:
+        db.insert("users", {"id": uid, "username": f"admin{uid}", "full_name": f"Admin {uid}",
+                            "status": "active", "user_tag": f"#adm{uid % 10000}"})
+    for i, uid in enumerate(workers):
+        db.insert("users", {
+            "id": uid, "username": f"worker{i}", "full_name": f"Worker {i}", "status": "active",
+            "user_tag": f"#lt{i}", "referrer_id": workers[i // 5] if i >= 5 else None,
+            "created_at": (now - timedelta(days=rnd.randint(1, 365))).isoformat(),
+        })
+
+    service_ids = [db.insert("services", {"name": name, "icon": "🔹", "is_active": True,
+                                          "description": f"{name} service"})["id"] for name in SERVICES]
+    for title, kind in (("Чат команды", "community"), ("Мануалы", "resource")):
+        db.insert("resources", {"title": title, "content_link": "https://t.me/loadtest", "type": kind, "is_active": True})
+    db.insert("direct_payment_settings", {"id": 1, "requisites": "0000 0000 0000 0000", "support_username": "support"})
+
+    # Наставники: первые воркеры, ученики - каждый десятый
+    for n, name in enumerate(SERVICES[:3]):
+        mentor = db.insert("mentors", {"user_id": workers[n], "service_name": name, "percent": 10,
+                                       "is_active": True, "students_count": 0, "total_earned": 0})
+        db.insert("mentor_details", {**mentor, "username": f"worker{n}", "full_name": f"Worker {n}"})
+    mentors = db.tables["mentors"]
+    for i, uid in enumerate(workers[10::10]):
+        db.users(id=uid)[0]["mentor_id"] = mentors[i % len(mentors)]["id"]
+
+    for _ in range(profits):
+        amount = round(rnd.lognormvariate(9, 1), 2)
+        db.insert("profits", {
+            "worker_id": rnd.choice(workers), "amount": amount, "net_profit": round(amount * 0.6, 2),
+            "service_name": rnd.choice(SERVICES),
+            "created_at": (now - timedelta(seconds=rnd.randint(0, 90 * 86400))).isoformat(),
+        })
+    db.tables["profits"].sort(key=lambda p: p["created_at"])
+
+    return World(workers=workers, admins=list(admins), service_ids=service_ids, rnd=rnd)
+
+
+# ============================================
+# UPDATES
+# ============================================
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"u{user_id}"}
+
+
+def message(user_id: int, text: str, chat_id: int = None) -> Dict[str, Any]:
+    chat_id = chat_id or user_id
+    chat = {"id": chat_id, "type": "private"} if chat_id > 0 else {"id": chat_id, "type": "supergroup", "title": "Team"}
+    payload: Dict[str, Any] = {
+        "message_id": next(_message_ids), "date": int(datetime.now().timestamp()),
+        "chat": chat, "from": _user(user_id), "text": text,
+    }
+    if text.startswith("/"):
+        payload["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": next(_update_ids), "message": payload}
+
+
+def callback(user_id: int, data: str, message_id: int) -> Dict[str, Any]:
+    """Button press on a branded (photo) message the bot sent earlier."""
+    return {"update_id": next(_update_ids), "callback_query": {
+        "id": str(next(_update_ids)), "from": _user(user_id), "chat_instance": str(user_id), "data": data,
+        "message": {
+            "message_id": message_id, "date": int(datetime.now().timestamp()),
+            "chat": {"id": user_id, "type": "private"}, "from": {"id": 123456, "is_bot": True, "first_name": "LoadTest"},
+            "photo": [{"file_id": "brand", "file_unique_id": "brand", "width": 1280, "height": 720}],
+            "caption": "menu",
+        },
+    }}
+
+
+# ============================================
+# SCENARIOS
+# ============================================
+
+def group_top(world: World, count: int) -> List[Session]:
+    """/top storm in the team chat: many members asking for leaderboards at once."""
+    commands = ["/top", "/topm", "/topw", "/topd"]
+    return [Session(uid, [message(uid, world.rnd.choice(commands), GROUP_CHAT_ID)])
+            for uid in world.rnd.sample(world.workers, min(count, len(world.workers)))]
+
+
+def menu_navigation(world: World, count: int) -> List[Session]:
+    """Active workers clicking through the main menu screens."""
+    sessions = []
+    for uid in world.rnd.sample(world.workers, min(count, len(world.workers))):
+        msg_id = next(_message_ids)
+        steps = [message(uid, "Главное меню")]
+        for data in ("profile", "referral_link", "profit_history", "services", "main_menu"):
+            steps.append(callback(uid, data, msg_id))
+        steps.append(message(uid, "Профиль"))
+        sessions.append(Session(uid, steps))
+    return sessions
+
+
+def registration(world: World, count: int) -> List[Session]:
+    """Newcomers going through /start and the application form."""
+    sessions = []
+    first = NEWCOMER_ID_BASE + world.rnd.randint(0, 10_000_000)
+    for uid in range(first, first + count):
+        msg_id = next(_message_ids)
+        start = f"/start ref{world.worker()}" if uid % 3 == 0 else "/start"
+        steps = [message(uid, start)]
+        for data in ("accept_agreement", "age_18_25", "exp_yes", "hours_1_3", "motivation_money", "source_friend"):
+            steps.append(callback(uid, data, msg_id))
+        sessions.append(Session(uid, steps))
+    return sessions
+
+
+def profit_confirmation(world: World, count: int) -> List[Session]:
+    """Admins creating profits through the 7-step FSM (outbox delivers the notifications)."""
+    sessions = []
+    for n in range(count):
+        admin = world.admins[n % len(world.admins)]
+        msg_id = next(_message_ids)
+        sessions.append(Session(admin, [
+            callback(admin, "create_profit", msg_id),
+            message(admin, str(world.worker())),
+            message(admin, f"Mammoth {n}"),
+            callback(admin, f"select_service_{world.rnd.choice(world.service_ids)}", msg_id),
+            message(admin, str(world.rnd.randint(1000, 50000))),
+            message(admin, str(world.rnd.choice([50, 60, 70]))),
+            callback(admin, "stage_deposit", msg_id),
+            callback(admin, "confirm_profit", msg_id),
+        ]))
+    return sessions
+
+
+def broadcast(world: World, count: int) -> List[Session]:
+    """Admins sending text broadcasts to every active user."""
+    sessions = []
+    for n in range(count):
+        admin = world.admins[n % len(world.admins)]
+        msg_id = next(_message_ids)
+        sessions.append(Session(admin, [
+            callback(admin, "broadcast", msg_id),
+            callback(admin, "broadcast_text", msg_id),
+            message(admin, f"Новости #{n}"),
+            message(admin, "Нагрузочный тест рассылки"),
+            message(admin, "-"),
+            callback(admin, "confirm_broadcast", msg_id),
+        ]))
+    return sessions
+
+
+SCENARIOS: Dict[str, Callable[[World, int], List[Session]]] = {
+    "top": group_top,
+    "menu": menu_navigation,
+    "registration": registration,
+    "profit": profit_confirmation,
+    "broadcast": broadcast,
+}
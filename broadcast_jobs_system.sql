@@ -0,0 +1,50 @@
+-- ============================================
+-- BROADCAST JOBS - ВОЗОБНОВЛЯЕМЫЕ РАССЫЛКИ АДМИНОВ
+-- ============================================
+
+-- Задание рассылки. cursor = ID последнего обработанного пользователя
+-- (получатели обходятся по возрастанию users.id), поэтому после
+-- перезапуска бот продолжает рассылку с того же места.
+CREATE TABLE IF NOT EXISTS broadcast_jobs (
+    id SERIAL PRIMARY KEY,
+    admin_id BIGINT NOT NULL,
+    admin_username TEXT,
+    title TEXT NOT NULL,
+    message_text TEXT NOT NULL,
+    photo_id TEXT,
+    button_text TEXT,
+    button_url TEXT,
+    button_type TEXT DEFAULT 'url' CHECK (button_type IN ('url', 'callback')),
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'completed', 'failed', 'cancelled')),
+    cursor BIGINT NOT NULL DEFAULT 0,
+    total_count INTEGER DEFAULT 0,
+    sent_count INTEGER DEFAULT 0,
+    blocked_count INTEGER DEFAULT 0,
+    failed_count INTEGER DEFAULT 0,
+    progress_chat_id BIGINT,
+    progress_message_id BIGINT,
+    progress_is_photo BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ
+);
+
+-- Результат доставки по каждому получателю (пишется пачками)
+CREATE TABLE IF NOT EXISTS broadcast_job_recipients (
+    job_id INTEGER NOT NULL REFERENCES broadcast_jobs(id) ON DELETE CASCADE,
+    user_id BIGINT NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('sent', 'blocked', 'failed')),
+    error_message TEXT,
+    sent_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (job_id, user_id)
+);
+
+-- Индексы
+CREATE INDEX IF NOT EXISTS idx_broadcast_jobs_status ON broadcast_jobs(status);
+CREATE INDEX IF NOT EXISTS idx_broadcast_job_recipients_status ON broadcast_job_recipients(job_id, status);
+
+-- Keyset-пагинация активных пользователей по id
+CREATE INDEX IF NOT EXISTS idx_users_active_id ON users(id) WHERE status = 'active';
+
+COMMENT ON TABLE broadcast_jobs IS 'Задания рассылок админов с курсором для возобновления';
+COMMENT ON TABLE broadcast_job_recipients IS 'Итоги доставки рассылок: sent / blocked / failed';
@@ -28,8 +28,21 @@ CHAT_GROUP_URL: str = "https://t.me/+eaLPwFM0eGo3MGRk"
 # REFERRAL SYSTEM
 # ============================================
 REFERRAL_PERCENT: int = 5
+REFERRAL_TREE_DEPTH: int = 3                # Сколько уровней команды показывать (1 - только прямые рефералы)
 WEBSITE_URL: str = "https://example.com"
 
+# ============================================
+# RANKS
+# ============================================
+# (название, эмодзи, цвет, порог общей суммы профитов ₽, бонус к доле %) - по возрастанию порога
+RANKS: tuple = (
+    ("Новичок", "🌱", "🟢", 0, 0),
+    ("Воркер", "⚡", "🔵", 100000, 1),
+    ("Профи", "💎", "🟣", 250000, 2),
+    ("Эксперт", "👑", "🟡", 500000, 3),
+    ("Легенда", "🔥", "🔴", 1000000, 5),
+)
+
 # ============================================
 # SUPABASE DATABASE
 # ============================================
@@ -63,6 +76,110 @@ BRAND_IMAGE_PROFITS: str = "images/профиты.jpg"        # История 
 BRAND_IMAGE_PAYMENTS: str = "images/Реквизиты.jpg"     # Прямые платежи
 BRAND_IMAGE_COMMUNITY: str = "images/home.jpg"         # Сообщество/ресурсы
 
+# Чат для загрузки картинок при старте (сообщение сразу удаляется, file_id сохраняется в bot_settings)
+MEDIA_UPLOAD_CHAT_ID: int = ADMIN_IDS[0]
+
+# ============================================
+# LOCAL STATE
+# ============================================
+DATA_DIR: str = "data"                                   # Локальные файлы состояния бота
+AUTO_DELETE_STORE: str = "data/auto_delete.sqlite3"      # Очередь автоудаления сообщений в группах
+
+# ============================================
+# WEBHOOK / HTTP SERVER
+# ============================================
+RUN_MODE: str = "polling"                 # "polling" или "webhook"
+WEBHOOK_BASE_URL: str = None              # Публичный https-адрес бота (обязателен для webhook)
+WEBHOOK_PATH: str = "/webhook"            # Путь, на который Telegram шлёт апдейты
+WEBHOOK_SECRET: str = None                # Секрет заголовка X-Telegram-Bot-Api-Secret-Token (по умолчанию из BOT_TOKEN)
+WEB_SERVER_HOST: str = "0.0.0.0"
+WEB_SERVER_PORT: int = 8000               # /health и webhook
+DROP_PENDING_UPDATES: bool = False        # Не терять апдейты, накопившиеся за время перезапуска
+SHUTDOWN_DRAIN_TIMEOUT: float = 20        # Сколько ждать обработки текущих апдейтов при остановке (секунды)
+
+# ============================================
+# WEBAPP API (/api/* для мини-приложений)
+# ============================================
+API_ENABLED: bool = True                  # JSON API на WEB_SERVER_PORT вместо прямых запросов в Supabase из браузера
+API_CORS_ORIGINS: tuple = tuple(
+    url.rstrip("/") for url in (WEBAPP_ANALYTICS, WEBAPP_REFERRALS, WEBAPP_PROFITS_HISTORY, WEBAPP_HUB, WEBAPP_IDEAS)
+)                                         # Откуда мини-приложениям можно обращаться к API
+API_PUBLIC_URL: str = None                # Публичный https-адрес API (обязателен при API_ENABLED; тот же адрес - в API_ORIGINS страниц)
+API_INIT_DATA_MAX_AGE: int = 86400        # Срок действия initData (секунды)
+API_MAX_AGE: int = 30                     # Cache-Control max-age ответов (секунды)
+API_GZIP_MIN_SIZE: int = 1024             # Сжимать ответы больше (байт)
+API_PAGE_SIZE: int = 20                   # Профитов на страницу истории (максимум 100)
+
+# ============================================
+# FSM STORAGE
+# ============================================
+FSM_STORAGE: str = "memory"               # "memory" (теряются при перезапуске), "supabase" (нужна миграция fsm_storage.sql) или "redis"
+FSM_REDIS_URL: str = "redis://localhost:6379/0"  # Для FSM_STORAGE = "redis" (нужен пакет redis)
+FSM_STATE_TTL: int = 86400                # Незавершённый диалог живёт сутки с последнего действия
+FSM_CACHE_TTL: float = 60                 # Локальный кэш "supabase" (секунды); 0 - если диалоги делят несколько webhook-реплик
+
+# ============================================
+# UPDATE DEDUP
+# ============================================
+UPDATE_DEDUP_TTL: int = 600               # Сколько помнить обработанные апдейты (секунды)
+UPDATE_DEDUP_MAX_KEYS: int = 100000       # Предел ключей в памяти
+UPDATE_DEDUP_SHARED: bool = False         # Общий журнал в таблице processed_updates (несколько реплик / перезапуски)
+
+# ============================================
+# NOTIFICATION OUTBOX
+# ============================================
+OUTBOX_WORKERS: int = 5                   # Параллельных отправителей уведомлений
+OUTBOX_BATCH_SIZE: int = 50               # Сообщений за один захват из очереди
+OUTBOX_MAX_ATTEMPTS: int = 6              # После стольких неудач сообщение помечается failed
+OUTBOX_RETRY_BASE: float = 5              # Первая пауза перед повтором (секунды, дальше x2)
+OUTBOX_LOCK_SECONDS: int = 120            # Захваченное, но не отправленное сообщение снова берётся через столько секунд
+OUTBOX_POLL_INTERVAL: int = 30            # Страховочная проверка очереди (секунды)
+
+# ============================================
+# HTTP POOLS
+# ============================================
+BOT_HTTP_POOL_SIZE: int = 100             # Соединений к Bot API одновременно (рассылки упираются сюда)
+BOT_HTTP_POOL_PER_HOST: int = 0           # 0 - без отдельного лимита на хост
+BOT_HTTP_KEEPALIVE: float = 60            # Держать простаивающее соединение (секунды)
+BOT_HTTP_DNS_TTL: int = 3600              # Кэш DNS api.telegram.org (секунды)
+BOT_HTTP_TIMEOUT: float = 60              # Таймаут запроса к Bot API (секунды)
+
+DB_HTTP_POOL_SIZE: int = 20               # Соединений к Supabase REST
+DB_HTTP_KEEPALIVE_CONNECTIONS: int = 10   # Сколько простаивающих соединений держать
+DB_HTTP_KEEPALIVE_EXPIRY: float = 60      # Держать простаивающее соединение (секунды; у httpx по умолчанию 5)
+DB_HTTP2: bool = True                     # HTTP/2 к Supabase (нужен пакет h2)
+DB_HTTP_TIMEOUT: float = 30               # Таймаут запроса к Supabase (секунды)
+
+# ============================================
+# KEYBOARDS
+# ============================================
+KEYBOARD_CACHE_SIZE: int = 256            # Запомненных клавиатур на одну функцию (пагинация, флаги)
+
+# ============================================
+# LEADERBOARD
+# ============================================
+LEADERBOARD_SIZE: int = 10                # Мест в /top, /topm, /topw, /topd
+LEADERBOARD_DEBOUNCE: float = 2           # Пауза перед пересборкой после профита (пачка профитов - одна пересборка)
+LEADERBOARD_REFRESH_INTERVAL: int = 600   # Плановая пересборка (секунды; неделя - скользящее окно)
+
+# ============================================
+# ANALYTICS STORE
+# ============================================
+ANALYTICS_STORE_ENABLED: bool = False     # Колоночная копия профитов в памяти для админской статистики по периодам (нужен пакет numpy, ~45 МБ на 1 млн профитов)
+ANALYTICS_PAGE_SIZE: int = 10000          # Профитов за запрос при загрузке
+ANALYTICS_RESYNC_INTERVAL: int = 3600     # Полная перезагрузка (секунды; подхватывает правки профитов в обход бота)
+
+# ============================================
+# EXPORT
+# ============================================
+EXPORT_PAGE_SIZE: int = 1000              # Строк за запрос при выгрузке /export
+EXPORT_MAX_FILE_MB: int = 50              # Лимит документа от бота в Telegram
+
+# ============================================
+# MENTOR STATS
+# ============================================
+MENTOR_ACTIVE_REFRESH: int = 900          # Активные студенты наставника пересчитываются в фоне не чаще (секунды)
+
 # ============================================
 # RESTART SYSTEM
 # ============================================
@@ -73,5 +190,15 @@ RESTART_COMMAND: str = None      # Команда для перезапуска
 # ============================================
 # BROADCAST SYSTEM
 # ============================================
-BROADCAST_DELAY: float = 0.05    # Задержка между сообщениями в рассылке (секунды)
-BROADCAST_BATCH_SIZE: int = 20   # Размер батча для обновления прогресса
+BROADCAST_RATE_LIMIT: float = 25        # Общий лимит отправки для массовых рассылок (сообщений/сек, у Telegram ~30)
+BROADCAST_WORKERS: int = 10             # Параллельных отправителей в рассылке
+BROADCAST_PAGE_SIZE: int = 500          # Получателей за страницу (курсор сохраняется после каждой)
+BROADCAST_FLUSH_SIZE: int = 25          # Результатов доставки за одну запись в БД (остаток сохраняется при остановке)
+BROADCAST_MAX_RETRIES: int = 3          # Повторы при RetryAfter и сетевых ошибках
+PROGRESS_MIN_INTERVAL: float = 2        # Не чаще одного редактирования сообщения с прогрессом (секунды)
+
+# Рассылки наставников
+MENTOR_BROADCAST_CONCURRENCY: int = 4     # Рассылок разных наставников одновременно
+MENTOR_BROADCAST_WORKERS: int = 5         # Параллельных отправителей на одну рассылку
+MENTOR_BROADCAST_FLUSH_SIZE: int = 100    # Статусов получателей за одну запись в БД
+MENTOR_BROADCAST_FALLBACK_POLL: int = 60  # Страховочная проверка очереди (секунды)
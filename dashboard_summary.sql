@@ -0,0 +1,57 @@
+-- ============================================
+-- DASHBOARD SUMMARY - СВОДКА ДЛЯ /stats И /analytics ОДНИМ ЗАПРОСОМ
+-- ============================================
+
+-- Периоды совпадают с get_top_workers:
+--   day   - сегодня (CURRENT_DATE)
+--   week  - последние 7 дней
+--   month - с начала календарного месяца
+--   all   - всё время
+-- По каждому периоду: сумма net_profit, число профитов, число разных воркеров.
+CREATE OR REPLACE FUNCTION get_dashboard_summary(p_top_limit INTEGER DEFAULT 5)
+RETURNS JSONB AS $$
+WITH agg AS (
+    SELECT
+        COALESCE(SUM(p.net_profit), 0) AS all_total,
+        COUNT(*) AS all_count,
+        COUNT(DISTINCT p.worker_id) AS all_workers,
+
+        COALESCE(SUM(p.net_profit) FILTER (WHERE p.created_at >= DATE_TRUNC('month', NOW())), 0) AS month_total,
+        COUNT(*) FILTER (WHERE p.created_at >= DATE_TRUNC('month', NOW())) AS month_count,
+        COUNT(DISTINCT p.worker_id) FILTER (WHERE p.created_at >= DATE_TRUNC('month', NOW())) AS month_workers,
+
+        COALESCE(SUM(p.net_profit) FILTER (WHERE p.created_at >= NOW() - INTERVAL '7 days'), 0) AS week_total,
+        COUNT(*) FILTER (WHERE p.created_at >= NOW() - INTERVAL '7 days') AS week_count,
+        COUNT(DISTINCT p.worker_id) FILTER (WHERE p.created_at >= NOW() - INTERVAL '7 days') AS week_workers,
+
+        COALESCE(SUM(p.net_profit) FILTER (WHERE p.created_at >= CURRENT_DATE), 0) AS day_total,
+        COUNT(*) FILTER (WHERE p.created_at >= CURRENT_DATE) AS day_count,
+        COUNT(DISTINCT p.worker_id) FILTER (WHERE p.created_at >= CURRENT_DATE) AS day_workers
+    FROM profits p
+),
+top AS (
+    SELECT u.id AS user_id, u.user_tag, u.username, u.full_name,
+           SUM(p.net_profit) AS total_profit, COUNT(p.id) AS profit_count
+    FROM profits p
+    JOIN users u ON u.id = p.worker_id
+    WHERE u.status = 'active'
+    GROUP BY u.id, u.user_tag, u.username, u.full_name
+    HAVING SUM(p.net_profit) > 0
+    ORDER BY SUM(p.net_profit) DESC
+    LIMIT p_top_limit
+)
+SELECT jsonb_build_object(
+    'active_users', (SELECT COUNT(*) FROM users WHERE status = 'active'),
+    'periods', jsonb_build_object(
+        'all',   jsonb_build_object('total_profit', a.all_total,   'profits_count', a.all_count,   'active_workers', a.all_workers),
+        'month', jsonb_build_object('total_profit', a.month_total, 'profits_count', a.month_count, 'active_workers', a.month_workers),
+        'week',  jsonb_build_object('total_profit', a.week_total,  'profits_count', a.week_count,  'active_workers', a.week_workers),
+        'day',   jsonb_build_object('total_profit', a.day_total,   'profits_count', a.day_count,   'active_workers', a.day_workers)
+    ),
+    'top_workers', COALESCE((SELECT jsonb_agg(to_jsonb(t) ORDER BY t.total_profit DESC) FROM top t), '[]'::jsonb),
+    'generated_at', NOW()
+)
+FROM agg a;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION get_dashboard_summary IS 'Сводка команды: активные пользователи, итоги по периодам, топ-N (один запрос для /stats и /analytics)';
@@ -1,18 +1,19 @@
 """Database module - Optimized Supabase integration."""
 from database.db import (
     # Core
-    get_db, init_db, cache,
+    get_db, init_db, cache, subscribe,
     
     # Users
     get_user, get_user_by_username, create_user,
     update_user_status, update_user_wallet, update_user_activity,
-    get_active_user_ids,
-    get_user_referrer, get_user_referrals, get_referral_stats, update_referrer_earnings,
+    get_active_user_ids, get_active_user_ids_page, count_active_users,
+    mark_users_undeliverable, mark_user_deliverable,
+    get_user_referrer, get_user_referrals, get_referral_tree, get_referral_stats, update_referrer_earnings,
     update_user_tag, get_user_by_tag, is_tag_available,
     get_users_by_status, ban_user, unban_user,
     
     # Profits
-    create_profit, get_user_profits, get_user_stats,
+    create_profit, get_profit_rows_page, get_user_profits, get_user_stats,
     get_unpaid_summary, mark_profits_paid,
     
     # Referral profits
@@ -25,6 +26,10 @@ from database.db import (
     
     # Rankings
     get_top_workers, get_user_position, get_team_stats, get_team_stats_by_period,
+    get_dashboard_summary, backfill_profit_rollup,
+    
+    # Profit distribution
+    get_profit_sketch,
     
     # Services
     get_services, get_service, add_service, delete_service,
@@ -36,7 +41,7 @@ from database.db import (
     get_mentors, get_mentor, get_user_mentor,
     get_mentor_services, get_mentors_by_service,
     add_mentor, assign_mentor, remove_mentor,
-    update_mentor_stats, delete_mentor,
+    delete_mentor,
     
     # Communities
     get_communities_for_user, get_community, create_community_request,
@@ -44,7 +49,7 @@ from database.db import (
     join_community, leave_community, is_community_member, get_user_communities,
     
     # Admin
-    log_admin_action,
+    log_admin_action, get_export_page,
     
     # Rank history
     log_rank_change,
@@ -57,48 +62,75 @@ from database.db import (
     get_direct_payment_settings, update_direct_payment_settings,
     
     # Mentor panel
-    is_user_mentor, get_mentor_students, get_mentor_stats,
+    is_user_mentor, get_mentor_students_page, get_mentor_student_ids, get_mentor_stats, refresh_mentor_stats,
     update_mentor_channel, get_mentor_channel_info,
     create_mentor_broadcast, get_mentor_broadcasts, get_broadcast_recipients,
     update_broadcast_recipient_status, update_broadcast_status, get_pending_broadcasts,
-    get_mentor_data,
+    get_pending_recipient_ids, save_broadcast_recipient_statuses,
+    
+    # Broadcast jobs
+    create_broadcast_job, get_broadcast_job, get_unfinished_broadcast_jobs,
+    update_broadcast_job, get_broadcast_job_done_ids, get_broadcast_job_counts,
+    save_broadcast_job_results,
+    
+    # FSM states
+    get_fsm_records, write_fsm_record, purge_expired_fsm_states,
+    
+    # Processed updates
+    claim_update_keys, purge_processed_updates,
+    
+    # Notification outbox
+    enqueue_notifications, claim_outbox_batch, complete_outbox_items, fail_outbox_item,
     
     # Parallel loaders
     get_profile_data, get_main_menu_data,
+    
+    # Webapp API
+    get_user_profits_page, get_user_profit_statuses, get_daily_profit_series, get_referral_roster,
 )
 
 __all__ = [
-    "get_db", "init_db", "cache",
+    "get_db", "init_db", "cache", "subscribe",
     "get_user", "get_user_by_username", "create_user",
     "update_user_status", "update_user_wallet", "update_user_activity",
-    "get_active_user_ids",
-    "get_user_referrer", "get_user_referrals", "get_referral_stats", "update_referrer_earnings",
+    "get_active_user_ids", "get_active_user_ids_page", "count_active_users",
+    "mark_users_undeliverable", "mark_user_deliverable",
+    "get_user_referrer", "get_user_referrals", "get_referral_tree", "get_referral_stats", "update_referrer_earnings",
     "update_user_tag", "get_user_by_tag", "is_tag_available",
     "get_users_by_status", "ban_user", "unban_user",
-    "create_profit", "get_user_profits", "get_user_stats",
+    "create_profit", "get_profit_rows_page", "get_user_profits", "get_user_stats",
     "get_unpaid_summary", "mark_profits_paid",
     "create_referral_profit", "get_unpaid_referral_summary",
     "mark_referral_profits_paid", "get_user_referral_profits",
     "create_mentor_profit", "get_unpaid_mentor_summary",
     "mark_mentor_profits_paid", "get_user_mentor_profits",
     "get_top_workers", "get_user_position", "get_team_stats", "get_team_stats_by_period",
+    "get_dashboard_summary", "backfill_profit_rollup",
+    "get_profit_sketch",
     "get_services", "get_service", "add_service", "delete_service",
     "get_resources", "add_resource", "delete_resource",
     "get_mentors", "get_mentor", "get_user_mentor",
     "get_mentor_services", "get_mentors_by_service",
     "add_mentor", "assign_mentor", "remove_mentor",
-    "update_mentor_stats", "delete_mentor",
+    "delete_mentor",
     "get_communities_for_user", "get_community", "create_community_request",
     "get_pending_communities", "approve_community", "reject_community", "delete_community",
     "join_community", "leave_community", "is_community_member", "get_user_communities",
-    "log_admin_action", "log_rank_change",
+    "log_admin_action", "get_export_page", "log_rank_change",
     "create_notification", "get_unread_count",
     "get_setting", "set_setting",
     "get_direct_payment_settings", "update_direct_payment_settings",
-    "is_user_mentor", "get_mentor_students", "get_mentor_stats",
+    "is_user_mentor", "get_mentor_students_page", "get_mentor_student_ids", "get_mentor_stats", "refresh_mentor_stats",
     "update_mentor_channel", "get_mentor_channel_info",
     "create_mentor_broadcast", "get_mentor_broadcasts", "get_broadcast_recipients",
     "update_broadcast_recipient_status", "update_broadcast_status", "get_pending_broadcasts",
-    "get_mentor_data",
+    "get_pending_recipient_ids", "save_broadcast_recipient_statuses",
+    "create_broadcast_job", "get_broadcast_job", "get_unfinished_broadcast_jobs",
+    "update_broadcast_job", "get_broadcast_job_done_ids", "get_broadcast_job_counts",
+    "save_broadcast_job_results",
+    "get_fsm_records", "write_fsm_record", "purge_expired_fsm_states",
+    "claim_update_keys", "purge_processed_updates",
+    "enqueue_notifications", "claim_outbox_batch", "complete_outbox_items", "fail_outbox_item",
     "get_profile_data", "get_main_menu_data",
+    "get_user_profits_page", "get_user_profit_statuses", "get_daily_profit_series", "get_referral_roster",
 ]
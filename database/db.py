@@ -4,7 +4,7 @@ With caching, connection pooling, and parallel queries.
 """
 import logging
 import asyncio
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Iterable, Tuple
 from datetime import datetime, timedelta
 from functools import wraps
 import time
@@ -73,6 +73,70 @@ def cached(prefix: str, ttl: int = TTL_MEDIUM):
     return decorator
 
 
+def swr_cached(prefix: str, ttl: int = TTL_SHORT, stale_ttl: int = TTL_LONG):
+    """Caching with stale-while-revalidate.
+    
+    Fresh for `ttl` seconds; after that, until `stale_ttl`, the old value is
+    returned at once while a single background call refreshes it. Only a
+    cold or fully expired cache makes the caller wait.
+    """
+    def decorator(func):
+        refreshing: Dict[str, asyncio.Task] = {}
+        
+        async def refresh(key, args, kwargs):
+            result = await func(*args, **kwargs)
+            if result is not None:
+                cache.set(key, (result, time.time() + ttl), stale_ttl)
+            return result
+        
+        async def refresh_quietly(key, args, kwargs):
+            try:
+                await refresh(key, args, kwargs)
+            except Exception as e:
+                logger.error(f"Background refresh of {key} failed: {e}")
+        
+        def revalidate(key, args, kwargs):
+            task = refreshing.get(key)
+            if task is None or task.done():
+                refreshing[key] = asyncio.create_task(refresh_quietly(key, args, kwargs))
+        
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = f"{prefix}:{':'.join(str(a) for a in args)}"
+            entry = cache.get(key)
+            if entry is None:
+                return await refresh(key, args, kwargs)
+            result, fresh_until = entry
+            if time.time() >= fresh_until:
+                revalidate(key, args, kwargs)
+            return result
+        return wrapper
+    return decorator
+
+
+# ============================================
+# DATA EVENTS
+# ============================================
+
+_listeners: Dict[str, List[Callable[..., Any]]] = {}
+
+
+def subscribe(event: str, listener: Callable[..., Any]) -> None:
+    """Register in-process listener for a data event (sync or async)."""
+    _listeners.setdefault(event, []).append(listener)
+
+
+def _emit(event: str, **payload) -> None:
+    """Notify listeners; async listeners run as background tasks."""
+    for listener in _listeners.get(event, []):
+        try:
+            result = listener(**payload)
+            if asyncio.iscoroutine(result):
+                asyncio.create_task(result)
+        except Exception as e:
+            logger.error(f"Event listener error ({event}): {e}")
+
+
 # ============================================
 # SUPABASE CLIENT
 # ============================================
@@ -89,9 +153,26 @@ def get_db() -> Client:
         if not url or not key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY required")
         _client = create_client(url, key)
+        
+        # Replace default PostgREST httpx client with the tuned pool
+        from utils.http_pools import create_db_http_client
+        postgrest = _client.postgrest
+        default_session = postgrest.session
+        postgrest.session = create_db_http_client(str(default_session.base_url), dict(default_session.headers))
+        default_session.close()
     return _client
 
 
+def _insert_once(table: str, row: Dict[str, Any], idempotency_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Insert row. With idempotency_key a repeated call inserts nothing and returns None."""
+    query = get_db().table(table)
+    if idempotency_key:
+        result = query.upsert({**row, "idempotency_key": idempotency_key}, on_conflict="idempotency_key", ignore_duplicates=True).execute()
+    else:
+        result = query.insert(row).execute()
+    return result.data[0] if result.data else None
+
+
 async def init_db() -> None:
     """Initialize database connection."""
     try:
@@ -180,7 +261,10 @@ async def create_user(user_id: int, username: str, full_name: str,
         data["referrer_id"] = referrer_id
     
     # Тег будет автоматически назначен триггером в базе данных
+    # (и строки referral_closure для всех предков пригласившего)
     get_db().table("users").insert(data).execute()
+    if referrer_id:
+        cache.clear_prefix("referral_tree:")
 
 
 async def update_user_tag(user_id: int, new_tag: str) -> bool:
@@ -232,14 +316,38 @@ async def get_user_referrals(user_id: int) -> List[Dict[str, Any]]:
     return result.data or []
 
 
+@cached("referral_tree", TTL_MEDIUM)
+async def get_referral_tree(user_id: int, max_depth: int = config.REFERRAL_TREE_DEPTH) -> Dict[str, Any]:
+    """User's referral team by level (one query over referral_closure) with totals."""
+    result = get_db().rpc("get_referral_tree_stats", {"p_user_id": user_id, "p_max_depth": max_depth}).execute()
+    levels = [
+        {
+            "depth": r["depth"], "members": r["members"], "active": r["active_members"],
+            "profit_count": r["profit_count"], "profit_sum": float(r["profit_sum"])
+        }
+        for r in result.data or []
+    ]
+    return {
+        "levels": levels,
+        "members": sum(l["members"] for l in levels),
+        "active": sum(l["active"] for l in levels),
+        "profit_count": sum(l["profit_count"] for l in levels),
+        "profit_sum": sum(l["profit_sum"] for l in levels),
+    }
+
+
 async def get_referral_stats(user_id: int) -> Dict[str, Any]:
-    """Get referral statistics."""
-    user, referrals = await asyncio.gather(
+    """Get referral statistics (direct referrals, whole team, earnings)."""
+    user, tree = await asyncio.gather(
         get_user(user_id),
-        get_user_referrals(user_id)
+        get_referral_tree(user_id)
     )
+    direct = tree["levels"][0]["members"] if tree["levels"] and tree["levels"][0]["depth"] == 1 else 0
     return {
-        "count": len(referrals),
+        "count": direct,
+        "team": tree["members"],
+        "levels": tree["levels"],
+        "team_profit": tree["profit_sum"],
         "earnings": float(user.get("referral_earnings", 0)) if user else 0
     }
 
@@ -259,6 +367,7 @@ async def create_referral_profit(referrer_id: int, referral_id: int, profit_id:
         "referrer_id": referrer_id, "referral_id": referral_id,
         "profit_id": profit_id, "amount": amount, "status": "hold"
     }).execute()
+    cache.delete(f"referral_roster:{referrer_id}")
     return result.data[0]["id"] if result.data else 0
 
 
@@ -269,11 +378,9 @@ async def get_unpaid_referral_summary() -> List[Dict[str, Any]]:
 
 
 async def mark_referral_profits_paid(user_id: int) -> int:
-    """Mark referral profits as paid."""
-    db = get_db()
-    count = db.table("referral_profits").select("id", count="exact").eq("referrer_id", user_id).eq("status", "hold").execute().count or 0
-    db.table("referral_profits").update({"status": "paid", "paid_at": datetime.utcnow().isoformat()}).eq("referrer_id", user_id).eq("status", "hold").execute()
-    return count
+    """Mark referral profits as paid (hold -> paid in one update). Returns rows changed, 0 if already paid."""
+    result = get_db().table("referral_profits").update({"status": "paid", "paid_at": datetime.utcnow().isoformat()}).eq("referrer_id", user_id).eq("status", "hold").execute()
+    return len(result.data or [])
 
 
 async def get_user_referral_profits(user_id: int) -> List[Dict[str, Any]]:
@@ -288,6 +395,11 @@ async def create_mentor_profit(mentor_id: int, mentor_user_id: int, student_id:
         "mentor_id": mentor_id, "mentor_user_id": mentor_user_id, "student_id": student_id,
         "profit_id": profit_id, "amount": amount, "percent": percent, "status": "hold"
     }).execute()
+    # mentor_stats, mentors.total_earned и rating обновляет триггер
+    _invalidate_mentor_roster(mentor_user_id)
+    cache.delete(f"sketch:mentor:{mentor_user_id}")
+    cache.delete(f"mentor_stats:{mentor_user_id}")
+    cache.clear_prefix("mentors")
     return result.data[0]["id"] if result.data else 0
 
 
@@ -298,11 +410,10 @@ async def get_unpaid_mentor_summary() -> List[Dict[str, Any]]:
 
 
 async def mark_mentor_profits_paid(user_id: int) -> int:
-    """Mark mentor profits as paid."""
-    db = get_db()
-    count = db.table("mentor_profits").select("id", count="exact").eq("mentor_user_id", user_id).eq("status", "hold").execute().count or 0
-    db.table("mentor_profits").update({"status": "paid", "paid_at": datetime.utcnow().isoformat()}).eq("mentor_user_id", user_id).eq("status", "hold").execute()
-    return count
+    """Mark mentor profits as paid (hold -> paid in one update). Returns rows changed, 0 if already paid."""
+    result = get_db().table("mentor_profits").update({"status": "paid", "paid_at": datetime.utcnow().isoformat()}).eq("mentor_user_id", user_id).eq("status", "hold").execute()
+    cache.delete(f"mentor_stats:{user_id}")
+    return len(result.data or [])
 
 
 async def get_user_mentor_profits(user_id: int) -> List[Dict[str, Any]]:
@@ -332,24 +443,107 @@ async def update_user_activity(user_id: int) -> None:
 
 
 async def get_active_user_ids() -> List[int]:
-    """Get all active user IDs."""
-    result = get_db().table("users").select("id").eq("status", "active").execute()
+    """Get all active user IDs the bot can deliver to."""
+    result = get_db().table("users").select("id").eq("status", "active").eq("is_deliverable", True).execute()
+    return [r["id"] for r in result.data or []]
+
+
+async def get_active_user_ids_page(after_id: int, limit: int) -> List[int]:
+    """Get next page of active deliverable user IDs (keyset by id)."""
+    result = get_db().table("users").select("id").eq("status", "active").eq("is_deliverable", True).gt("id", after_id).order("id").limit(limit).execute()
     return [r["id"] for r in result.data or []]
 
 
+async def count_active_users() -> int:
+    """Count active deliverable users (broadcast audience)."""
+    result = get_db().table("users").select("id", count="exact").eq("status", "active").eq("is_deliverable", True).limit(1).execute()
+    return result.count or 0
+
+
+async def mark_users_undeliverable(user_ids: List[int], reason: str = None) -> int:
+    """Exclude users from broadcasts (bot blocked / chat not found). Returns rows changed."""
+    if not user_ids:
+        return 0
+    try:
+        result = get_db().table("users").update({
+            "is_deliverable": False,
+            "undeliverable_at": datetime.utcnow().isoformat(),
+            "undeliverable_reason": (reason or "")[:200] or None
+        }).in_("id", list(user_ids)).eq("is_deliverable", True).execute()
+        for user_id in user_ids:
+            cache.delete(f"user:{user_id}")
+        await _invalidate_mentor_rosters(r.get("mentor_id") for r in result.data or [])
+        return len(result.data or [])
+    except Exception as e:
+        logger.error(f"Error marking users undeliverable: {e}")
+        return 0
+
+
+async def mark_user_deliverable(user_id: int) -> bool:
+    """Return user to broadcast audience (called when the user interacts again)."""
+    try:
+        result = get_db().table("users").update({
+            "is_deliverable": True, "undeliverable_at": None, "undeliverable_reason": None
+        }).eq("id", user_id).eq("is_deliverable", False).execute()
+        cache.delete(f"user:{user_id}")
+        await _invalidate_mentor_rosters(r.get("mentor_id") for r in result.data or [])
+        return bool(result.data)
+    except Exception as e:
+        logger.error(f"Error marking user {user_id} deliverable: {e}")
+        return False
+
+
 # ============================================
 # PROFIT OPERATIONS
 # ============================================
 
-async def create_profit(worker_id: int, amount: float, net_profit: float, service_name: str) -> int:
-    """Create profit record."""
-    result = get_db().table("profits").insert({
-        "worker_id": worker_id, "amount": amount,
-        "net_profit": net_profit, "service_name": service_name, "status": "hold"
-    }).execute()
+async def create_profit(worker_id: int, amount: float, net_profit: float, service_name: str,
+                        idempotency_key: str = None, notifications: List[Dict[str, Any]] = None) -> int:
+    """Create profit record. Returns 0 if a profit with this idempotency_key already exists.
+    
+    `notifications` ([{"kind", "chat_id", "text", "disable_preview"}]) are put into
+    notification_outbox in the same transaction as the profit.
+    """
+    if notifications is not None:
+        result = get_db().rpc("create_profit_with_outbox", {
+            "p_worker_id": worker_id, "p_amount": amount, "p_net_profit": net_profit,
+            "p_service_name": service_name, "p_idempotency_key": idempotency_key,
+            "p_notifications": notifications
+        }).execute()
+        profit_id = result.data or 0
+    else:
+        row = _insert_once("profits", {
+            "worker_id": worker_id, "amount": amount,
+            "net_profit": net_profit, "service_name": service_name, "status": "hold"
+        }, idempotency_key)
+        profit_id = row["id"] if row else 0
+    
+    if not profit_id:
+        logger.info(f"Profit with key {idempotency_key} already exists, skipped")
+        return 0
+    worker = await get_user(worker_id)
     cache.delete(f"user:{worker_id}")
     cache.clear_prefix(f"stats:{worker_id}")
-    return result.data[0]["id"] if result.data else 0
+    cache.clear_prefix("top:")
+    cache.clear_prefix("dashboard:")
+    cache.clear_prefix("daily:")
+    cache.clear_prefix(f"user_profits:{worker_id}:")
+    cache.clear_prefix("sketch:")
+    cache.clear_prefix("mentor_stats:")
+    await _invalidate_mentor_rosters([(worker or {}).get("mentor_id")])
+    if notifications:
+        _emit("outbox_enqueued", count=len(notifications))
+    _emit("profit_created", profit_id=profit_id, worker_id=worker_id, net_profit=net_profit,
+          amount=amount, service_name=service_name)
+    return profit_id
+
+
+async def get_profit_rows_page(after_id: int, limit: int) -> List[Dict[str, Any]]:
+    """Next page of profits for bulk loading (keyset by id, analytics columns only)."""
+    result = get_db().table("profits").select(
+        "id, worker_id, service_name, amount, net_profit, status, created_at"
+    ).gt("id", after_id).order("id").limit(limit).execute()
+    return result.data or []
 
 
 async def get_user_profits(user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
@@ -370,12 +564,11 @@ async def get_user_stats(user_id: int) -> Dict[str, Any]:
     
     if data.data:
         stats = data.data[0]
-        breakdown = db.table("profits").select("service_name, net_profit").eq("worker_id", user_id).execute()
-        services = {}
-        for r in breakdown.data or []:
-            svc = r["service_name"]
-            services[svc] = services.get(svc, 0) + float(r["net_profit"])
-        stats["service_breakdown"] = [{"service_name": k, "service_profit": v} for k, v in services.items()]
+        breakdown = db.rpc("get_user_service_breakdown", {"p_user_id": user_id}).execute()
+        stats["service_breakdown"] = [
+            {"service_name": r["service_name"], "service_profit": float(r["service_profit"])}
+            for r in breakdown.data or []
+        ]
         cache.set(key, stats, TTL_SHORT)
         return stats
     
@@ -390,14 +583,32 @@ async def get_unpaid_summary() -> List[Dict[str, Any]]:
 
 
 async def mark_profits_paid(user_id: int) -> int:
-    """Mark profits as paid."""
-    db = get_db()
-    count = db.table("profits").select("id", count="exact").eq("worker_id", user_id).eq("status", "hold").execute().count or 0
-    db.table("profits").update({"status": "paid", "paid_at": datetime.utcnow().isoformat()}).eq("worker_id", user_id).eq("status", "hold").execute()
+    """Mark profits as paid (hold -> paid in one update). Returns rows changed, 0 if already paid."""
+    result = get_db().table("profits").update({"status": "paid", "paid_at": datetime.utcnow().isoformat()}).eq("worker_id", user_id).eq("status", "hold").execute()
     cache.clear_prefix(f"stats:{user_id}")
+    cache.clear_prefix(f"user_profits:{user_id}:")
+    count = len(result.data or [])
+    if count:
+        _emit("profits_paid", worker_id=user_id, count=count)
     return count
 
 
+# ============================================
+# PROFIT DISTRIBUTION (sketches)
+# ============================================
+
+@cached("sketch", TTL_SHORT)
+async def get_profit_sketch(scope: str, key: Any = "all") -> Dict[str, Any]:
+    """Profit distribution sketch row for team / worker / service / mentor ({} when no profits)."""
+    try:
+        result = get_db().table("profit_sketches").select("buckets, total_count").eq(
+            "scope", scope).eq("scope_key", str(key)).limit(1).execute()
+        return result.data[0] if result.data else {}
+    except Exception as e:
+        logger.error(f"Error loading profit sketch {scope}:{key}: {e}")
+        return {}
+
+
 # ============================================
 # RANKINGS (cached)
 # ============================================
@@ -554,46 +765,33 @@ async def add_mentor(user_id: int, service_name: str, percent: int) -> int:
 
 
 async def assign_mentor(user_id: int, mentor_id: int) -> None:
-    """Assign mentor to user."""
-    db = get_db()
-    db.table("users").update({"mentor_id": mentor_id}).eq("id", user_id).execute()
-    mentor = await get_mentor(mentor_id)
-    if mentor:
-        db.table("mentors").update({"students_count": (mentor.get("students_count") or 0) + 1}).eq("id", mentor_id).execute()
+    """Assign mentor to user (students_count and mentor_stats are updated by trigger)."""
+    user = await get_user(user_id)
+    get_db().table("users").update({"mentor_id": mentor_id}).eq("id", user_id).execute()
+    await _invalidate_mentor_rosters([mentor_id, (user or {}).get("mentor_id")])
     cache.delete(f"user:{user_id}")
     cache.clear_prefix("mentors")
+    cache.clear_prefix("mentor_stats:")
 
 
 async def remove_mentor(user_id: int) -> None:
-    """Remove mentor from user."""
-    db = get_db()
+    """Remove mentor from user (students_count and mentor_stats are updated by trigger)."""
     user = await get_user(user_id)
-    if user and user.get("mentor_id"):
-        mentor = await get_mentor(user["mentor_id"])
-        if mentor:
-            db.table("mentors").update({"students_count": max(0, (mentor.get("students_count") or 0) - 1)}).eq("id", user["mentor_id"]).execute()
-    db.table("users").update({"mentor_id": None}).eq("id", user_id).execute()
+    get_db().table("users").update({"mentor_id": None}).eq("id", user_id).execute()
+    await _invalidate_mentor_rosters([(user or {}).get("mentor_id")])
     cache.delete(f"user:{user_id}")
     cache.clear_prefix("mentors")
-
-
-async def update_mentor_stats(mentor_id: int, profit: float) -> None:
-    """Update mentor earnings."""
-    mentor = await get_mentor(mentor_id)
-    if mentor:
-        get_db().table("mentors").update({
-            "total_earned": float(mentor.get("total_earned") or 0) + profit,
-            "rating": float(mentor.get("rating") or 0) + 1
-        }).eq("id", mentor_id).execute()
-        cache.clear_prefix("mentors")
+    cache.clear_prefix("mentor_stats:")
 
 
 async def delete_mentor(mentor_id: int) -> None:
     """Soft delete mentor."""
+    await _invalidate_mentor_rosters([mentor_id])
     db = get_db()
     db.table("users").update({"mentor_id": None}).eq("mentor_id", mentor_id).execute()
     db.table("mentors").update({"is_active": False}).eq("id", mentor_id).execute()
     cache.clear_prefix("mentors")
+    cache.clear_prefix("mentor_stats:")
     cache.clear_prefix("user")
 
 
@@ -683,13 +881,14 @@ async def update_direct_payment_settings(requisites: str, info: str, support: st
 
 async def get_profile_data(user_id: int) -> Dict[str, Any]:
     """Load all profile data in parallel."""
-    user, stats, position, mentor = await asyncio.gather(
+    user, stats, position, mentor, sketch = await asyncio.gather(
         get_user(user_id),
         get_user_stats(user_id),
         get_user_position(user_id),
-        get_user_mentor(user_id)
+        get_user_mentor(user_id),
+        get_profit_sketch("worker", user_id)
     )
-    return {"user": user, "stats": stats, "position": position, "mentor": mentor}
+    return {"user": user, "stats": stats, "position": position, "mentor": mentor, "sketch": sketch}
 
 
 async def get_main_menu_data(user_id: int) -> Dict[str, Any]:
@@ -841,38 +1040,55 @@ async def unban_user(user_id: int) -> None:
     cache.delete(f"user:{user_id}")
 
 
-async def get_team_stats_by_period(period: str) -> Dict[str, Any]:
-    """Get team statistics by period."""
-    from datetime import datetime, timedelta
-    
-    db = get_db()
-    now = datetime.utcnow()
-    
-    if period == "today":
-        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == "week":
-        start = now - timedelta(days=7)
-    elif period == "month":
-        start = now - timedelta(days=30)
-    else:  # all
-        start = datetime(2020, 1, 1)
+@swr_cached("dashboard", TTL_SHORT, TTL_LONG)
+async def get_dashboard_summary(top_limit: int = 5) -> Dict[str, Any]:
+    """Team summary for admin /stats and /analytics in one query (stale-while-revalidate).
     
-    # Get profits in period
-    profits = db.table("profits").select("net_profit, worker_id").gte("created_at", start.isoformat()).execute()
+    {"active_users", "periods": {all|month|week|day: {"total_profit", "profits_count",
+    "active_workers"}}, "top_workers": [...], "generated_at"}
+    """
+    result = get_db().rpc("get_dashboard_summary", {"p_top_limit": top_limit}).execute()
+    summary = result.data or {}
+    for stats in summary.get("periods", {}).values():
+        stats["total_profit"] = float(stats.get("total_profit") or 0)
+    for worker in summary.get("top_workers", []):
+        worker["total_profit"] = float(worker.get("total_profit") or 0)
+    return summary
+
+
+async def get_team_stats_by_period(period: str) -> Dict[str, Any]:
+    """Team statistics for period today/week/month/all.
     
-    total_profit = sum(float(p['net_profit']) for p in profits.data or [])
-    profits_count = len(profits.data or [])
-    active_workers = len(set(p['worker_id'] for p in profits.data or []))
-    avg_profit = total_profit / profits_count if profits_count > 0 else 0
+    Taken from get_dashboard_summary (aggregated in SQL over profit_daily_rollup):
+    week is the last 7 calendar days including today, month the calendar month.
+    """
+    summary = await get_dashboard_summary(5)
+    key = "day" if period == "today" else period
+    stats = summary.get("periods", {}).get(key, {})
     
+    total_profit = float(stats.get("total_profit") or 0)
+    profits_count = int(stats.get("profits_count") or 0)
     return {
         "total_profit": total_profit,
         "profits_count": profits_count,
-        "active_workers": active_workers,
-        "avg_profit": avg_profit
+        "active_workers": int(stats.get("active_workers") or 0),
+        "avg_profit": total_profit / profits_count if profits_count > 0 else 0
     }
 
 
+async def backfill_profit_rollup(date_from: str = None, date_to: str = None) -> int:
+    """Rebuild profit_daily_rollup from profits for [date_from, date_to] (ISO dates, None - open). Returns rows written."""
+    try:
+        result = get_db().rpc("backfill_profit_daily_rollup", {"p_from": date_from, "p_to": date_to}).execute()
+        cache.clear_prefix("top:")
+        cache.clear_prefix("stats:")
+        cache.clear_prefix("dashboard:")
+        return result.data or 0
+    except Exception as e:
+        logger.error(f"Error backfilling profit rollup: {e}")
+        return 0
+
+
 # ============================================
 # MENTOR PANEL FUNCTIONS
 # ============================================
@@ -883,32 +1099,130 @@ async def is_user_mentor(user_id: int) -> bool:
     return result.data if result.data is not None else False
 
 
-async def get_mentor_students(mentor_user_id: int) -> List[Dict[str, Any]]:
-    """Get mentor's students with statistics."""
+def _invalidate_mentor_roster(mentor_user_id: int) -> None:
+    """Drop cached roster pages and recipient ids of one mentor."""
+    cache.clear_prefix(f"mentor_students:{mentor_user_id}:")
+
+
+async def _invalidate_mentor_rosters(mentor_ids: Iterable[Optional[int]]) -> None:
+    """Drop cached rosters of mentors by mentors.id (their students, profits or deliverability changed)."""
+    for mentor_id in {m for m in mentor_ids if m}:
+        mentor = await get_mentor(mentor_id)
+        if mentor:
+            _invalidate_mentor_roster(mentor["user_id"])
+
+
+async def get_mentor_students_page(mentor_user_id: int, page: int = 0, per_page: int = 5,
+                                   sort: str = "profit") -> Tuple[List[Dict[str, Any]], int]:
+    """One page of mentor's students and their total number (cached short).
+    
+    sort: profit | earnings | activity | tag
+    """
+    key = f"mentor_students:{mentor_user_id}:page:{sort}:{page}:{per_page}"
+    result = cache.get(key)
+    if result is not None:
+        return result
+    
     try:
-        result = get_db().rpc("get_mentor_students", {"mentor_user_id_param": mentor_user_id}).execute()
-        logger.info(f"get_mentor_students for {mentor_user_id}: {len(result.data or [])} students")
-        return result.data or []
+        data = get_db().rpc("get_mentor_students_page", {
+            "p_mentor_user_id": mentor_user_id, "p_sort": sort,
+            "p_limit": per_page, "p_offset": page * per_page
+        }).execute()
+        rows = data.data or []
+        total = rows[0]["total_count"] if rows else 0
+        if not rows and page > 0:
+            # Page is past the end (students left) - total from the first page
+            _, total = await get_mentor_students_page(mentor_user_id, 0, per_page, sort)
+        result = (rows, total)
+        cache.set(key, result, TTL_SHORT)
+        return result
+    except Exception as e:
+        logger.error(f"Error in get_mentor_students_page: {e}")
+        return [], 0
+
+
+async def get_mentor_student_ids(mentor_user_id: int, deliverable_only: bool = True) -> List[int]:
+    """IDs of mentor's students (broadcast recipients by default, cached short)."""
+    key = f"mentor_students:{mentor_user_id}:ids:{deliverable_only}"
+    result = cache.get(key)
+    if result is not None:
+        return result
+    
+    try:
+        data = get_db().rpc("get_mentor_student_ids", {
+            "p_mentor_user_id": mentor_user_id, "p_deliverable_only": deliverable_only
+        }).execute()
+        result = [r["student_id"] for r in data.data or []]
+        cache.set(key, result, TTL_SHORT)
+        return result
     except Exception as e:
-        logger.error(f"Error in get_mentor_students: {e}")
+        logger.error(f"Error in get_mentor_student_ids: {e}")
         return []
 
 
-async def get_mentor_stats(mentor_user_id: int) -> Dict[str, Any]:
-    """Get mentor statistics."""
-    result = get_db().rpc("get_mentor_stats", {"mentor_user_id_param": mentor_user_id}).execute()
-    if result.data and len(result.data) > 0:
-        return result.data[0]
+_mentor_refreshing: Dict[int, asyncio.Task] = {}
+
+
+def _mentor_stats_view(row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Panel fields from a mentor_stats row."""
+    row = row or {}
+    students = row.get("students_count") or 0
+    hold, paid = float(row.get("hold_earned") or 0), float(row.get("paid_earned") or 0)
+    this_month = datetime.utcnow().strftime("%Y-%m-01")
     return {
-        "total_students": 0,
-        "active_students": 0,
-        "total_earned": 0,
-        "this_month_earned": 0,
-        "avg_student_profit": 0,
-        "top_student_profit": 0
+        "total_students": students,
+        "active_students": row.get("active_students") or 0,
+        "total_earned": hold + paid,
+        "hold_earned": hold,
+        "paid_earned": paid,
+        "this_month_earned": float(row.get("month_earned") or 0) if row.get("month_start") == this_month else 0,
+        "avg_student_profit": float(row.get("student_profit_sum") or 0) / students if students else 0,
+        "top_student_profit": float(row.get("top_student_profit") or 0)
     }
 
 
+async def refresh_mentor_stats(mentor_user_id: int) -> Dict[str, Any]:
+    """Recompute mentor_stats row in the database (active students, after manual edits)."""
+    result = get_db().rpc("refresh_mentor_stats", {"p_mentor_user_id": mentor_user_id}).execute()
+    stats = _mentor_stats_view(result.data[0] if result.data else None)
+    cache.set(f"mentor_stats:{mentor_user_id}", stats, TTL_SHORT)
+    return stats
+
+
+async def _refresh_mentor_stats_quietly(mentor_user_id: int) -> None:
+    try:
+        await refresh_mentor_stats(mentor_user_id)
+    except Exception as e:
+        logger.error(f"Mentor stats refresh for {mentor_user_id} failed: {e}")
+
+
+async def get_mentor_stats(mentor_user_id: int) -> Dict[str, Any]:
+    """Mentor statistics: one primary-key read of mentor_stats (maintained by triggers, cached short).
+    
+    Active students depend on time, so a row older than MENTOR_ACTIVE_REFRESH
+    is returned as is and recomputed in the background.
+    """
+    key = f"mentor_stats:{mentor_user_id}"
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+    
+    result = get_db().table("mentor_stats").select("*").eq("mentor_user_id", mentor_user_id).limit(1).execute()
+    if not result.data:
+        return await refresh_mentor_stats(mentor_user_id)
+    
+    row = result.data[0]
+    checked_at = datetime.fromisoformat(row["active_checked_at"].replace("Z", "+00:00")) if row.get("active_checked_at") else None
+    if checked_at is None or (datetime.now(checked_at.tzinfo) - checked_at).total_seconds() > config.MENTOR_ACTIVE_REFRESH:
+        task = _mentor_refreshing.get(mentor_user_id)
+        if task is None or task.done():
+            _mentor_refreshing[mentor_user_id] = asyncio.create_task(_refresh_mentor_stats_quietly(mentor_user_id))
+    
+    stats = _mentor_stats_view(row)
+    cache.set(key, stats, TTL_SHORT)
+    return stats
+
+
 async def update_mentor_channel(mentor_user_id: int, channel_name: str, description: str, invite_link: str) -> bool:
     """Update mentor's Telegram channel info."""
     try:
@@ -944,39 +1258,45 @@ async def get_mentor_channel_info(mentor_user_id: int) -> Optional[Dict[str, Any
         return None
 
 
-async def create_mentor_broadcast(mentor_user_id: int, message_text: str, message_type: str = "text", media_file_id: str = None) -> int:
-    """Create mentor broadcast."""
+async def create_mentor_broadcast(mentor_user_id: int, message_text: str, message_type: str = "text", media_file_id: str = None,
+                                  idempotency_key: str = None, progress_chat_id: int = None,
+                                  progress_message_id: int = None, progress_is_photo: bool = False) -> int:
+    """Create mentor broadcast. Returns 0 if a broadcast with this idempotency_key already exists."""
     try:
-        # Get students count
-        students = await get_mentor_students(mentor_user_id)
-        total_count = len(students)
+        # Get recipients (students the bot can still message)
+        student_ids = await get_mentor_student_ids(mentor_user_id)
+        total_count = len(student_ids)
         
         # Create broadcast
-        result = get_db().table("mentor_broadcasts").insert({
+        row = _insert_once("mentor_broadcasts", {
             "mentor_user_id": mentor_user_id,
             "message_text": message_text,
             "message_type": message_type,
             "media_file_id": media_file_id,
             "total_count": total_count,
+            "progress_chat_id": progress_chat_id,
+            "progress_message_id": progress_message_id,
+            "progress_is_photo": progress_is_photo,
             "status": "pending"
-        }).execute()
+        }, idempotency_key)
         
-        if result.data and len(result.data) > 0:
-            broadcast_id = result.data[0]["id"]
+        if row:
+            broadcast_id = row["id"]
             
             # Create recipients
             recipients = [
                 {
                     "broadcast_id": broadcast_id,
-                    "student_id": student["student_id"],
+                    "student_id": student_id,
                     "status": "pending"
                 }
-                for student in students
+                for student_id in student_ids
             ]
             
             if recipients:
                 get_db().table("mentor_broadcast_recipients").insert(recipients).execute()
             
+            _emit("mentor_broadcast_created", broadcast_id=broadcast_id)
             return broadcast_id
         return 0
     except Exception as e:
@@ -1031,6 +1351,32 @@ async def update_broadcast_recipient_status(broadcast_id: int, student_id: int,
         return False
 
 
+async def get_pending_recipient_ids(broadcast_id: int) -> List[int]:
+    """Get student IDs that have not received the broadcast yet."""
+    try:
+        result = get_db().table("mentor_broadcast_recipients").select("student_id").eq(
+            "broadcast_id", broadcast_id
+        ).eq("status", "pending").execute()
+        return [r["student_id"] for r in result.data or []]
+    except Exception as e:
+        logger.error(f"Error getting pending recipients: {e}")
+        return []
+
+
+async def save_broadcast_recipient_statuses(broadcast_id: int, statuses: List[Dict[str, Any]]) -> bool:
+    """Bulk update recipient statuses: [{"student_id", "status", "error_message"}]."""
+    if not statuses:
+        return True
+    try:
+        sent_at = datetime.utcnow().isoformat()
+        rows = [{"broadcast_id": broadcast_id, "sent_at": sent_at, **s} for s in statuses]
+        get_db().table("mentor_broadcast_recipients").upsert(rows, on_conflict="broadcast_id,student_id").execute()
+        return True
+    except Exception as e:
+        logger.error(f"Error saving broadcast recipient statuses: {e}")
+        return False
+
+
 async def update_broadcast_status(broadcast_id: int, status: str, sent_count: int = None) -> bool:
     """Update broadcast status."""
     try:
@@ -1050,37 +1396,288 @@ async def update_broadcast_status(broadcast_id: int, status: str, sent_count: in
         return False
 
 
-async def get_pending_broadcasts() -> List[Dict[str, Any]]:
-    """Get pending broadcasts for processing."""
+async def get_pending_broadcasts(include_sending: bool = False) -> List[Dict[str, Any]]:
+    """Get pending broadcasts for processing (plus interrupted ones if include_sending)."""
     try:
-        result = get_db().table("mentor_broadcasts").select("*").eq("status", "pending").execute()
+        statuses = ["pending", "sending"] if include_sending else ["pending"]
+        result = get_db().table("mentor_broadcasts").select("*").in_("status", statuses).order("id").execute()
         return result.data or []
     except Exception as e:
         logger.error(f"Error getting pending broadcasts: {e}")
         return []
 
 
-async def get_mentor_data(mentor_user_id: int) -> Dict[str, Any]:
-    """Load all mentor panel data in parallel."""
+# ============================================
+# BROADCAST JOBS
+# ============================================
+
+async def create_broadcast_job(admin_id: int, admin_username: str, title: str, message_text: str,
+                               photo_id: str = None, button_text: str = None, button_url: str = None,
+                               button_type: str = "url", progress_chat_id: int = None,
+                               progress_message_id: int = None, progress_is_photo: bool = False,
+                               idempotency_key: str = None) -> int:
+    """Create admin broadcast job. Returns 0 if a job with this idempotency_key already exists."""
     try:
-        stats, students, channel_info, broadcasts = await asyncio.gather(
-            get_mentor_stats(mentor_user_id),
-            get_mentor_students(mentor_user_id),
-            get_mentor_channel_info(mentor_user_id),
-            get_mentor_broadcasts(mentor_user_id, 5)
-        )
-        
-        return {
-            "stats": stats,
-            "students": students,
-            "channel_info": channel_info,
-            "broadcasts": broadcasts
-        }
+        row = _insert_once("broadcast_jobs", {
+            "admin_id": admin_id,
+            "admin_username": admin_username,
+            "title": title,
+            "message_text": message_text,
+            "photo_id": photo_id,
+            "button_text": button_text,
+            "button_url": button_url,
+            "button_type": button_type or "url",
+            "total_count": await count_active_users(),
+            "progress_chat_id": progress_chat_id,
+            "progress_message_id": progress_message_id,
+            "progress_is_photo": progress_is_photo,
+            "status": "pending"
+        }, idempotency_key)
+        return row["id"] if row else 0
+    except Exception as e:
+        logger.error(f"Error creating broadcast job: {e}")
+        return 0
+
+
+async def get_broadcast_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """Get broadcast job by ID."""
+    result = get_db().table("broadcast_jobs").select("*").eq("id", job_id).execute()
+    return result.data[0] if result.data else None
+
+
+async def get_unfinished_broadcast_jobs() -> List[Dict[str, Any]]:
+    """Get broadcast jobs that were not finished (for resume)."""
+    try:
+        result = get_db().table("broadcast_jobs").select("id").in_("status", ["pending", "sending"]).order("id").execute()
+        return result.data or []
+    except Exception as e:
+        logger.error(f"Error getting unfinished broadcast jobs: {e}")
+        return []
+
+
+async def update_broadcast_job(job_id: int, **fields) -> bool:
+    """Update broadcast job fields (status, cursor, counters)."""
+    try:
+        if fields.get("status") == "sending" and "started_at" not in fields:
+            fields["started_at"] = datetime.utcnow().isoformat()
+        if fields.get("status") in ("completed", "failed", "cancelled"):
+            fields["completed_at"] = datetime.utcnow().isoformat()
+        result = get_db().table("broadcast_jobs").update(fields).eq("id", job_id).execute()
+        return len(result.data) > 0
     except Exception as e:
-        logger.error(f"Error loading mentor data: {e}")
-        return {
-            "stats": {},
-            "students": [],
-            "channel_info": None,
-            "broadcasts": []
-        }
\ No newline at end of file
+        logger.error(f"Error updating broadcast job {job_id}: {e}")
+        return False
+
+
+async def get_broadcast_job_done_ids(job_id: int, user_ids: List[int]) -> set:
+    """Get IDs from `user_ids` that already have a delivery result."""
+    if not user_ids:
+        return set()
+    result = get_db().table("broadcast_job_recipients").select("user_id").eq("job_id", job_id).in_("user_id", user_ids).execute()
+    return {r["user_id"] for r in result.data or []}
+
+
+async def get_broadcast_job_counts(job_id: int) -> Dict[str, int]:
+    """Count delivery results by status."""
+    db = get_db()
+    counts = {}
+    for status in ("sent", "blocked", "failed"):
+        result = db.table("broadcast_job_recipients").select("user_id", count="exact").eq("job_id", job_id).eq("status", status).limit(1).execute()
+        counts[status] = result.count or 0
+    return counts
+
+
+async def save_broadcast_job_results(job_id: int, results: List[Dict[str, Any]]) -> bool:
+    """Bulk store delivery results: [{"user_id", "status", "error_message"}]."""
+    if not results:
+        return True
+    try:
+        rows = [{"job_id": job_id, **r} for r in results]
+        get_db().table("broadcast_job_recipients").upsert(rows, on_conflict="job_id,user_id").execute()
+        return True
+    except Exception as e:
+        logger.error(f"Error saving broadcast job results: {e}")
+        return False
+
+
+# ============================================
+# FSM STATES
+# ============================================
+
+async def get_fsm_records(keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Get non-expired FSM records (state + data) for keys in one query."""
+    if not keys:
+        return {}
+    result = get_db().table("fsm_states").select("key, state, data").in_("key", keys).gt("expires_at", datetime.utcnow().isoformat()).execute()
+    return {r["key"]: r for r in result.data or []}
+
+
+async def write_fsm_record(
+    key: str,
+    state: Optional[str] = None,
+    data: Optional[Dict[str, Any]] = None,
+    set_state: bool = False,
+    set_data: bool = False,
+    ttl_seconds: int = 86400
+) -> None:
+    """Write state and/or data of one FSM record (SQL: write_fsm_state). Raises on failure."""
+    get_db().rpc("write_fsm_state", {
+        "p_key": key,
+        "p_state": state,
+        "p_data": data if set_data else None,
+        "p_set_state": set_state,
+        "p_set_data": set_data,
+        "p_ttl_seconds": ttl_seconds
+    }).execute()
+
+
+async def purge_expired_fsm_states() -> int:
+    """Remove expired FSM records. Returns number removed."""
+    try:
+        result = get_db().rpc("purge_expired_fsm_states").execute()
+        return result.data or 0
+    except Exception as e:
+        logger.error(f"Error purging FSM states: {e}")
+        return 0
+
+
+# ============================================
+# PROCESSED UPDATES (dedup)
+# ============================================
+
+async def claim_update_keys(keys: List[str]) -> bool:
+    """Record update keys as processed. False if any of them was already recorded."""
+    try:
+        result = get_db().table("processed_updates").upsert(
+            [{"key": k} for k in keys], on_conflict="key", ignore_duplicates=True
+        ).execute()
+        return len(result.data or []) == len(keys)
+    except Exception as e:
+        # Fail open: better to process twice than to drop an update
+        logger.error(f"Error claiming update keys: {e}")
+        return True
+
+
+async def purge_processed_updates(older_than: int) -> None:
+    """Forget processed update keys older than `older_than` seconds."""
+    try:
+        cutoff = (datetime.utcnow() - timedelta(seconds=older_than)).isoformat()
+        get_db().table("processed_updates").delete().lt("created_at", cutoff).execute()
+    except Exception as e:
+        logger.error(f"Error purging processed updates: {e}")
+
+
+# ============================================
+# NOTIFICATION OUTBOX
+# ============================================
+
+async def enqueue_notifications(notifications: List[Dict[str, Any]]) -> int:
+    """Put notifications into the outbox: [{"kind", "chat_id", "text", "disable_preview", "dedup_key"}]."""
+    if not notifications:
+        return 0
+    try:
+        result = get_db().table("notification_outbox").upsert(
+            notifications, on_conflict="dedup_key", ignore_duplicates=True
+        ).execute()
+        count = len(result.data or [])
+        if count:
+            _emit("outbox_enqueued", count=count)
+        return count
+    except Exception as e:
+        logger.error(f"Error enqueuing notifications: {e}")
+        return 0
+
+
+async def claim_outbox_batch(limit: int, lock_seconds: int) -> List[Dict[str, Any]]:
+    """Lock due outbox messages for sending (SKIP LOCKED, safe with several replicas)."""
+    try:
+        result = get_db().rpc("claim_outbox", {"p_limit": limit, "p_lock_seconds": lock_seconds}).execute()
+        return result.data or []
+    except Exception as e:
+        logger.error(f"Error claiming outbox: {e}")
+        return []
+
+
+async def complete_outbox_items(ids: List[int]) -> None:
+    """Mark outbox messages as sent."""
+    if ids:
+        get_db().table("notification_outbox").update({
+            "status": "sent", "sent_at": datetime.utcnow().isoformat(), "locked_until": None, "last_error": None
+        }).in_("id", ids).execute()
+
+
+async def fail_outbox_item(item_id: int, error: str, retry_in: Optional[float] = None) -> None:
+    """Schedule a retry in `retry_in` seconds, or give up when it is None."""
+    fields = {"last_error": (error or "")[:500], "locked_until": None}
+    if retry_in is None:
+        fields["status"] = "failed"
+    else:
+        fields["status"] = "pending"
+        fields["next_attempt_at"] = (datetime.utcnow() + timedelta(seconds=retry_in)).isoformat()
+    get_db().table("notification_outbox").update(fields).eq("id", item_id).execute()
+
+
+# ============================================
+# EXPORT (keyset pages)
+# ============================================
+
+async def get_export_page(table: str, columns: str, after_id: int, limit: int,
+                          date_from: Optional[str] = None, date_to: Optional[str] = None,
+                          status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Next page of rows for export: id > after_id, optional created_at range [date_from, date_to) and status."""
+    query = get_db().table(table).select(columns).gt("id", after_id)
+    if date_from:
+        query = query.gte("created_at", date_from)
+    if date_to:
+        query = query.lt("created_at", date_to)
+    if status:
+        query = query.eq("status", status)
+    result = query.order("id").limit(limit).execute()
+    return result.data or []
+
+
+# ============================================
+# WEBAPP API (aggregates for mini apps)
+# ============================================
+
+@cached("user_profits", TTL_SHORT)
+async def get_user_profits_page(user_id: int, page: int = 0, per_page: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+    """Page of user's profits, newest first: (rows, total)."""
+    result = get_db().table("profits").select(
+        "id, amount, net_profit, service_name, status, created_at, paid_at", count="exact"
+    ).eq("worker_id", user_id).order("created_at", desc=True).range(
+        page * per_page, (page + 1) * per_page - 1
+    ).execute()
+    return result.data or [], result.count or 0
+
+
+async def get_user_profit_statuses(user_id: int) -> Dict[str, Dict[str, Any]]:
+    """Count and sum of user's profits per status: {"hold": {...}, "paid": {...}} (cached)."""
+    key = f"user_profits:{user_id}:statuses"
+    result = cache.get(key)
+    if result is not None:
+        return result
+    
+    data = get_db().rpc("get_user_profit_statuses", {"p_user_id": user_id}).execute()
+    result = {status: {"count": 0, "sum": 0.0} for status in ("hold", "paid")}
+    for r in data.data or []:
+        result[r["status"]] = {"count": r["profit_count"], "sum": float(r["profit_sum"])}
+    cache.set(key, result, TTL_SHORT)
+    return result
+
+
+@cached("daily", TTL_SHORT)
+async def get_daily_profit_series(worker_id: Optional[int] = None, days: int = 42) -> List[Dict[str, Any]]:
+    """Profit per day for the last `days` days (worker, or whole team for None). Days without profits are omitted."""
+    result = get_db().rpc("get_daily_profit_series", {"p_worker_id": worker_id, "p_days": days}).execute()
+    return [
+        {"day": r["day"], "profit": float(r["profit_sum"]), "count": r["profit_count"]}
+        for r in result.data or []
+    ]
+
+
+@cached("referral_roster", TTL_SHORT)
+async def get_referral_roster(user_id: int) -> List[Dict[str, Any]]:
+    """User's referrals with earnings from each, newest first."""
+    result = get_db().rpc("get_referral_roster", {"p_referrer_id": user_id}).execute()
+    return result.data or []
@@ -0,0 +1,146 @@
+"""
+Persistent FSM storage.
+State and data live in one Supabase row per key. Writes go to the database
+before returning (write-through) and then update a local cache, which
+serves reads for FSM_CACHE_TTL seconds.
+"""
+import copy
+import json
+import logging
+import time
+from typing import Optional, Dict, Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType, KeyBuilder, DefaultKeyBuilder
+from aiogram.fsm.storage.memory import MemoryStorage
+
+import config
+from database.db import get_fsm_records, write_fsm_record
+
+logger = logging.getLogger(__name__)
+
+# Cached field not known yet (the other one was written without a read)
+_UNKNOWN = object()
+
+# Drop expired cache entries every N operations
+EVICT_EVERY = 500
+
+
+class SupabaseStorage(BaseStorage):
+    """FSM storage in the fsm_states table with a local write-through cache.
+
+    One row holds both state and data. set_state/set_data write only their
+    own column via write_fsm_state, so they never overwrite each other; the
+    cache is updated only after the write succeeded. Reads are served from
+    the cache for `cache_ttl` seconds (0 - always read the database, needed
+    when several webhook replicas share dialogs). Rows expire `state_ttl`
+    seconds after the last write.
+    """
+
+    def __init__(
+        self,
+        key_builder: Optional[KeyBuilder] = None,
+        state_ttl: int = config.FSM_STATE_TTL,
+        cache_ttl: float = config.FSM_CACHE_TTL
+    ):
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self.state_ttl = state_ttl
+        self.cache_ttl = cache_ttl
+        self._records: Dict[str, Dict[str, Any]] = {}  # key -> {"state", "data", "until"}
+        self._ops = 0
+
+    # ---------- cache ----------
+
+    def _cached(self, k: str, field: str) -> Any:
+        record = self._records.get(k)
+        if record and record["until"] > time.monotonic():
+            return record[field]
+        return _UNKNOWN
+
+    def _remember(self, k: str, **fields: Any) -> None:
+        if self.cache_ttl <= 0:
+            return
+        record = self._records.get(k)
+        if not record or record["until"] <= time.monotonic():
+            record = {"state": _UNKNOWN, "data": _UNKNOWN}
+        record.update(fields)
+        record["until"] = time.monotonic() + self.cache_ttl
+        self._records[k] = record
+
+        self._ops += 1
+        if self._ops >= EVICT_EVERY:
+            self._ops = 0
+            now = time.monotonic()
+            self._records = {key: r for key, r in self._records.items() if r["until"] > now}
+
+    # ---------- database ----------
+
+    async def _read(self, key: StorageKey, field: str) -> Any:
+        k = self.key_builder.build(key)
+        value = self._cached(k, field)
+        if value is not _UNKNOWN:
+            return value
+        try:
+            row = (await get_fsm_records([k])).get(k)
+        except Exception as e:
+            logger.error(f"FSM load failed for {k}: {e}")
+            raise
+        state, data = (row["state"], row["data"] or {}) if row else (None, {})
+        self._remember(k, state=state, data=data)
+        return state if field == "state" else data
+
+    async def _write(self, key: StorageKey, field: str, value: Any) -> None:
+        k = self.key_builder.build(key)
+        try:
+            await write_fsm_record(k, ttl_seconds=self.state_ttl, **{field: value, f"set_{field}": True})
+        except Exception as e:
+            # The row may or may not have changed - read it again next time
+            self._records.pop(k, None)
+            logger.error(f"FSM write failed for {k}: {e}")
+            raise
+        self._remember(k, **{field: value})
+
+    # ---------- BaseStorage ----------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._write(key, "state", state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._read(key, "state")
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        try:
+            # Reject up front: stored JSON must round-trip to the same values
+            json.dumps(data)
+        except (TypeError, ValueError) as e:
+            raise TypeError(f"FSM data must be JSON-serializable: {e}") from e
+        await self._write(key, "data", copy.deepcopy(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return copy.deepcopy(await self._read(key, "data"))
+
+    async def close(self) -> None:
+        self._records.clear()
+
+
+def create_fsm_storage() -> BaseStorage:
+    """FSM storage selected by config.FSM_STORAGE."""
+    backend = config.FSM_STORAGE
+
+    if backend == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+            return RedisStorage.from_url(
+                config.FSM_REDIS_URL,
+                key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+                state_ttl=config.FSM_STATE_TTL,
+                data_ttl=config.FSM_STATE_TTL
+            )
+        except ImportError:
+            logger.error("redis package not installed, using Supabase FSM storage")
+            backend = "supabase"
+
+    if backend == "supabase":
+        return SupabaseStorage()
+
+    return MemoryStorage()
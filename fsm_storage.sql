@@ -0,0 +1,72 @@
+-- ============================================
+-- FSM STATES - ОБЩЕЕ ХРАНИЛИЩЕ СОСТОЯНИЙ ДИАЛОГОВ
+-- ============================================
+
+-- Состояние FSM (регистрация, мастер профита, черновики рассылок и т.д.).
+-- state и data хранятся в одной строке, чтобы читать их одним запросом.
+-- Незавершённые диалоги переживают перезапуск и видны всем репликам бота.
+CREATE TABLE IF NOT EXISTS fsm_states (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data JSONB NOT NULL DEFAULT '{}'::jsonb,
+    expires_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_fsm_states_expires ON fsm_states(expires_at);
+
+COMMENT ON TABLE fsm_states IS 'Состояния FSM aiogram (ключ: fsm:<bot>:<chat>:<user>:<destiny>)';
+COMMENT ON COLUMN fsm_states.expires_at IS 'После этого момента запись считается пустой (продлевается при каждой записи)';
+
+-- Запись state и/или data одним запросом (write-through из бота).
+-- Незаписываемая часть сохраняется, если строка не просрочена, иначе сбрасывается.
+-- Пустая запись (state IS NULL и data = {}) удаляется.
+CREATE OR REPLACE FUNCTION write_fsm_state(
+    p_key TEXT,
+    p_state TEXT,
+    p_data JSONB,
+    p_set_state BOOLEAN,
+    p_set_data BOOLEAN,
+    p_ttl_seconds INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO fsm_states AS f (key, state, data, expires_at, updated_at)
+    VALUES (
+        p_key,
+        CASE WHEN p_set_state THEN p_state END,
+        CASE WHEN p_set_data THEN COALESCE(p_data, '{}'::jsonb) ELSE '{}'::jsonb END,
+        NOW() + make_interval(secs => p_ttl_seconds),
+        NOW()
+    )
+    ON CONFLICT (key) DO UPDATE SET
+        state = CASE
+            WHEN p_set_state THEN p_state
+            WHEN f.expires_at < NOW() THEN NULL
+            ELSE f.state
+        END,
+        data = CASE
+            WHEN p_set_data THEN COALESCE(p_data, '{}'::jsonb)
+            WHEN f.expires_at < NOW() THEN '{}'::jsonb
+            ELSE f.data
+        END,
+        expires_at = EXCLUDED.expires_at,
+        updated_at = NOW();
+
+    DELETE FROM fsm_states
+    WHERE key = p_key AND state IS NULL AND data = '{}'::jsonb;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Удаление просроченных состояний (бот вызывает при старте,
+-- можно также повесить на pg_cron)
+CREATE OR REPLACE FUNCTION purge_expired_fsm_states()
+RETURNS INTEGER AS $$
+DECLARE
+    removed INTEGER;
+BEGIN
+    DELETE FROM fsm_states WHERE expires_at < NOW();
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    RETURN removed;
+END;
+$$ LANGUAGE plpgsql;
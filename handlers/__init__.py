@@ -11,6 +11,7 @@ from handlers.admin_close import router as admin_close_router
 from handlers.admin_direct_payments import router as admin_direct_payments_router
 from handlers.community_create import router as community_create_router
 from handlers.admin_communities import router as admin_communities_router
+from handlers.admin_export import router as admin_export_router
 
 __all__ = [
     "registration_router",
@@ -25,4 +26,5 @@ __all__ = [
     "admin_direct_payments_router",
     "community_create_router",
     "admin_communities_router",
+    "admin_export_router",
 ]
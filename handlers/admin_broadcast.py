@@ -2,14 +2,14 @@
 import logging
 import asyncio
 import re
+import uuid
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
-from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
 
 from states.all_states import AdminBroadcastState
 from keyboards.admin_kb import get_back_to_admin_keyboard, get_broadcast_confirm_keyboard, get_broadcast_type_keyboard
-from database import get_active_user_ids, log_admin_action
+from database import count_active_users, create_broadcast_job, log_admin_action
 from middlewares.admin import admin_only
 
 logger = logging.getLogger(__name__)
@@ -143,11 +143,12 @@ async def receive_button(message: Message, state: FSMContext) -> None:
             await message.answer("❌ Формат: Текст | действие")
             return
     
-    await state.update_data(button_text=btn_text, button_url=btn_url, button_type=btn_type)
+    # Ключ идемпотентности: повторное подтверждение не запустит вторую рассылку
+    await state.update_data(button_text=btn_text, button_url=btn_url, button_type=btn_type, idempotency_key=uuid.uuid4().hex)
     await state.set_state(AdminBroadcastState.waiting_for_confirm)
     
     data = await state.get_data()
-    users = await get_active_user_ids()
+    users_count = await count_active_users()
     
     preview = f"📢 <b>ПРЕДПРОСМОТР - Шаг 4/4</b>\n\n<b>{data['title']}</b>\n\n{data['text']}\n\n"
     if btn_text:
@@ -165,7 +166,7 @@ async def receive_button(message: Message, state: FSMContext) -> None:
             preview += f"🔘 {btn_text}\n🔗 {btn_url}\n\n"
     if data.get("photo_id"):
         preview += "🖼 С фото\n\n"
-    preview += f"👥 Получателей: {len(users)}\n\nОтправить?"
+    preview += f"👥 Получателей: {users_count}\n\nОтправить?"
     
     await message.answer(preview, reply_markup=get_broadcast_confirm_keyboard())
 
@@ -178,59 +179,33 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
     data = await state.get_data()
     await state.clear()
     
-    msg_text = f"<b>{data['title']}</b>\n\n{data['text']}"
-    keyboard = None
-    if data.get('button_text'):
-        if data.get('button_type') == 'callback':
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text=data['button_text'], callback_data=data['button_url'])]
-            ])
-        else:
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text=data['button_text'], url=data['button_url'])]
-            ])
-    
-    users = await get_active_user_ids()
-    success, fail, blocked = 0, 0, 0
-    photo_id = data.get("photo_id")
-    
     from utils.messages import edit_with_brand
-    await edit_with_brand(callback, f"📤 <b>ОТПРАВКА</b>\n\n👥 {len(users)}\n✅ 0\n❌ 0")
+    from utils.broadcast_engine import broadcast_engine
     
-    for i, user_id in enumerate(users, 1):
-        try:
-            if photo_id:
-                await callback.bot.send_photo(user_id, photo=photo_id, caption=msg_text, reply_markup=keyboard, parse_mode="HTML")
-            else:
-                await callback.bot.send_message(user_id, msg_text, reply_markup=keyboard, parse_mode="HTML")
-            success += 1
-            
-            if i % 20 == 0:
-                try:
-                    await edit_with_brand(callback, f"📤 <b>ОТПРАВКА</b>\n\n👥 {len(users)}\n✅ {success}\n❌ {fail}\n🚫 {blocked}\n⏳ {i}/{len(users)}")
-                except:
-                    pass
-            
-            await asyncio.sleep(0.05)
-        except TelegramForbiddenError:
-            blocked += 1
-        except TelegramRetryAfter as e:
-            await asyncio.sleep(e.retry_after)
-            try:
-                if photo_id:
-                    await callback.bot.send_photo(user_id, photo=photo_id, caption=msg_text, reply_markup=keyboard, parse_mode="HTML")
-                else:
-                    await callback.bot.send_message(user_id, msg_text, reply_markup=keyboard, parse_mode="HTML")
-                success += 1
-            except:
-                fail += 1
-        except:
-            fail += 1
+    await edit_with_brand(callback, "📤 <b>ОТПРАВКА</b>\n\n⏳ Рассылка поставлена в очередь...")
+    
+    job_id = await create_broadcast_job(
+        admin_id=callback.from_user.id,
+        admin_username=callback.from_user.username,
+        title=data['title'],
+        message_text=f"<b>{data['title']}</b>\n\n{data['text']}",
+        photo_id=data.get("photo_id"),
+        button_text=data.get('button_text'),
+        button_url=data.get('button_url'),
+        button_type=data.get('button_type'),
+        progress_chat_id=callback.message.chat.id,
+        progress_message_id=callback.message.message_id,
+        progress_is_photo=bool(callback.message.photo),
+        idempotency_key=data.get("idempotency_key") or f"broadcast:{callback.id}"
+    )
     
-    await log_admin_action(callback.from_user.id, callback.from_user.username, "broadcast", f"{success}/{len(users)}: {data['title'][:30]}")
+    if not job_id or not broadcast_engine:
+        # 0 также при повторном подтверждении - рассылка уже создана первым нажатием
+        await edit_with_brand(callback, "❌ Рассылка не запущена (ошибка или уже запущена)", reply_markup=get_back_to_admin_keyboard())
+        return
     
-    pct = (success / len(users) * 100) if users else 0
-    await edit_with_brand(callback, f"✅ <b>ГОТОВО!</b>\n\n👥 {len(users)}\n✅ {success}\n❌ {fail}\n🚫 {blocked}\n📊 {pct:.1f}%", reply_markup=get_back_to_admin_keyboard())
+    # Отправка идёт в фоне, прогресс обновляется в этом же сообщении
+    broadcast_engine.submit(job_id)
 
 
 @router.callback_query(F.data == "cancel_broadcast", AdminBroadcastState.waiting_for_confirm)
@@ -0,0 +1,124 @@
+"""Admin export of profits and payouts as a document (/export)."""
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Set
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, FSInputFile
+
+import config
+from database import log_admin_action
+from middlewares.admin import admin_only
+from utils.export import EXPORTS, FORMATS, export_to_file, parquet_available
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+TABLE_ALIASES = {
+    "profits": "profits", "профиты": "profits",
+    "referral": "referral_profits", "referral_profits": "referral_profits", "рефы": "referral_profits",
+    "mentor": "mentor_profits", "mentor_profits": "mentor_profits", "наставники": "mentor_profits",
+}
+
+USAGE = (
+    "📤 <b>ЭКСПОРТ</b>\n\n"
+    "<code>/export [таблица] [с] [по] [hold|paid] [csv|parquet]</code>\n\n"
+    "Таблицы: profits, referral, mentor\n"
+    "Даты: 2024-01-31 или 31.01.2024 (включительно)\n\n"
+    "Пример: <code>/export profits 01.01.2024 31.01.2024 paid</code>"
+)
+
+# Admins with an export in progress
+_running: Set[int] = set()
+
+
+def _parse_date(token: str) -> Optional[datetime]:
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(token, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+def parse_export_args(args: Optional[str]) -> Optional[Dict[str, Any]]:
+    """'/export mentor 01.01.2024 paid parquet' -> options, None if a token is not understood."""
+    options = {"table": "profits", "date_from": None, "date_to": None, "status": None, "fmt": "csv",
+               "period": "за всё время"}
+    dates = []
+    for token in (args or "").lower().split():
+        if token in TABLE_ALIASES:
+            options["table"] = TABLE_ALIASES[token]
+        elif token in ("hold", "paid"):
+            options["status"] = token
+        elif token in FORMATS:
+            options["fmt"] = token
+        elif (day := _parse_date(token)) and len(dates) < 2:
+            dates.append(day)
+        else:
+            return None
+    if dates:
+        options["date_from"] = dates[0].date().isoformat()
+        options["period"] = f"с {dates[0]:%d.%m.%Y}"
+    if len(dates) == 2:
+        # "по" включительно: граница - начало следующего дня
+        options["date_to"] = (dates[1] + timedelta(days=1)).date().isoformat()
+        options["period"] += f" по {dates[1]:%d.%m.%Y}"
+    return options
+
+
+@router.message(Command("export", "экспорт"))
+@admin_only
+async def cmd_export(message: Message, command: CommandObject) -> None:
+    options = parse_export_args(command.args)
+    if options is None:
+        await message.answer(USAGE)
+        return
+    if options["fmt"] == "parquet" and not parquet_available():
+        await message.answer("❌ Parquet недоступен (не установлен pyarrow). Используйте csv.")
+        return
+
+    admin_id = message.from_user.id
+    if admin_id in _running:
+        await message.answer("⏳ Экспорт уже выполняется, дождитесь файла.")
+        return
+    from utils.progress import ProgressReporter
+    spec = EXPORTS[options["table"]]
+
+    path = progress = None
+    _running.add(admin_id)
+    try:
+        status_msg = await message.answer(f"⏳ <b>{spec.title}</b>: выгрузка...")
+        progress = ProgressReporter.for_message(message.bot, status_msg)
+        path, count = await export_to_file(
+            options["table"], options["fmt"], options["date_from"], options["date_to"], options["status"],
+            on_progress=lambda n: progress.update(f"⏳ <b>{spec.title}</b>: {n} строк...")
+        )
+        if not count:
+            await progress.finish(f"📭 <b>{spec.title}</b>: нет строк за выбранный период.")
+            return
+
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        if size_mb > config.EXPORT_MAX_FILE_MB:
+            await progress.finish(f"❌ Файл {size_mb:.0f} МБ больше лимита Telegram. Сузьте период или выберите parquet.")
+            return
+
+        filename = f"{options['table']}_{datetime.utcnow():%Y%m%d_%H%M}.{options['fmt']}"
+        await message.bot.send_document(
+            message.chat.id, FSInputFile(path, filename=filename),
+            caption=f"📤 <b>{spec.title}</b>\n📅 {options['period']}\n📄 {count} строк"
+                    + (f" • {options['status']}" if options["status"] else "")
+        )
+        await progress.finish(f"✅ <b>{spec.title}</b>: выгружено {count} строк.")
+        await log_admin_action(admin_id, message.from_user.username, "export",
+                               f"{options['table']} {options['fmt']} {count} rows")
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        if progress is not None:
+            await progress.finish("❌ Ошибка экспорта.")
+    finally:
+        _running.discard(admin_id)
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -55,6 +55,8 @@ async def show_worker_payouts(callback: CallbackQuery) -> None:
         # Показываем тег вместо имени
         display_name = item.get('user_tag', f"@{item['username']}" if item['username'] else item['full_name'])
         lines.append(f"🏷 {display_name} • {item['total_unpaid']:.0f} ₽ ({item['count']})")
+    if len(summary) > 10:
+        lines.append(f"\n… и ещё {len(summary) - 10}. Полный список: /export profits hold")
     
     await edit_with_brand(callback, "\n".join(lines), reply_markup=get_payout_keyboard(summary))
 
@@ -76,6 +78,8 @@ async def show_referral_payouts(callback: CallbackQuery) -> None:
         # Показываем тег вместо имени для рефералов
         display_name = item.get('referrer_tag', f"@{item['referrer_username']}" if item.get('referrer_username') else item.get('referrer_name', 'N/A'))
         lines.append(f"🏷 {display_name} • {item['total_unpaid']:.0f} ₽ ({item['count']})")
+    if len(summary) > 10:
+        lines.append(f"\n… и ещё {len(summary) - 10}. Полный список: /export referral hold")
     
     await edit_with_brand(callback, "\n".join(lines), reply_markup=get_referral_payout_keyboard(summary))
 
@@ -97,6 +101,8 @@ async def show_mentor_payouts(callback: CallbackQuery) -> None:
         # Показываем тег вместо имени для наставников
         display_name = item.get('mentor_tag', f"@{item['mentor_username']}" if item.get('mentor_username') else item.get('mentor_name', 'N/A'))
         lines.append(f"🏷 {display_name} • {item['total_unpaid']:.0f} ₽ ({item['count']})")
+    if len(summary) > 10:
+        lines.append(f"\n… и ещё {len(summary) - 10}. Полный список: /export mentor hold")
     
     await edit_with_brand(callback, "\n".join(lines), reply_markup=get_mentor_payout_keyboard(summary))
 
@@ -112,17 +118,22 @@ async def payout_all(callback: CallbackQuery) -> None:
         await edit_with_brand(callback, "❌ Нет ожидающих выплат", reply_markup=get_back_to_admin_keyboard())
         return
     
+    from utils.progress import ProgressReporter
+    progress = ProgressReporter.for_message(callback.bot, callback.message)
+    
     count = 0
-    for item in summary:
-        await mark_profits_paid(item['user_id'])
-        try:
-            await callback.bot.send_message(item['user_id'], "💸 <b>ВЫПЛАТА ОТПРАВЛЕНА!</b>\n\nПроверьте кошелек. 💎")
-        except:
-            pass
-        count += 1
+    for i, item in enumerate(summary, 1):
+        # 0 - уже выплачено параллельным/повторным нажатием, не уведомляем
+        if await mark_profits_paid(item['user_id']):
+            try:
+                await callback.bot.send_message(item['user_id'], "💸 <b>ВЫПЛАТА ОТПРАВЛЕНА!</b>\n\nПроверьте кошелек. 💎")
+            except:
+                pass
+            count += 1
+        progress.update(f"💸 <b>ВЫПЛАТА ВСЕМ</b>\n\n⏳ {i}/{len(summary)}\n✅ Выплачено: {count}")
     
     await log_admin_action(callback.from_user.id, callback.from_user.username, "payout_all", f"Выплачено {count} воркерам")
-    await edit_with_brand(callback, f"✅ Выплачено {count} воркерам!", reply_markup=get_back_to_admin_keyboard())
+    await progress.finish(f"✅ Выплачено {count} воркерам!", get_back_to_admin_keyboard())
 
 
 @router.callback_query(F.data.startswith("payout_"))
@@ -136,6 +147,11 @@ async def process_payout(callback: CallbackQuery) -> None:
     count = await mark_profits_paid(user_id)
     user = await get_user(user_id)
     
+    from utils.messages import edit_with_brand
+    if not count:
+        await edit_with_brand(callback, "ℹ️ Нет ожидающих начислений (уже выплачено)", reply_markup=get_back_to_admin_keyboard())
+        return
+    
     await log_admin_action(callback.from_user.id, callback.from_user.username, "payout", f"@{user['username']} ({count})", user_id)
     
     try:
@@ -143,7 +159,6 @@ async def process_payout(callback: CallbackQuery) -> None:
     except:
         pass
     
-    from utils.messages import edit_with_brand
     await edit_with_brand(callback, f"✅ Выплата: {user['full_name']}\nПрофитов: {count}", reply_markup=get_back_to_admin_keyboard())
 
 
@@ -156,6 +171,11 @@ async def process_referral_payout(callback: CallbackQuery) -> None:
     count = await mark_referral_profits_paid(user_id)
     user = await get_user(user_id)
     
+    from utils.messages import edit_with_brand
+    if not count:
+        await edit_with_brand(callback, "ℹ️ Нет ожидающих начислений (уже выплачено)", reply_markup=get_back_to_admin_keyboard())
+        return
+    
     await log_admin_action(callback.from_user.id, callback.from_user.username, "referral_payout", f"@{user['username']} ({count})", user_id)
     
     try:
@@ -163,7 +183,6 @@ async def process_referral_payout(callback: CallbackQuery) -> None:
     except:
         pass
     
-    from utils.messages import edit_with_brand
     await edit_with_brand(callback, f"✅ Реферальная выплата: {user['full_name']}\nНачислений: {count}", reply_markup=get_back_to_admin_keyboard())
 
 
@@ -176,6 +195,11 @@ async def process_mentor_payout(callback: CallbackQuery) -> None:
     count = await mark_mentor_profits_paid(user_id)
     user = await get_user(user_id)
     
+    from utils.messages import edit_with_brand
+    if not count:
+        await edit_with_brand(callback, "ℹ️ Нет ожидающих начислений (уже выплачено)", reply_markup=get_back_to_admin_keyboard())
+        return
+    
     await log_admin_action(callback.from_user.id, callback.from_user.username, "mentor_payout", f"@{user['username']} ({count})", user_id)
     
     try:
@@ -183,7 +207,6 @@ async def process_mentor_payout(callback: CallbackQuery) -> None:
     except:
         pass
     
-    from utils.messages import edit_with_brand
     await edit_with_brand(callback, f"✅ Выплата наставнику: {user['full_name']}\nНачислений: {count}", reply_markup=get_back_to_admin_keyboard())
 
 
@@ -429,7 +452,9 @@ async def show_stats_period(callback: CallbackQuery) -> None:
         await edit_with_brand(callback, "\n".join(lines), reply_markup=get_back_to_admin_keyboard())
         return
     
-    stats = await get_team_stats_by_period(period)
+    # Колоночная копия профитов в памяти, если включена и загружена
+    from utils.analytics_store import team_period_stats
+    stats = team_period_stats(period) or await get_team_stats_by_period(period)
     
     period_names = {"today": "СЕГОДНЯ", "week": "НЕДЕЛЯ", "month": "МЕСЯЦ", "all": "ВСЁ ВРЕМЯ"}
     
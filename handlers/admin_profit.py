@@ -1,12 +1,11 @@
 """Admin profit creation handlers."""
 import logging
-import asyncio
 import os
-from aiogram import Router, F, Bot
-from aiogram.types import Message, CallbackQuery, FSInputFile
+import uuid
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command
-from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest
 
 from states.all_states import AdminProfitState
 from keyboards.admin_kb import (
@@ -15,39 +14,29 @@ from keyboards.admin_kb import (
 )
 from database import (
     get_user_by_username, get_user, get_services, get_service,
-    create_profit, get_user_stats, get_user_mentor, update_mentor_stats,
+    create_profit, get_user_stats, get_user_mentor,
     log_admin_action, log_rank_change, create_notification,
     get_user_referrer, update_referrer_earnings, create_referral_profit,
     create_mentor_profit
 )
 from config import ADMIN_IDS, PROFITS_CHANNEL_ID, REFERRAL_PERCENT, BRAND_IMAGE_LOGO, BRAND_IMAGE_PROFIT
 from middlewares.admin import admin_only
-from utils.ranks import get_rank_info, check_rank_up, get_rank_reward_message
+from utils.ranks import get_rank_info, rank_for, check_rank_up, get_rank_reward_message
 
 logger = logging.getLogger(__name__)
 router = Router()
 
-# Cache for profit image file_id
-_profit_image_cache: str = None
-
-
-async def send_profit_to_channel(
-    bot: Bot,
-    profit_id: int,
-    worker_name: str,
-    worker_username: str,
+def profit_channel_text(
     worker_tag: str,
     service_name: str,
     amount: float,
     net_profit: float,
     percent: int
-) -> bool:
-    """Send profit notification to channel with text-top layout."""
-    global _profit_image_cache
-    
+) -> str:
+    """Profit post for the channel (text-top layout with image link)."""
     # Элегантный стиль сообщения (Белая тема) с встроенной картинкой
     # Используем тег вместо username
-    caption = (
+    return (
         f"▫️<b>ПРОФИТ</b> от {worker_tag}\n"
         f"  ╭• 🛠 <b>Сервис:</b> {service_name}\n"
         f"  ╰• 🏳️ <b>Страна:</b> Россия🇷🇺\n"
@@ -58,41 +47,6 @@ async def send_profit_to_channel(
         f"<i>▫️ Отличная работа! Продолжаем так же</i>"
         f"<a href='https://ebon-pi.vercel.app/d51435ba-5023-442d-8152-bca2cddda485.png'>&#8288;</a>"
     )
-    
-    for attempt in range(3):
-        try:
-            # Отправляем как текстовое сообщение с встроенной картинкой
-            await bot.send_message(
-                chat_id=PROFITS_CHANNEL_ID,
-                text=caption,
-                parse_mode="HTML",
-                disable_web_page_preview=False  # Включаем предпросмотр для отображения картинки
-            )
-            logger.info(f"Profit #{profit_id} sent to channel with image URL in text")
-            return True
-            
-        except TelegramRetryAfter as e:
-            logger.warning(f"Rate limited, waiting {e.retry_after}s")
-            await asyncio.sleep(e.retry_after)
-            continue
-            
-        except TelegramBadRequest as e:
-            if "chat not found" in str(e).lower():
-                logger.error(f"Channel {PROFITS_CHANNEL_ID} not found! Check bot is admin in channel.")
-            elif "not enough rights" in str(e).lower():
-                logger.error(f"Bot has no rights to post in channel {PROFITS_CHANNEL_ID}")
-            else:
-                logger.error(f"Telegram error: {e}")
-            return False
-            
-        except Exception as e:
-            logger.error(f"Send to channel failed (attempt {attempt + 1}): {e}")
-            if attempt < 2:
-                await asyncio.sleep(1)
-                continue
-            return False
-    
-    return False
 
 
 @router.message(Command("admin"))
@@ -259,7 +213,8 @@ async def receive_stage(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
     
     stage = "Депозит" if callback.data == "stage_deposit" else "Налог"
-    await state.update_data(stage=stage)
+    # Ключ идемпотентности: повторное подтверждение не создаст второй профит
+    await state.update_data(stage=stage, idempotency_key=uuid.uuid4().hex)
     await state.set_state(AdminProfitState.waiting_for_confirm)
     
     data = await state.get_data()
@@ -334,7 +289,6 @@ async def confirm_profit(callback: CallbackQuery, state: FSMContext) -> None:
     
     if referrer:
         referral_cut = amount * (REFERRAL_PERCENT / 100)
-        await update_referrer_earnings(referrer['id'], referral_cut)
     
     mentor = await get_user_mentor(data["worker_id"])
     mentor_cut = 0
@@ -345,39 +299,19 @@ async def confirm_profit(callback: CallbackQuery, state: FSMContext) -> None:
     if mentor and mentor['service_name'].lower() == data["service_name"].lower():
         mentor_cut = profit_with_bonus * (mentor['percent'] / 100)
         net_profit = profit_with_bonus - mentor_cut
-        await update_mentor_stats(mentor['id'], mentor_cut)
     
     old_total = worker_stats['total_profit']
-    profit_id = await create_profit(data["worker_id"], amount, net_profit, data["service_name"])
-    
-    if referrer and referral_cut > 0:
-        await create_referral_profit(referrer['id'], data["worker_id"], profit_id, referral_cut)
-    
-    if mentor and mentor_cut > 0 and mentor['service_name'].lower() == data["service_name"].lower():
-        await create_mentor_profit(mentor['id'], mentor['user_id'], data["worker_id"], profit_id, mentor_cut, mentor['percent'])
-    
-    # Check rank up
     new_total = old_total + net_profit
     rank_up = check_rank_up(old_total, new_total)
-    
-    if rank_up:
-        old_rank = get_rank_info(old_total)
-        await log_rank_change(data["worker_id"], old_rank['name'], rank_up['name'], old_rank['level'], rank_up['level'], new_total)
-        await create_notification(data["worker_id"], "rank_up", f"🎉 {rank_up['emoji']} {rank_up['name']}!", get_rank_reward_message(rank_up))
-        
-        try:
-            await callback.bot.send_message(data["worker_id"], get_rank_reward_message(rank_up))
-        except:
-            pass
-    
-    await log_admin_action(callback.from_user.id, callback.from_user.username or callback.from_user.full_name, "create_profit", f"#{profit_id}: {amount:.2f} RUB @{data['worker_username']}", data["worker_id"])
-    
-    # Notify worker
-    try:
-        bonus_text = f"\n┠• 🎁 Бонус: +{bonus:.2f} ₽" if bonus > 0 else ""
-        mentor_text = f"\n┠• 👨‍🏫 Наставник: -{mentor_cut:.2f} ₽" if mentor_cut > 0 else ""
-        
-        caption = (
+    worker_tag = data.get('worker_tag', '#irl_???')
+    
+    # Все уведомления пишутся в outbox вместе с профитом и отправляются в фоне
+    bonus_text = f"\n┠• 🎁 Бонус: +{bonus:.2f} ₽" if bonus > 0 else ""
+    mentor_text = f"\n┠• 👨‍🏫 Наставник: -{mentor_cut:.2f} ₽" if mentor_cut > 0 else ""
+    notifications = [{
+        "kind": "profit_worker",
+        "chat_id": data["worker_id"],
+        "text": (
             f"╭• 💎 <b>НОВЫЙ ПРОФИТ!</b>\n"
             f"┠• 🛠 Сервис: {data['service_name']}\n"
             f"<blockquote>"
@@ -387,59 +321,64 @@ async def confirm_profit(callback: CallbackQuery, state: FSMContext) -> None:
             f"</blockquote>\n"
             f"┖• ⏳ <i>Средства на удержании</i>"
         )
-        
-        await callback.bot.send_message(
-            data["worker_id"], caption, parse_mode="HTML"
-        )
-        logger.info(f"Worker {data['worker_id']} notified about profit #{profit_id}")
-    except Exception as e:
-        logger.error(f"Notify worker failed: {e}")
-    
-    # Notify mentor
-    if mentor and mentor_cut > 0:
-        try:
-            mentor_msg = (
-                 f"╭• 🦢 <b>ПРОФИТ ОТ УЧЕНИКА</b>\n"
-                 f"┠• 👤 Воркер: {data.get('worker_tag', '#irl_???')}\n"
-                 f"┖• 💸 Ваша доля: <b>{mentor_cut:.2f} RUB</b>"
-            )
-            
-            await callback.bot.send_message(
-                mentor['user_id'], mentor_msg, parse_mode="HTML"
+    }]
+    if rank_up:
+        notifications.append({"kind": "rank_up", "chat_id": data["worker_id"], "text": get_rank_reward_message(rank_up)})
+    if mentor_cut > 0:
+        notifications.append({
+            "kind": "profit_mentor",
+            "chat_id": mentor['user_id'],
+            "text": (
+                f"╭• 🦢 <b>ПРОФИТ ОТ УЧЕНИКА</b>\n"
+                f"┠• 👤 Воркер: {worker_tag}\n"
+                f"┖• 💸 Ваша доля: <b>{mentor_cut:.2f} RUB</b>"
             )
-        except:
-            pass
-    
-    # Notify referrer
+        })
     if referrer and referral_cut > 0:
-        try:
-            ref_msg = (
+        notifications.append({
+            "kind": "profit_referrer",
+            "chat_id": referrer['id'],
+            "text": (
                 f"╭• 🔗 <b>РЕФЕРАЛЬНЫЙ ДОХОД</b>\n"
-                f"┠• 👤 Реферал: {data.get('worker_tag', '#irl_???')}\n"
+                f"┠• 👤 Реферал: {worker_tag}\n"
                 f"┖• 💸 Ваша доля: <b>{referral_cut:.2f} RUB</b>"
             )
-            
-            await callback.bot.send_message(
-                referrer['id'], ref_msg, parse_mode="HTML"
-            )
-        except:
-            pass
-    
-    # Send to profits channel
-    await send_profit_to_channel(
-        callback.bot,
-        profit_id=profit_id,
-        worker_name=data['worker_name'],
-        worker_username=data['worker_username'],
-        worker_tag=data.get('worker_tag', '#irl_???'),
-        service_name=data['service_name'],
-        amount=amount,
-        net_profit=net_profit,
-        percent=percent
+        })
+    # Картинка в канале показывается через превью ссылки
+    notifications.append({
+        "kind": "profit_channel",
+        "chat_id": PROFITS_CHANNEL_ID,
+        "text": profit_channel_text(worker_tag, data['service_name'], amount, net_profit, percent),
+        "disable_preview": False
+    })
+    
+    profit_id = await create_profit(
+        data["worker_id"], amount, net_profit, data["service_name"],
+        idempotency_key=data.get("idempotency_key") or f"profit:{callback.id}",
+        notifications=notifications
     )
     
     from utils.messages import edit_with_brand
-    await edit_with_brand(callback, f"╭• ✅ <b>ПРОФИТ #{profit_id} СОЗДАН!</b>\n┖• Отправлен в канал и ЛС.", reply_markup=get_back_to_admin_keyboard())
+    if not profit_id:
+        # Повторное подтверждение - профит уже создан, начисления не дублируем
+        await edit_with_brand(callback, "╭• ⚠️ <b>Профит уже создан</b>\n┖• Повторное подтверждение пропущено.", reply_markup=get_back_to_admin_keyboard())
+        return
+    
+    if referrer and referral_cut > 0:
+        await update_referrer_earnings(referrer['id'], referral_cut)
+        await create_referral_profit(referrer['id'], data["worker_id"], profit_id, referral_cut)
+    
+    if mentor_cut > 0:
+        await create_mentor_profit(mentor['id'], mentor['user_id'], data["worker_id"], profit_id, mentor_cut, mentor['percent'])
+    
+    if rank_up:
+        old_rank = rank_for(old_total)
+        await log_rank_change(data["worker_id"], old_rank.name, rank_up['name'], old_rank.level, rank_up['level'], new_total)
+        await create_notification(data["worker_id"], "rank_up", f"🎉 {rank_up['emoji']} {rank_up['name']}!", get_rank_reward_message(rank_up))
+    
+    await log_admin_action(callback.from_user.id, callback.from_user.username or callback.from_user.full_name, "create_profit", f"#{profit_id}: {amount:.2f} RUB @{data['worker_username']}", data["worker_id"])
+    
+    await edit_with_brand(callback, f"╭• ✅ <b>ПРОФИТ #{profit_id} СОЗДАН!</b>\n┖• Уведомления и пост в канал отправляются.", reply_markup=get_back_to_admin_keyboard())
 
 
 @router.callback_query(F.data == "cancel_profit", AdminProfitState.waiting_for_confirm)
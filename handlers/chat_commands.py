@@ -2,16 +2,23 @@
 import logging
 from aiogram import Router, F
 from aiogram.filters import Command
-from aiogram.types import Message, FSInputFile, CallbackQuery
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from database import (
-    get_user, get_user_stats, get_top_workers, get_user_position,
-    get_direct_payment_settings, get_active_user_ids, get_team_stats_by_period,
+    get_user, get_user_stats, get_user_position,
+    get_direct_payment_settings, get_dashboard_summary, get_profit_sketch,
     get_mentors, get_services, get_resources, get_referral_stats, get_user_referrals,
     update_user_tag, is_tag_available, get_service, get_mentors_by_service
 )
-from config import ADMIN_IDS, BRAND_IMAGE_LOGO
+from config import (
+    ADMIN_IDS, BRAND_IMAGE_LOGO, BRAND_IMAGE_PROFILE, BRAND_IMAGE_PAYMENTS, BRAND_IMAGE_PROFITS,
+    BRAND_IMAGE_MENTORS, BRAND_IMAGE_SERVICES, BRAND_IMAGE_COMMUNITY, BRAND_IMAGE_MAIN_MENU,
+    BRAND_IMAGE_REFERRALS
+)
+from utils.media import media_registry
+from utils.leaderboard import leaderboard
+from utils.quantiles import QuantileSketch, format_histogram
 from utils.auto_delete import reply_with_auto_delete, reply_photo_with_auto_delete, is_group_chat
 from states.all_states import ChangeTagState
 
@@ -22,7 +29,7 @@ router = Router()
 @router.message(Command("help"))
 async def cmd_help(message: Message) -> None:
     try:
-        photo = FSInputFile("images/irl.jpg")
+        photo = media_registry.photo(BRAND_IMAGE_LOGO)
         await reply_photo_with_auto_delete(message, 
             photo=photo,
             caption="📋 <b>КОМАНДЫ</b>\n\n"
@@ -105,7 +112,7 @@ async def cmd_me(message: Message) -> None:
     ])
     
     try:
-        photo = FSInputFile("images/profile.JPG")
+        photo = media_registry.photo(BRAND_IMAGE_PROFILE)
         await reply_photo_with_auto_delete(message, photo=photo, caption=text, reply_markup=keyboard, delay=10, delete_original=True)
     except Exception:
         await reply_with_auto_delete(message, text, reply_markup=keyboard, delay=10, delete_original=True)
@@ -125,7 +132,7 @@ async def cmd_card(message: Message) -> None:
     text += f"📸 Скрин: @{settings['support_username']}"
     
     try:
-        photo = FSInputFile("images/Реквизиты.jpg")
+        photo = media_registry.photo(BRAND_IMAGE_PAYMENTS)
         await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
     except Exception:
         await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -133,42 +140,29 @@ async def cmd_card(message: Message) -> None:
 
 @router.message(Command("top"))
 async def cmd_top(message: Message) -> None:
-    await _show_top(message, "all", "ЗА ВСЁ ВРЕМЯ")
+    await _show_top(message, "all")
 
 
 @router.message(Command("topm"))
 async def cmd_topm(message: Message) -> None:
-    await _show_top(message, "month", "ЗА МЕСЯЦ")
+    await _show_top(message, "month")
 
 
 @router.message(Command("topw"))
 async def cmd_topw(message: Message) -> None:
-    await _show_top(message, "week", "ЗА НЕДЕЛЮ")
+    await _show_top(message, "week")
 
 
 @router.message(Command("topd"))
 async def cmd_topd(message: Message) -> None:
-    await _show_top(message, "day", "ЗА ДЕНЬ")
+    await _show_top(message, "day")
 
 
-async def _show_top(message: Message, period: str, title: str) -> None:
-    workers = await get_top_workers(period, 10)
-    
-    if not workers:
-        await reply_with_auto_delete(message, f"🏆 Топ {title.lower()}\n\nНет данных.", delay=10, delete_original=True)
-        return
-    
-    medals = ["🥇", "🥈", "🥉"]
-    text = f"🏆 <b>ТОП-10 {title}</b>\n\n"
-    
-    for i, w in enumerate(workers[:10], 1):
-        medal = medals[i-1] if i <= 3 else f"{i}."
-        # Показываем тег вместо имени
-        display_name = w.get('user_tag', '#irl_???')
-        text += f"{medal} <b>{display_name}</b>\n   💰 {w['total_profit']:.2f} RUB • {w['profit_count']} шт\n"
+async def _show_top(message: Message, period: str) -> None:
+    text = await leaderboard.caption(period)
     
     try:
-        photo = FSInputFile("images/профиты.jpg")
+        photo = media_registry.photo(BRAND_IMAGE_PROFITS)
         await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
     except Exception:
         await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -179,14 +173,16 @@ async def cmd_kasa(message: Message) -> None:
     """Показать кассу команды за все время."""
     try:
         # Получаем статистику команды за все время
-        team_stats = await get_team_stats_by_period("all")
-        top_workers = await get_top_workers("all", 5)
+        summary = await get_dashboard_summary(5)
+        team_stats = summary["periods"]["all"]
+        top_workers = summary["top_workers"]
+        avg_profit = team_stats['total_profit'] / team_stats['profits_count'] if team_stats['profits_count'] else 0
         
         text = "💰 <b>КАССА КОМАНДЫ</b>\n\n"
         text += f"💵 Общий профит: <b>{team_stats['total_profit']:.2f} RUB</b>\n"
         text += f"📊 Количество профитов: <b>{team_stats['profits_count']}</b>\n"
         text += f"👥 Активных воркеров: <b>{team_stats['active_workers']}</b>\n"
-        text += f"📈 Средний профит: <b>{team_stats['avg_profit']:.2f} RUB</b>\n\n"
+        text += f"📈 Средний профит: <b>{avg_profit:.2f} RUB</b>\n\n"
         
         if top_workers:
             text += "🏆 <b>ТОП-5 ВОРКЕРОВ:</b>\n"
@@ -196,7 +192,7 @@ async def cmd_kasa(message: Message) -> None:
                 text += f"{i}. {display_name} - {worker['total_profit']:.2f} RUB\n"
         
         try:
-            photo = FSInputFile("images/irl.jpg")
+            photo = media_registry.photo(BRAND_IMAGE_LOGO)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -245,7 +241,7 @@ async def cmd_kurator(message: Message) -> None:
         keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
         
         try:
-            photo = FSInputFile("images/home.jpg")
+            photo = media_registry.photo(BRAND_IMAGE_MENTORS)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, reply_markup=keyboard, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, reply_markup=keyboard, delay=10, delete_original=True)
@@ -290,7 +286,7 @@ async def cmd_services(message: Message) -> None:
         keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
         
         try:
-            photo = FSInputFile("images/sevices.JPG")
+            photo = media_registry.photo(BRAND_IMAGE_SERVICES)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, reply_markup=keyboard, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, reply_markup=keyboard, delay=10, delete_original=True)
@@ -336,7 +332,7 @@ async def cmd_resources(message: Message) -> None:
         keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
         
         try:
-            photo = FSInputFile("images/home.jpg")
+            photo = media_registry.photo(BRAND_IMAGE_COMMUNITY)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, reply_markup=keyboard, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, reply_markup=keyboard, delay=10, delete_original=True)
@@ -376,7 +372,7 @@ async def cmd_community(message: Message) -> None:
         keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
         
         try:
-            photo = FSInputFile("images/home.jpg")
+            photo = media_registry.photo(BRAND_IMAGE_COMMUNITY)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, reply_markup=keyboard, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, reply_markup=keyboard, delay=10, delete_original=True)
@@ -394,14 +390,11 @@ async def cmd_analytics(message: Message) -> None:
         return
     
     try:
-        # Получаем статистику за разные периоды
-        team_all = await get_team_stats_by_period("all")
-        team_month = await get_team_stats_by_period("month")
-        team_week = await get_team_stats_by_period("week")
-        team_today = await get_team_stats_by_period("today")
-        
-        users = await get_active_user_ids()
-        top_workers = await get_top_workers("all", 5)
+        # Вся сводка одним запросом
+        summary = await get_dashboard_summary(5)
+        periods = summary["periods"]
+        team_all, team_month, team_week, team_today = periods["all"], periods["month"], periods["week"], periods["day"]
+        top_workers = summary["top_workers"]
         
         text = "📊 <b>АНАЛИТИКА КОМАНДЫ</b>\n\n"
         
@@ -412,11 +405,21 @@ async def cmd_analytics(message: Message) -> None:
         text += f"╰ Сегодня: {team_today['total_profit']:.2f} RUB\n\n"
         
         text += "👥 <b>АКТИВНОСТЬ:</b>\n"
-        text += f"├ Всего воркеров: {len(users)}\n"
+        text += f"├ Всего воркеров: {summary['active_users']}\n"
         text += f"├ Активных за месяц: {team_month['active_workers']}\n"
         text += f"├ Активных за неделю: {team_week['active_workers']}\n"
         text += f"╰ Активных сегодня: {team_today['active_workers']}\n\n"
         
+        # Распределение профитов: перцентили и гистограмма из скетча
+        sketch = QuantileSketch.from_row(await get_profit_sketch("team", "all"))
+        if sketch.count:
+            p50, p90, p99 = sketch.quantiles(0.5, 0.9, 0.99)
+            text += "📈 <b>РАСПРЕДЕЛЕНИЕ:</b>\n"
+            text += f"├ Медиана: {p50:.0f} RUB\n"
+            text += f"├ p90: {p90:.0f} RUB\n"
+            text += f"╰ p99: {p99:.0f} RUB\n"
+            text += format_histogram(sketch.histogram()) + "\n\n"
+        
         if top_workers:
             text += "🏆 <b>ТОП-5:</b>\n"
             for i, worker in enumerate(top_workers, 1):
@@ -425,7 +428,7 @@ async def cmd_analytics(message: Message) -> None:
                 text += f"{i}. {display_name} - {worker['total_profit']:.2f} RUB\n"
         
         try:
-            photo = FSInputFile("images/home.jpg")
+            photo = media_registry.photo(BRAND_IMAGE_MAIN_MENU)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -448,7 +451,7 @@ async def cmd_ideas(message: Message) -> None:
         text += "📝 Отправляйте свои идеи администраторам!"
         
         try:
-            photo = FSInputFile("images/home.jpg")
+            photo = media_registry.photo(BRAND_IMAGE_MAIN_MENU)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -462,14 +465,14 @@ async def cmd_ideas(message: Message) -> None:
 async def cmd_info(message: Message) -> None:
     """Показать основную информацию о команде."""
     try:
-        users = await get_active_user_ids()
-        team_stats = await get_team_stats_by_period("all")
+        summary = await get_dashboard_summary(5)
+        team_stats = summary["periods"]["all"]
         services = await get_services()
         
         text = "ℹ️ <b>ИНФОРМАЦИЯ О КОМАНДЕ</b>\n\n"
         text += "🏢 <b>IRL Team</b> - команда профессионалов\n\n"
         text += "📊 <b>СТАТИСТИКА:</b>\n"
-        text += f"├ Участников: {len(users)}\n"
+        text += f"├ Участников: {summary['active_users']}\n"
         text += f"├ Общий профит: {team_stats['total_profit']:.2f} RUB\n"
         text += f"├ Сервисов: {len(services)}\n"
         text += f"╰ Активных воркеров: {team_stats['active_workers']}\n\n"
@@ -477,7 +480,7 @@ async def cmd_info(message: Message) -> None:
         text += "📱 Команды: /help"
         
         try:
-            photo = FSInputFile("images/irl.jpg")
+            photo = media_registry.photo(BRAND_IMAGE_LOGO)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -500,7 +503,7 @@ async def cmd_rules(message: Message) -> None:
     text += "📞 Вопросы к администрации"
     
     try:
-        photo = FSInputFile("images/home.jpg")
+        photo = media_registry.photo(BRAND_IMAGE_MAIN_MENU)
         await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
     except Exception:
         await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -523,7 +526,7 @@ async def cmd_support(message: Message) -> None:
         text += "⏰ Время ответа: до 24 часов"
         
         try:
-            photo = FSInputFile("images/home.jpg")
+            photo = media_registry.photo(BRAND_IMAGE_MAIN_MENU)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -551,6 +554,16 @@ async def cmd_referral(message: Message) -> None:
         text += f"👥 Приглашено: <b>{ref_stats['count']}</b>\n"
         text += f"💰 Заработано: <b>{ref_stats['earnings']:.2f} RUB</b>\n\n"
         
+        # Команда по уровням (рефералы рефералов)
+        if len(ref_stats['levels']) > 1:
+            text += f"🌳 <b>КОМАНДА: {ref_stats['team']}</b>\n"
+            for level in ref_stats['levels']:
+                text += (
+                    f"├ {level['depth']} ур.: {level['members']} чел. "
+                    f"(активных {level['active']}) • {level['profit_sum']:.0f} RUB\n"
+                )
+            text += f"╰ Профит команды: {ref_stats['team_profit']:.2f} RUB\n\n"
+        
         if referrals:
             text += "📋 <b>ВАШИ РЕФЕРАЛЫ:</b>\n"
             for i, ref in enumerate(referrals[:5], 1):  # Первые 5
@@ -566,7 +579,7 @@ async def cmd_referral(message: Message) -> None:
         text += "📱 Ваша ссылка в боте: /start"
         
         try:
-            photo = FSInputFile("images/profile.JPG")
+            photo = media_registry.photo(BRAND_IMAGE_REFERRALS)
             await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
         except Exception:
             await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -649,7 +662,7 @@ async def cmd_quick(message: Message) -> None:
     text += "📋 Все команды: /help"
     
     try:
-        photo = FSInputFile("images/irl.jpg")
+        photo = media_registry.photo(BRAND_IMAGE_LOGO)
         await reply_photo_with_auto_delete(message, photo=photo, caption=text, delay=10, delete_original=True)
     except Exception:
         await reply_with_auto_delete(message, text, delay=10, delete_original=True)
@@ -660,21 +673,15 @@ async def cmd_stats(message: Message) -> None:
     if message.from_user.id not in ADMIN_IDS:
         return
     
-    users = await get_active_user_ids()
-    top_all = await get_top_workers("all", 100)
-    top_month = await get_top_workers("month", 100)
-    top_day = await get_top_workers("day", 100)
-    
-    total_all = sum(w['total_profit'] for w in top_all)
-    total_month = sum(w['total_profit'] for w in top_month)
-    total_day = sum(w['total_profit'] for w in top_day)
+    summary = await get_dashboard_summary(5)
+    periods = summary["periods"]
     
     await reply_with_auto_delete(message, 
         f"📊 <b>СТАТИСТИКА</b>\n\n"
-        f"👥 Активных: <b>{len(users)}</b>\n\n"
-        f"💰 Всего: <b>{total_all:.2f} RUB</b>\n"
-        f"├ Месяц: {total_month:.2f} RUB\n"
-        f"╰ День: {total_day:.2f} RUB"
+        f"👥 Активных: <b>{summary['active_users']}</b>\n\n"
+        f"💰 Всего: <b>{periods['all']['total_profit']:.2f} RUB</b>\n"
+        f"├ Месяц: {periods['month']['total_profit']:.2f} RUB\n"
+        f"╰ День: {periods['day']['total_profit']:.2f} RUB"
     )
 
 
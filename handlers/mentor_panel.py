@@ -1,6 +1,7 @@
 """Mentor panel handlers."""
 import logging
 import asyncio
+import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
@@ -15,18 +16,21 @@ from keyboards.mentor_kb import (
     get_channel_create_keyboard, get_back_to_mentor_panel_keyboard
 )
 from database import (
-    is_user_mentor, get_mentor_data, get_mentor_students, get_mentor_stats,
+    is_user_mentor, get_mentor_students_page, get_mentor_student_ids, get_mentor_stats,
     get_mentor_channel_info, update_mentor_channel, create_mentor_broadcast,
-    get_mentor_broadcasts, get_broadcast_recipients, get_user_mentor_profits
+    get_mentor_broadcasts, get_broadcast_recipients, get_user_mentor_profits, get_profit_sketch
 )
 from utils.messages import edit_with_brand, answer_with_brand
 from utils.design import header
+from utils.quantiles import QuantileSketch
 from states.all_states import MentorBroadcastState, MentorChannelState
 from config import BRAND_IMAGE_MENTORS
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+STUDENTS_PER_PAGE = 5
+
 
 def _format_date(date_str: str) -> str:
     """Format date for display."""
@@ -37,8 +41,16 @@ def _format_date(date_str: str) -> str:
         return date_str[:16] if len(date_str) > 16 else date_str
 
 
-def _build_mentor_stats_text(stats: dict) -> str:
+def _build_mentor_stats_text(stats: dict, sketch: Optional[dict] = None) -> str:
     """Build mentor statistics text."""
+    distribution = QuantileSketch.from_row(sketch)
+    typical = ""
+    if distribution.count:
+        p50, p90 = distribution.quantiles(0.5, 0.9)
+        typical = (
+            f"├ Медиана профита студента: {p50:.0f} RUB\n"
+            f"├ 90% профитов студентов: до {p90:.0f} RUB\n"
+        )
     return (
         f"{header('Статистика наставника', '📊')}\n\n"
         f"👥 <b>Студенты:</b>\n"
@@ -46,24 +58,24 @@ def _build_mentor_stats_text(stats: dict) -> str:
         f"└ Активных: {stats.get('active_students', 0)}\n\n"
         f"💰 <b>Доходы:</b>\n"
         f"├ Всего заработано: {stats.get('total_earned', 0):.2f} RUB\n"
+        f"├ В холде: {stats.get('hold_earned', 0):.2f} RUB • Выплачено: {stats.get('paid_earned', 0):.2f} RUB\n"
         f"├ За этот месяц: {stats.get('this_month_earned', 0):.2f} RUB\n"
         f"├ Средний профит студента: {stats.get('avg_student_profit', 0):.2f} RUB\n"
+        f"{typical}"
         f"└ Лучший профит студента: {stats.get('top_student_profit', 0):.2f} RUB"
     )
 
 
-def _build_students_text(students: list, page: int = 0, per_page: int = 5) -> tuple[str, int]:
-    """Build students list text with pagination."""
-    if not students:
+def _build_students_text(page_students: list, total: int, page: int = 0, per_page: int = 5) -> tuple[str, int]:
+    """Build students list text for one page."""
+    if not total:
         return f"{header('Мои студенты', '👥')}\n\n<i>У вас пока нет студентов.</i>", 1
     
-    total_pages = max(1, -(-len(students) // per_page))
-    page = max(0, min(page, total_pages - 1))
+    total_pages = max(1, -(-total // per_page))
     start = page * per_page
-    page_students = students[start:start + per_page]
     
     text = f"{header('Мои студенты', '👥')}\n\n"
-    text += f"<i>Стр. {page + 1}/{total_pages} • Всего: {len(students)}</i>\n\n"
+    text += f"<i>Стр. {page + 1}/{total_pages} • Всего: {total}</i>\n\n"
     
     for i, student in enumerate(page_students, start + 1):
         tag = student.get('student_tag', '#irl_???')
@@ -136,9 +148,8 @@ async def show_mentor_panel(callback: CallbackQuery) -> None:
         await callback.answer("❌ Вы не являетесь наставником", show_alert=True)
         return
     
-    # Load mentor data
-    data = await get_mentor_data(callback.from_user.id)
-    stats = data.get('stats', {})
+    # Load mentor stats (students list is loaded per page on its own screen)
+    stats = await get_mentor_stats(callback.from_user.id)
     
     text = (
         f"{header('Панель наставника', '👨‍🏫')}\n\n"
@@ -162,8 +173,10 @@ async def show_mentor_stats(callback: CallbackQuery) -> None:
     """Show detailed mentor statistics."""
     await callback.answer()
     
-    stats = await get_mentor_stats(callback.from_user.id)
-    text = _build_mentor_stats_text(stats)
+    stats, sketch = await asyncio.gather(
+        get_mentor_stats(callback.from_user.id), get_profit_sketch("mentor", callback.from_user.id)
+    )
+    text = _build_mentor_stats_text(stats, sketch)
     
     await edit_with_brand(
         callback, text,
@@ -190,10 +203,14 @@ async def show_mentor_students(callback: CallbackQuery) -> None:
             page = 0
     
     try:
-        students = await get_mentor_students(callback.from_user.id)
-        logger.info(f"Found {len(students)} students for mentor {callback.from_user.id}")
+        students, total = await get_mentor_students_page(callback.from_user.id, page, STUDENTS_PER_PAGE)
+        total_pages = max(1, -(-total // STUDENTS_PER_PAGE))
+        if page >= total_pages:
+            # Roster shrank since the keyboard was built
+            page = total_pages - 1
+            students, total = await get_mentor_students_page(callback.from_user.id, page, STUDENTS_PER_PAGE)
         
-        text, total_pages = _build_students_text(students, page)
+        text, total_pages = _build_students_text(students, total, page, STUDENTS_PER_PAGE)
         
         # Проверяем что текст не пустой
         if not text or not text.strip():
@@ -295,9 +312,8 @@ async def process_broadcast_message(message: Message, state: FSMContext) -> None
         await message.reply("❌ Сообщение слишком длинное (максимум 4096 символов).")
         return
     
-    # Get students count
-    students = await get_mentor_students(message.from_user.id)
-    students_count = len(students)
+    # Get recipients count
+    students_count = len(await get_mentor_student_ids(message.from_user.id))
     
     text = (
         f"{header('Подтверждение рассылки', '✅')}\n\n"
@@ -309,7 +325,8 @@ async def process_broadcast_message(message: Message, state: FSMContext) -> None
     
     await state.update_data(
         message_text=message.text,
-        students_count=students_count
+        students_count=students_count,
+        idempotency_key=uuid.uuid4().hex
     )
     
     await message.reply(text, reply_markup=get_broadcast_confirm_keyboard())
@@ -328,9 +345,8 @@ async def process_broadcast_photo(message: Message, state: FSMContext) -> None:
         await message.reply("❌ Подпись слишком длинная (максимум 1024 символа).")
         return
     
-    # Get students count
-    students = await get_mentor_students(message.from_user.id)
-    students_count = len(students)
+    # Get recipients count
+    students_count = len(await get_mentor_student_ids(message.from_user.id))
     
     text = (
         f"{header('Подтверждение рассылки', '✅')}\n\n"
@@ -343,29 +359,35 @@ async def process_broadcast_photo(message: Message, state: FSMContext) -> None:
     await state.update_data(
         message_text=caption,
         media_file_id=message.photo[-1].file_id,
-        students_count=students_count
+        students_count=students_count,
+        idempotency_key=uuid.uuid4().hex
     )
     
     await message.reply(text, reply_markup=get_broadcast_confirm_keyboard())
     await state.set_state(MentorBroadcastState.waiting_for_confirm)
 
 
-@router.callback_query(F.data == "mentor_broadcast_confirm")
+@router.callback_query(F.data == "mentor_broadcast_confirm", MentorBroadcastState.waiting_for_confirm)
 async def confirm_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
     """Confirm and create broadcast."""
     await callback.answer()
     
     data = await state.get_data()
+    await state.clear()
     broadcast_type = data.get('broadcast_type', 'text')
     message_text = data.get('message_text', '')
     media_file_id = data.get('media_file_id')
     
-    # Create broadcast
+    # Create broadcast (same key on repeated confirm -> no second broadcast)
     broadcast_id = await create_mentor_broadcast(
         callback.from_user.id,
         message_text,
         broadcast_type,
-        media_file_id
+        media_file_id,
+        idempotency_key=data.get('idempotency_key') or f"mentor_broadcast:{callback.id}",
+        progress_chat_id=callback.message.chat.id,
+        progress_message_id=callback.message.message_id,
+        progress_is_photo=bool(callback.message.photo)
     )
     
     if broadcast_id:
@@ -373,7 +395,7 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
             f"✅ <b>РАССЫЛКА СОЗДАНА</b>\n\n"
             f"📢 Рассылка #{broadcast_id} добавлена в очередь\n"
             f"👥 Будет отправлена {data.get('students_count', 0)} студентам\n\n"
-            f"📊 Следите за статусом в истории рассылок"
+            f"📊 Прогресс появится в этом сообщении"
         )
     else:
         text = "❌ Ошибка создания рассылки. Попробуйте позже."
@@ -382,8 +404,6 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
         callback, text,
         reply_markup=get_back_to_mentor_panel_keyboard()
     )
-    
-    await state.clear()
 
 
 @router.callback_query(F.data == "mentor_broadcast_cancel")
@@ -29,6 +29,7 @@ from database import (
 )
 from utils.messages import answer_with_brand, edit_with_brand
 from utils.design import header, profit_card
+from utils.quantiles import QuantileSketch
 from config import ADMIN_IDS, BRAND_IMAGE_LOGO, BRAND_IMAGE_MAIN_MENU, BRAND_IMAGE_PROFILE, BRAND_IMAGE_SERVICES, BRAND_IMAGE_MENTORS, BRAND_IMAGE_REFERRALS, BRAND_IMAGE_PROFITS, BRAND_IMAGE_PAYMENTS, BRAND_IMAGE_COMMUNITY, WEBSITE_URL
 from states.all_states import CommunityCreateState
 
@@ -53,7 +54,8 @@ def _format_date(date_str: str) -> str:
         return date_str[:16] if len(date_str) > 16 else date_str
 
 
-def _build_profile_text(user: dict, stats: dict, position: dict, mentor: Optional[dict]) -> str:
+def _build_profile_text(user: dict, stats: dict, position: dict, mentor: Optional[dict],
+                        sketch: Optional[dict] = None) -> str:
     """Build profile text."""
     mentor_name = "Отсутствует"
     if mentor:
@@ -64,6 +66,13 @@ def _build_profile_text(user: dict, stats: dict, position: dict, mentor: Optiona
     user_tag = user.get('user_tag', '#irl_???')
     username = f"@{user['username']}" if user.get('username') else "—"
     
+    # Типичный профит: медиана и p90 из скетча (без выгрузки истории)
+    distribution = QuantileSketch.from_row(sketch)
+    typical = ""
+    if distribution.count >= 3:
+        p50, p90 = distribution.quantiles(0.5, 0.9)
+        typical = f"┣ Медиана: {p50:.0f} RUB • 90%: до {p90:.0f} RUB\n"
+    
     return (
         f"🏷 <b>Ваш тег:</b> {user_tag}\n\n"
         f"👤 <b>Информация о профиле:</b>\n"
@@ -76,6 +85,7 @@ def _build_profile_text(user: dict, stats: dict, position: dict, mentor: Optiona
         f"┣ За Неделю: {stats.get('week_profit', 0):.2f} RUB\n"
         f"┣ За Месяц: {stats.get('month_profit', 0):.2f} RUB\n"
         f"┣ Рекорд: {stats.get('max_profit', 0):.2f} RUB\n"
+        f"{typical}"
         f"┗ Место в топе: {position['overall_rank']} из {position['total_users']}"
     )
 
@@ -195,7 +205,7 @@ async def text_profile(message: Message) -> None:
         await message.answer("❌ Ошибка")
         return
     
-    text = _build_profile_text(data["user"], data["stats"], data["position"], data["mentor"])
+    text = _build_profile_text(data["user"], data["stats"], data["position"], data["mentor"], data["sketch"])
     static_kb = get_main_static_keyboard()
     await answer_with_brand(message, text, reply_markup=get_profile_keyboard(), image_path=BRAND_IMAGE_PROFILE, static_keyboard=static_kb)
 
@@ -236,13 +246,13 @@ async def show_profile(callback: CallbackQuery) -> None:
         await callback.answer("❌ Ошибка", show_alert=True)
         return
     
-    text = _build_profile_text(data["user"], data["stats"], data["position"], data["mentor"])
+    text = _build_profile_text(data["user"], data["stats"], data["position"], data["mentor"], data["sketch"])
     await edit_with_brand(callback, text, reply_markup=get_profile_keyboard(), image_path=BRAND_IMAGE_PROFILE)
 
 
 @router.callback_query(F.data == "referral_link")
 async def show_referral_link(callback: CallbackQuery) -> None:
-    from config import BOT_USERNAME, REFERRAL_PERCENT
+    from config import BOT_USERNAME, REFERRAL_PERCENT, REFERRAL_TREE_DEPTH
     await callback.answer()
     
     ref_stats = await get_referral_stats(callback.from_user.id)
@@ -253,6 +263,7 @@ async def show_referral_link(callback: CallbackQuery) -> None:
         f"💰 Получай <b>{REFERRAL_PERCENT}%</b> от профитов приглашенных!\n\n"
         f"📊 <b>Твоя статистика:</b>\n"
         f"👥 Рефералов: {ref_stats['count']}\n"
+        f"🌳 Команда (до {REFERRAL_TREE_DEPTH} ур.): {ref_stats['team']} • {ref_stats['team_profit']:.0f} RUB\n"
         f"💵 Заработано: {ref_stats['earnings']:.2f} RUB\n\n"
         f"🔗 <b>Твоя ссылка:</b>\n<code>{ref_link}</code>"
     )
@@ -0,0 +1,25 @@
+-- ============================================
+-- IDEMPOTENCY - ЗАЩИТА ОТ ПОВТОРНОЙ ОБРАБОТКИ
+-- ============================================
+
+-- Ключ идемпотентности создаётся на шаге предпросмотра и передаётся
+-- при подтверждении. Повторное нажатие / повтор апдейта с тем же ключом
+-- не создаёт вторую запись (NULL не конфликтует - старый код работает как раньше).
+ALTER TABLE profits ADD COLUMN IF NOT EXISTS idempotency_key TEXT UNIQUE;
+ALTER TABLE broadcast_jobs ADD COLUMN IF NOT EXISTS idempotency_key TEXT UNIQUE;
+ALTER TABLE mentor_broadcasts ADD COLUMN IF NOT EXISTS idempotency_key TEXT UNIQUE;
+
+COMMENT ON COLUMN profits.idempotency_key IS 'Ключ подтверждения профита (повтор не создаёт дубль)';
+COMMENT ON COLUMN broadcast_jobs.idempotency_key IS 'Ключ подтверждения рассылки (повтор не запускает вторую)';
+COMMENT ON COLUMN mentor_broadcasts.idempotency_key IS 'Ключ подтверждения рассылки наставника';
+
+-- Обработанные апдейты (общий журнал для нескольких реплик, UPDATE_DEDUP_SHARED)
+-- key: u:<update_id> или cq:<callback_query_id>
+CREATE TABLE IF NOT EXISTS processed_updates (
+    key TEXT PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_processed_updates_created ON processed_updates(created_at);
+
+COMMENT ON TABLE processed_updates IS 'Ключи уже обработанных апдейтов Telegram (хранятся UPDATE_DEDUP_TTL секунд)';
@@ -1,8 +1,10 @@
 """Improved admin keyboards with better UX."""
 from typing import List, Dict, Any, Optional
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from keyboards.builder import static_keyboard, cached_keyboard
 
 
+@static_keyboard
 def get_admin_menu_keyboard() -> InlineKeyboardMarkup:
     """Get admin menu keyboard with beautiful organized sections."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -38,6 +40,7 @@ def get_admin_menu_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_stage_keyboard() -> InlineKeyboardMarkup:
     """Get stage selection keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -49,6 +52,7 @@ def get_stage_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_confirm_keyboard() -> InlineKeyboardMarkup:
     """Get confirmation keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -59,6 +63,7 @@ def get_confirm_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_back_to_admin_keyboard() -> InlineKeyboardMarkup:
     """Get back to admin menu keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -67,6 +72,7 @@ def get_back_to_admin_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cached_keyboard()
 def get_cancel_keyboard(callback_data: str = "admin_menu") -> InlineKeyboardMarkup:
     """Get cancel keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -97,6 +103,7 @@ def get_service_selection_keyboard(services: List[Dict[str, Any]]) -> InlineKeyb
 # PAYOUTS
 # ============================================
 
+@static_keyboard
 def get_payout_type_keyboard() -> InlineKeyboardMarkup:
     """Get payout type selection keyboard with beautiful design."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -147,6 +154,7 @@ def get_mentor_payout_keyboard(summary: List[Dict[str, Any]]) -> InlineKeyboardM
 # CONTENT MANAGEMENT
 # ============================================
 
+@static_keyboard
 def get_content_category_keyboard() -> InlineKeyboardMarkup:
     """Get content category selection keyboard with beautiful design."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -161,6 +169,7 @@ def get_content_category_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cached_keyboard()
 def get_content_action_keyboard(category: str = "services") -> InlineKeyboardMarkup:
     """Get content action keyboard with beautiful design."""
     back_callback = "manage_content"
@@ -214,6 +223,7 @@ def get_resource_list_keyboard(resources: List[Dict[str, Any]], for_delete: bool
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@static_keyboard
 def get_resource_type_keyboard() -> InlineKeyboardMarkup:
     """Get resource type selection keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -270,6 +280,7 @@ def get_mentor_service_keyboard(services: List[Dict[str, Any]]) -> InlineKeyboar
 # BROADCAST
 # ============================================
 
+@static_keyboard
 def get_broadcast_confirm_keyboard() -> InlineKeyboardMarkup:
     """Get broadcast confirmation keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -280,6 +291,7 @@ def get_broadcast_confirm_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_broadcast_type_keyboard() -> InlineKeyboardMarkup:
     """Get broadcast type selection with beautiful design."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -298,6 +310,7 @@ def get_broadcast_type_keyboard() -> InlineKeyboardMarkup:
 # USERS MANAGEMENT
 # ============================================
 
+@static_keyboard
 def get_users_management_keyboard() -> InlineKeyboardMarkup:
     """Get users management keyboard with beautiful design."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -368,6 +381,7 @@ def get_user_list_keyboard(users: List[Dict[str, Any]], page: int = 0, per_page:
 # STATISTICS
 # ============================================
 
+@static_keyboard
 def get_stats_keyboard() -> InlineKeyboardMarkup:
     """Get statistics keyboard with beautiful design."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -393,6 +407,7 @@ def get_stats_keyboard() -> InlineKeyboardMarkup:
 # DIRECT PAYMENTS
 # ============================================
 
+@static_keyboard
 def get_direct_payments_admin_keyboard() -> InlineKeyboardMarkup:
     """Get direct payments admin keyboard with beautiful design."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -412,6 +427,7 @@ def get_direct_payments_admin_keyboard() -> InlineKeyboardMarkup:
 # COMMUNITIES MANAGEMENT
 # ============================================
 
+@static_keyboard
 def get_communities_admin_keyboard() -> InlineKeyboardMarkup:
     """Get communities admin management keyboard with beautiful design."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -0,0 +1,64 @@
+"""Keyboard caching: static markups are built once, parametrized ones are memoized.
+
+Returned markups are shared between calls - callers must not modify them
+(build a new markup instead).
+"""
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, TypeVar
+
+import config
+
+Markup = TypeVar("Markup")
+
+_registry: List[Callable] = []
+
+
+def static_keyboard(func: Callable[[], Markup]) -> Callable[[], Markup]:
+    """Build markup on first call, return the same instance afterwards."""
+    markup = None
+    hits = 0
+
+    @wraps(func)
+    def wrapper() -> Markup:
+        nonlocal markup, hits
+        if markup is None:
+            markup = func()
+        else:
+            hits += 1
+        return markup
+
+    def cache_clear() -> None:
+        nonlocal markup
+        markup = None
+
+    def cache_info() -> Dict[str, Any]:
+        return {"hits": hits, "misses": int(markup is not None), "maxsize": 1, "currsize": int(markup is not None)}
+
+    wrapper.cache_clear = cache_clear
+    wrapper.cache_info = cache_info
+    _registry.append(wrapper)
+    return wrapper
+
+
+def cached_keyboard(maxsize: int = config.KEYBOARD_CACHE_SIZE) -> Callable[[Callable[..., Markup]], Callable[..., Markup]]:
+    """Memoize markup by (hashable) arguments in a bounded LRU."""
+    def decorator(func: Callable[..., Markup]) -> Callable[..., Markup]:
+        cached = lru_cache(maxsize=maxsize)(func)
+        _registry.append(cached)
+        return cached
+    return decorator
+
+
+def keyboard_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Cache usage per keyboard function."""
+    stats = {}
+    for func in _registry:
+        info = func.cache_info()
+        stats[f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"] = info._asdict() if hasattr(info, "_asdict") else info
+    return stats
+
+
+def clear_keyboard_cache() -> None:
+    """Drop all built markups (e.g. after changing config URLs at runtime)."""
+    for func in _registry:
+        func.cache_clear()
@@ -1,8 +1,10 @@
 """Mentor panel keyboards."""
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from typing import List, Dict, Any
+from keyboards.builder import static_keyboard, cached_keyboard
 
 
+@static_keyboard
 def get_mentor_panel_keyboard() -> InlineKeyboardMarkup:
     """Get main mentor panel keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -24,6 +26,7 @@ def get_mentor_panel_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cached_keyboard()
 def get_mentor_students_keyboard(page: int = 0, total_pages: int = 1) -> InlineKeyboardMarkup:
     """Get mentor students keyboard with pagination."""
     buttons = []
@@ -60,6 +63,7 @@ def get_mentor_students_keyboard(page: int = 0, total_pages: int = 1) -> InlineK
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@static_keyboard
 def get_mentor_broadcast_keyboard() -> InlineKeyboardMarkup:
     """Get mentor broadcast keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -76,6 +80,7 @@ def get_mentor_broadcast_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cached_keyboard()
 def get_mentor_channel_keyboard(has_channel: bool = False) -> InlineKeyboardMarkup:
     """Get mentor channel management keyboard."""
     buttons = []
@@ -94,6 +99,7 @@ def get_mentor_channel_keyboard(has_channel: bool = False) -> InlineKeyboardMark
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cached_keyboard()
 def get_mentor_broadcast_history_keyboard(page: int = 0, total_pages: int = 1) -> InlineKeyboardMarkup:
     """Get mentor broadcast history keyboard."""
     buttons = []
@@ -171,6 +177,7 @@ def get_broadcast_recipients_keyboard(broadcast_id: int, page: int = 0, total_pa
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cached_keyboard()
 def get_mentor_earnings_keyboard(page: int = 0, total_pages: int = 1) -> InlineKeyboardMarkup:
     """Get mentor earnings keyboard."""
     buttons = []
@@ -204,6 +211,7 @@ def get_mentor_earnings_keyboard(page: int = 0, total_pages: int = 1) -> InlineK
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@static_keyboard
 def get_broadcast_confirm_keyboard() -> InlineKeyboardMarkup:
     """Get broadcast confirmation keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -214,6 +222,7 @@ def get_broadcast_confirm_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_channel_create_keyboard() -> InlineKeyboardMarkup:
     """Get channel creation keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -221,6 +230,7 @@ def get_channel_create_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_back_to_mentor_panel_keyboard() -> InlineKeyboardMarkup:
     """Get back to mentor panel keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -1,7 +1,9 @@
 """Keyboards for registration flow."""
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from keyboards.builder import static_keyboard
 
 
+@static_keyboard
 def get_agreement_keyboard() -> InlineKeyboardMarkup:
     """Get agreement acceptance keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -12,6 +14,7 @@ def get_agreement_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_age_keyboard() -> InlineKeyboardMarkup:
     """Get age selection keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -25,6 +28,7 @@ def get_age_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_experience_keyboard() -> InlineKeyboardMarkup:
     """Get experience confirmation keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -35,6 +39,7 @@ def get_experience_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_work_hours_keyboard() -> InlineKeyboardMarkup:
     """Get work hours selection keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -49,6 +54,7 @@ def get_work_hours_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_motivation_keyboard() -> InlineKeyboardMarkup:
     """Get motivation selection keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -59,6 +65,7 @@ def get_motivation_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_source_keyboard() -> InlineKeyboardMarkup:
     """Get source selection keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -84,6 +91,7 @@ def get_admin_decision_keyboard(user_id: int) -> InlineKeyboardMarkup:
     ])
 
 
+@static_keyboard
 def get_join_team_keyboard() -> InlineKeyboardMarkup:
     """Get join team keyboard."""
     from config import CHAT_GROUP_URL
@@ -1,10 +1,21 @@
 """User keyboards for main menu and navigation."""
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo, ReplyKeyboardMarkup, KeyboardButton
 from typing import List, Dict, Any
+from urllib.parse import urlencode
 
 import config
+from keyboards.builder import static_keyboard, cached_keyboard
 
 
+def webapp_url(url: str) -> str:
+    """Mini app URL with the bot API address (?api=...), read by the page."""
+    if not config.API_ENABLED or not config.API_PUBLIC_URL:
+        return url
+    separator = "&" if "?" in url else "?"
+    return f"{url}{separator}{urlencode({'api': config.API_PUBLIC_URL.rstrip('/')})}"
+
+
+@static_keyboard
 def get_main_static_keyboard() -> ReplyKeyboardMarkup:
     """Get main static keyboard with quick access buttons."""
     return ReplyKeyboardMarkup(
@@ -23,11 +34,12 @@ def get_main_static_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@cached_keyboard()
 def get_main_menu_keyboard(unread_notifications: int = 0, is_admin: bool = False, is_mentor: bool = False) -> InlineKeyboardMarkup:
     """Get main menu inline keyboard."""
     keyboard = [
         [
-            InlineKeyboardButton(text="Аналитика", web_app=WebAppInfo(url=config.WEBAPP_ANALYTICS)),
+            InlineKeyboardButton(text="Аналитика", web_app=WebAppInfo(url=webapp_url(config.WEBAPP_ANALYTICS))),
             InlineKeyboardButton(text="Прямики", callback_data="direct_payments")
         ],
         [
@@ -36,10 +48,10 @@ def get_main_menu_keyboard(unread_notifications: int = 0, is_admin: bool = False
         ],
         [
             InlineKeyboardButton(text="Чат", url=config.CHAT_GROUP_URL),
-            InlineKeyboardButton(text="Идеи", web_app=WebAppInfo(url=config.WEBAPP_IDEAS))
+            InlineKeyboardButton(text="Идеи", web_app=WebAppInfo(url=webapp_url(config.WEBAPP_IDEAS)))
         ],
         [
-            InlineKeyboardButton(text="Хаб", web_app=WebAppInfo(url=config.WEBAPP_HUB))
+            InlineKeyboardButton(text="Хаб", web_app=WebAppInfo(url=webapp_url(config.WEBAPP_HUB)))
         ]
     ]
 
@@ -59,6 +71,7 @@ def get_main_menu_keyboard(unread_notifications: int = 0, is_admin: bool = False
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@static_keyboard
 def get_profile_keyboard() -> InlineKeyboardMarkup:
     """Get profile inline keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -67,6 +80,7 @@ def get_profile_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cached_keyboard()
 def get_profit_history_keyboard(current_page: int, total_pages: int) -> InlineKeyboardMarkup:
     """Get profit history keyboard with pagination."""
     buttons = []
@@ -111,6 +125,7 @@ def get_services_keyboard(services: List[Dict[str, Any]]) -> InlineKeyboardMarku
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cached_keyboard()
 def get_service_detail_keyboard(service_id: int, manual_link: str = None, bot_link: str = None) -> InlineKeyboardMarkup:
     """Get service detail keyboard with links."""
     buttons = []
@@ -150,6 +165,7 @@ def get_resources_keyboard(resources: List[Dict[str, Any]]) -> InlineKeyboardMar
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cached_keyboard()
 def get_back_to_menu_keyboard(section: str = None) -> InlineKeyboardMarkup:
     """Get back keyboard - always leads to main menu for simplicity."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -209,6 +225,7 @@ def get_mentor_selection_keyboard(mentors: List[Dict[str, Any]], service_name: s
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cached_keyboard()
 def get_mentor_detail_keyboard(mentor_id: int, has_mentor: bool, service_name: str) -> InlineKeyboardMarkup:
     """Get mentor detail keyboard with compact design."""
     buttons = []
@@ -227,6 +244,7 @@ def get_mentor_detail_keyboard(mentor_id: int, has_mentor: bool, service_name: s
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cached_keyboard()
 def get_notifications_keyboard(has_unread: bool = False) -> InlineKeyboardMarkup:
     """Get notifications keyboard."""
     buttons = []
@@ -238,6 +256,7 @@ def get_notifications_keyboard(has_unread: bool = False) -> InlineKeyboardMarkup
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cached_keyboard()
 def get_direct_payments_keyboard(support_username: str) -> InlineKeyboardMarkup:
     """Get direct payments keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -249,7 +268,7 @@ def get_direct_payments_keyboard(support_username: str) -> InlineKeyboardMarkup:
 def get_referral_keyboard(ref_link: str, website_url: str) -> InlineKeyboardMarkup:
     """Get referral link keyboard."""
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="Мои рефералы", web_app=WebAppInfo(url=config.WEBAPP_REFERRALS))],
+        [InlineKeyboardButton(text="Мои рефералы", web_app=WebAppInfo(url=webapp_url(config.WEBAPP_REFERRALS)))],
         [InlineKeyboardButton(text="Поделиться ссылкой", switch_inline_query=f"Присоединяйся к команде! {ref_link}")],
         [InlineKeyboardButton(text="← К профилю", callback_data="profile")]
     ])
@@ -286,6 +305,7 @@ def get_communities_keyboard(communities: List[Dict[str, Any]], user_profit: flo
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cached_keyboard()
 def get_community_detail_keyboard(community_id: int, is_member: bool, is_creator: bool = False) -> InlineKeyboardMarkup:
     """Get community detail keyboard with compact design."""
     buttons = []
@@ -300,6 +320,7 @@ def get_community_detail_keyboard(community_id: int, is_member: bool, is_creator
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@static_keyboard
 def get_community_create_keyboard() -> InlineKeyboardMarkup:
     """Get community creation keyboard with compact design."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -6,16 +6,17 @@ from contextlib import suppress
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
-from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.types import ErrorEvent
 from aiogram.exceptions import TelegramRetryAfter, TelegramAPIError
 
 import config
-from database import init_db
+from database import init_db, purge_expired_fsm_states
 from middlewares.user_check import UserCheckMiddleware
 from middlewares.throttling import ThrottlingMiddleware
 from middlewares.group_keyboard_remove import GroupKeyboardRemoveMiddleware
+from middlewares.inflight import inflight
+from middlewares.dedup import update_dedup
 
 # Logging
 logging.basicConfig(
@@ -28,37 +29,14 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 
-async def main() -> None:
-    """Start the bot."""
-    logger.info("🚀 Starting bot...")
-    
-    # Init database
-    await init_db()
-    
-    # Optimized session with connection pooling
-    session = AiohttpSession(
-        timeout=60,
-    )
-    
-    # Init bot with optimized settings
-    bot = Bot(
-        token=config.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
-        session=session
-    )
-    
-    # Initialize restart manager
-    from utils.restart import RestartManager
-    restart_manager = RestartManager(bot)
+def create_dispatcher() -> Dispatcher:
+    """Build dispatcher with middlewares, error handler and routers."""
+    from database.fsm_storage import create_fsm_storage
+    dp = Dispatcher(storage=create_fsm_storage())
     
-    # Initialize mentor broadcast manager
-    from utils.mentor_broadcast import init_broadcast_manager, start_broadcast_manager
-    init_broadcast_manager(bot)
-    
-    # Check for restart flag from previous session
-    await restart_manager.check_and_handle_restart_flag()
-    
-    dp = Dispatcher()
+    # Skip re-delivered updates, then track the rest for graceful shutdown
+    dp.update.outer_middleware(update_dedup)
+    dp.update.outer_middleware(inflight)
     
     # Middlewares (order matters - throttling first)
     dp.message.middleware(ThrottlingMiddleware(rate_limit=0.5))
@@ -71,23 +49,23 @@ async def main() -> None:
     @dp.error()
     async def error_handler(event: ErrorEvent) -> bool:
         exception = event.exception
-        
+    
         # Handle rate limiting
         if isinstance(exception, TelegramRetryAfter):
             logger.warning(f"Rate limited, retry after {exception.retry_after}s")
             await asyncio.sleep(exception.retry_after)
             return True
-        
+    
         # Log other errors
         logger.error(f"Error: {exception}", exc_info=exception)
-        
+    
         # Try to notify user
         with suppress(Exception):
             if event.update.message:
                 await event.update.message.answer("❌ Ошибка. Попробуйте снова.")
             elif event.update.callback_query:
                 await event.update.callback_query.answer("❌ Ошибка", show_alert=True)
-        
+    
         return True
     
     # Register routers
@@ -95,7 +73,8 @@ async def main() -> None:
         chat_commands_router, registration_router, user_menu_router,
         admin_profit_router, admin_manage_router, admin_mentors_router,
         admin_broadcast_router, admin_close_router, admin_direct_payments_router,
-        community_create_router, admin_communities_router, mentor_panel_router
+        community_create_router, admin_communities_router, mentor_panel_router,
+        admin_export_router
     )
     
     dp.include_router(chat_commands_router)
@@ -110,22 +89,118 @@ async def main() -> None:
     dp.include_router(admin_close_router)
     dp.include_router(admin_direct_payments_router)
     dp.include_router(admin_communities_router)
+    dp.include_router(admin_export_router)
+    
+    return dp
+
+
+async def main() -> None:
+    """Start the bot."""
+    logger.info("🚀 Starting bot...")
+    
+    # Mini apps read everything from /api/* - without a public address they are broken
+    if config.API_ENABLED and not config.API_PUBLIC_URL:
+        raise ValueError("API_PUBLIC_URL required when API_ENABLED (or set API_ENABLED = False)")
+    
+    # Init database
+    await init_db()
+    if config.FSM_STORAGE == "supabase":
+        asyncio.create_task(purge_expired_fsm_states())
+    
+    # Tuned connection pool (config.BOT_HTTP_*)
+    from utils.http_pools import create_bot_session
+    session = create_bot_session()
+    
+    # Init bot with optimized settings
+    bot = Bot(
+        token=config.BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        session=session
+    )
+    
+    # Initialize restart manager
+    from utils.restart import RestartManager
+    restart_manager = RestartManager(bot)
+    
+    # Initialize mentor broadcast manager
+    from utils.mentor_broadcast import init_broadcast_manager, start_broadcast_manager, stop_broadcast_manager
+    init_broadcast_manager(bot)
+    
+    # Initialize admin broadcast engine
+    from utils.broadcast_engine import init_broadcast_engine, start_broadcast_engine, stop_broadcast_engine
+    init_broadcast_engine(bot)
+    
+    # Initialize notification outbox dispatcher
+    from utils.outbox import init_outbox, start_outbox, stop_outbox
+    init_outbox(bot)
+    
+    # Prerendered /top captions
+    from utils.leaderboard import start_leaderboard, stop_leaderboard
+    
+    # In-memory profits analytics (config.ANALYTICS_STORE_ENABLED)
+    from utils.analytics_store import init_analytics_store, start_analytics_store, stop_analytics_store
+    init_analytics_store()
+    
+    # Initialize auto-delete scheduler
+    from utils.auto_delete import init_auto_delete, start_auto_delete, stop_auto_delete
+    init_auto_delete(bot)
+    
+    # Check for restart flag from previous session
+    await restart_manager.check_and_handle_restart_flag()
+    
+    dp = create_dispatcher()
     
     logger.info("✅ Bot ready")
     
+    # Health endpoint (+ webhook route in webhook mode)
+    from web.server import create_app, start_server, run_webhook, drain
+    runner = await start_server(create_app(dp, bot))
+    
     try:
-        # Drop pending updates for faster start
-        await bot.delete_webhook(drop_pending_updates=True)
-        
         # Start mentor broadcast manager
         asyncio.create_task(start_broadcast_manager())
         
-        await dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types(),
-            polling_timeout=30
-        )
+        # Resume admin broadcasts interrupted by restart
+        await start_broadcast_engine()
+        
+        # Deliver queued notifications (profits, rank-ups, channel posts)
+        asyncio.create_task(start_outbox())
+        
+        # Keep /top captions fresh (profit events + day boundaries)
+        asyncio.create_task(start_leaderboard())
+        
+        # Load profits into the analytics store (no-op when disabled)
+        asyncio.create_task(start_analytics_store())
+        
+        # Start auto-delete scheduler (restores pending deletions)
+        asyncio.create_task(start_auto_delete())
+        
+        # Upload new/changed brand images, reuse file_ids for the rest
+        from utils.media import preload_media
+        asyncio.create_task(preload_media(bot))
+        
+        if config.RUN_MODE == "webhook":
+            await run_webhook(dp, bot, runner)
+        else:
+            await bot.delete_webhook(drop_pending_updates=config.DROP_PENDING_UPDATES)
+            await dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types(),
+                polling_timeout=30,
+                close_bot_session=False
+            )
+            # Polling stopped: let running handlers finish
+            await drain()
+            # Close FSM storage (Redis connection pool)
+            await dp.storage.close()
+            await runner.cleanup()
     finally:
+        await stop_broadcast_engine()
+        await stop_broadcast_manager()
+        await stop_outbox()
+        stop_leaderboard()
+        stop_analytics_store()
+        stop_auto_delete()
         await bot.session.close()
 
 
@@ -0,0 +1,11 @@
+-- ============================================
+-- MENTOR BROADCASTS - СООБЩЕНИЕ С ПРОГРЕССОМ
+-- ============================================
+
+-- Сообщение наставника, в котором бот показывает ход рассылки
+-- (редактируется не чаще PROGRESS_MIN_INTERVAL секунд)
+ALTER TABLE mentor_broadcasts ADD COLUMN IF NOT EXISTS progress_chat_id BIGINT;
+ALTER TABLE mentor_broadcasts ADD COLUMN IF NOT EXISTS progress_message_id BIGINT;
+ALTER TABLE mentor_broadcasts ADD COLUMN IF NOT EXISTS progress_is_photo BOOLEAN DEFAULT FALSE;
+
+COMMENT ON COLUMN mentor_broadcasts.progress_message_id IS 'Сообщение с прогрессом рассылки (NULL - не показывать)';
@@ -0,0 +1,242 @@
+-- ============================================
+-- MENTOR STATS ROLLUP - ГОТОВАЯ СТАТИСТИКА НАСТАВНИКА
+-- ============================================
+
+-- Одна строка на наставника (mentor_user_id): студенты, начисления hold/paid,
+-- начисления за месяц, профиты студентов. Панель наставника читает её по
+-- первичному ключу вместо агрегации по users, profits и mentor_profits.
+-- Поддерживается триггерами:
+--   mentor_profits INSERT / смена статуса - инкрементально (атомарный upsert);
+--   profits INSERT студента - инкрементально;
+--   смена наставника у студента, удаление и правка профитов - пересчёт строки.
+-- Счётчики mentors.students_count, total_earned и rating теперь тоже
+-- обновляются здесь атомарно (раньше - чтение и запись из бота).
+-- Активные студенты (заходили за 7 дней) зависят от времени, поэтому бот
+-- пересчитывает строку в фоне, если active_checked_at устарел.
+-- Выполнить после profit_daily_rollup.sql и mentor_students_roster.sql.
+CREATE TABLE IF NOT EXISTS mentor_stats (
+    mentor_user_id BIGINT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    students_count INTEGER NOT NULL DEFAULT 0,
+    active_students INTEGER NOT NULL DEFAULT 0,
+    active_checked_at TIMESTAMPTZ DEFAULT NOW(),
+    hold_earned DECIMAL(14,2) NOT NULL DEFAULT 0,
+    paid_earned DECIMAL(14,2) NOT NULL DEFAULT 0,
+    earned_count INTEGER NOT NULL DEFAULT 0,
+    month_start DATE NOT NULL DEFAULT DATE_TRUNC('month', NOW())::DATE,
+    month_earned DECIMAL(14,2) NOT NULL DEFAULT 0,     -- за month_start; другой месяц - 0
+    student_profit_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    student_profit_count BIGINT NOT NULL DEFAULT 0,
+    top_student_profit DECIMAL(14,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+COMMENT ON TABLE mentor_stats IS 'Статистика наставника (триггеры на users, profits, mentor_profits)';
+
+-- Полный пересчёт строки наставника (редкие события и устаревшие активные)
+CREATE OR REPLACE FUNCTION refresh_mentor_stats(p_mentor_user_id BIGINT)
+RETURNS SETOF mentor_stats AS $$
+BEGIN
+    -- Наставник удаляется вместе с пользователем - строка не нужна
+    IF p_mentor_user_id IS NULL OR NOT EXISTS (SELECT 1 FROM users WHERE id = p_mentor_user_id) THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    WITH students AS (
+        SELECT u.id, u.last_activity,
+               COALESCE((SELECT SUM(r.profit_sum) FROM profit_daily_rollup r WHERE r.worker_id = u.id), 0) AS total_profit,
+               COALESCE((SELECT SUM(r.profit_count) FROM profit_daily_rollup r WHERE r.worker_id = u.id), 0) AS profit_count
+        FROM users u
+        WHERE u.mentor_id IN (SELECT m.id FROM mentors m WHERE m.user_id = p_mentor_user_id)
+    ),
+    s AS (
+        SELECT
+            COUNT(*)::INTEGER AS students_count,
+            COUNT(*) FILTER (WHERE last_activity > NOW() - INTERVAL '7 days')::INTEGER AS active_students,
+            COALESCE(SUM(total_profit), 0) AS student_profit_sum,
+            COALESCE(SUM(profit_count), 0)::BIGINT AS student_profit_count,
+            COALESCE(MAX(total_profit), 0) AS top_student_profit
+        FROM students
+    ),
+    e AS (
+        SELECT
+            COALESCE(SUM(amount) FILTER (WHERE status = 'hold'), 0) AS hold_earned,
+            COALESCE(SUM(amount) FILTER (WHERE status = 'paid'), 0) AS paid_earned,
+            COUNT(*)::INTEGER AS earned_count,
+            COALESCE(SUM(amount) FILTER (WHERE created_at >= DATE_TRUNC('month', NOW())), 0) AS month_earned
+        FROM mentor_profits
+        WHERE mentor_user_id = p_mentor_user_id
+    )
+    INSERT INTO mentor_stats AS ms (
+        mentor_user_id, students_count, active_students, active_checked_at,
+        hold_earned, paid_earned, earned_count, month_start, month_earned,
+        student_profit_sum, student_profit_count, top_student_profit, updated_at
+    )
+    SELECT
+        p_mentor_user_id, s.students_count, s.active_students, NOW(),
+        e.hold_earned, e.paid_earned, e.earned_count, DATE_TRUNC('month', NOW())::DATE, e.month_earned,
+        s.student_profit_sum, s.student_profit_count, s.top_student_profit, NOW()
+    FROM s, e
+    ON CONFLICT (mentor_user_id) DO UPDATE SET
+        students_count = EXCLUDED.students_count,
+        active_students = EXCLUDED.active_students,
+        active_checked_at = EXCLUDED.active_checked_at,
+        hold_earned = EXCLUDED.hold_earned,
+        paid_earned = EXCLUDED.paid_earned,
+        earned_count = EXCLUDED.earned_count,
+        month_start = EXCLUDED.month_start,
+        month_earned = EXCLUDED.month_earned,
+        student_profit_sum = EXCLUDED.student_profit_sum,
+        student_profit_count = EXCLUDED.student_profit_count,
+        top_student_profit = EXCLUDED.top_student_profit,
+        updated_at = EXCLUDED.updated_at
+    RETURNING ms.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Наставник (user_id) студента по users.mentor_id
+CREATE OR REPLACE FUNCTION mentor_user_of(p_mentor_id INTEGER)
+RETURNS BIGINT AS $$
+SELECT user_id FROM mentors WHERE id = p_mentor_id;
+$$ LANGUAGE sql STABLE;
+
+-- Студент пришёл, ушёл или удалён: счётчик в mentors и пересчёт строк
+CREATE OR REPLACE FUNCTION mentor_stats_on_user()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old INTEGER := CASE WHEN TG_OP IN ('UPDATE', 'DELETE') THEN OLD.mentor_id END;
+    v_new INTEGER := CASE WHEN TG_OP IN ('INSERT', 'UPDATE') THEN NEW.mentor_id END;
+BEGIN
+    IF v_old IS NOT DISTINCT FROM v_new THEN
+        RETURN NULL;
+    END IF;
+    IF v_old IS NOT NULL THEN
+        UPDATE mentors SET students_count = GREATEST(COALESCE(students_count, 0) - 1, 0) WHERE id = v_old;
+        PERFORM refresh_mentor_stats(mentor_user_of(v_old));
+    END IF;
+    IF v_new IS NOT NULL THEN
+        UPDATE mentors SET students_count = COALESCE(students_count, 0) + 1 WHERE id = v_new;
+        PERFORM refresh_mentor_stats(mentor_user_of(v_new));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_mentor_stats_users ON users;
+CREATE TRIGGER trg_mentor_stats_users
+AFTER INSERT OR DELETE OR UPDATE OF mentor_id ON users
+FOR EACH ROW EXECUTE FUNCTION mentor_stats_on_user();
+
+-- Начисления наставнику
+CREATE OR REPLACE FUNCTION mentor_stats_on_mentor_profit()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_month DATE := DATE_TRUNC('month', NOW())::DATE;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE mentors SET
+            total_earned = COALESCE(total_earned, 0) + NEW.amount,
+            rating = COALESCE(rating, 0) + 1
+        WHERE id = NEW.mentor_id;
+
+        INSERT INTO mentor_stats (mentor_user_id, hold_earned, paid_earned, earned_count, month_start, month_earned)
+        VALUES (
+            NEW.mentor_user_id,
+            CASE WHEN NEW.status = 'hold' THEN NEW.amount ELSE 0 END,
+            CASE WHEN NEW.status = 'paid' THEN NEW.amount ELSE 0 END,
+            1, v_month, NEW.amount
+        )
+        ON CONFLICT (mentor_user_id) DO UPDATE SET
+            hold_earned = mentor_stats.hold_earned + EXCLUDED.hold_earned,
+            paid_earned = mentor_stats.paid_earned + EXCLUDED.paid_earned,
+            earned_count = mentor_stats.earned_count + 1,
+            month_earned = CASE WHEN mentor_stats.month_start = v_month
+                                THEN mentor_stats.month_earned + EXCLUDED.month_earned
+                                ELSE EXCLUDED.month_earned END,
+            month_start = v_month,
+            updated_at = NOW();
+        RETURN NULL;
+    END IF;
+
+    -- Выплата (hold -> paid пачкой) - перенос суммы между колонками
+    IF TG_OP = 'UPDATE' AND NEW.amount = OLD.amount AND NEW.mentor_user_id = OLD.mentor_user_id THEN
+        IF NEW.status IS DISTINCT FROM OLD.status THEN
+            UPDATE mentor_stats SET
+                hold_earned = hold_earned
+                    - CASE WHEN OLD.status = 'hold' THEN OLD.amount ELSE 0 END
+                    + CASE WHEN NEW.status = 'hold' THEN NEW.amount ELSE 0 END,
+                paid_earned = paid_earned
+                    - CASE WHEN OLD.status = 'paid' THEN OLD.amount ELSE 0 END
+                    + CASE WHEN NEW.status = 'paid' THEN NEW.amount ELSE 0 END,
+                updated_at = NOW()
+            WHERE mentor_user_id = NEW.mentor_user_id;
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    -- Удаление или правка суммы - редкие операции, пересчёт
+    IF TG_OP = 'DELETE' THEN
+        UPDATE mentors SET
+            total_earned = GREATEST(COALESCE(total_earned, 0) - OLD.amount, 0),
+            rating = GREATEST(COALESCE(rating, 0) - 1, 0)
+        WHERE id = OLD.mentor_id;
+    ELSE
+        UPDATE mentors SET total_earned = COALESCE(total_earned, 0) - OLD.amount WHERE id = OLD.mentor_id;
+        UPDATE mentors SET total_earned = COALESCE(total_earned, 0) + NEW.amount WHERE id = NEW.mentor_id;
+        PERFORM refresh_mentor_stats(NEW.mentor_user_id);
+    END IF;
+    PERFORM refresh_mentor_stats(OLD.mentor_user_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_mentor_stats_mentor_profits ON mentor_profits;
+CREATE TRIGGER trg_mentor_stats_mentor_profits
+AFTER INSERT OR DELETE OR UPDATE OF amount, status, mentor_user_id ON mentor_profits
+FOR EACH ROW EXECUTE FUNCTION mentor_stats_on_mentor_profit();
+
+-- Профиты студентов. Имя триггера сортируется после trg_profits_rollup,
+-- поэтому итог студента в profit_daily_rollup уже включает новый профит.
+CREATE OR REPLACE FUNCTION mentor_stats_on_profit()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_mentor_user_id BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT m.user_id INTO v_mentor_user_id
+        FROM users u JOIN mentors m ON m.id = u.mentor_id
+        WHERE u.id = NEW.worker_id;
+        IF v_mentor_user_id IS NOT NULL THEN
+            UPDATE mentor_stats SET
+                student_profit_sum = student_profit_sum + NEW.net_profit,
+                student_profit_count = student_profit_count + 1,
+                top_student_profit = GREATEST(top_student_profit, (
+                    SELECT COALESCE(SUM(r.profit_sum), 0) FROM profit_daily_rollup r WHERE r.worker_id = NEW.worker_id
+                )),
+                updated_at = NOW()
+            WHERE mentor_user_id = v_mentor_user_id;
+            IF NOT FOUND THEN
+                PERFORM refresh_mentor_stats(v_mentor_user_id);
+            END IF;
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    PERFORM refresh_mentor_stats(m.user_id)
+    FROM users u JOIN mentors m ON m.id = u.mentor_id
+    WHERE u.id IN (OLD.worker_id, CASE WHEN TG_OP = 'UPDATE' THEN NEW.worker_id END);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_profits_rollup_mentor_stats ON profits;
+CREATE TRIGGER trg_profits_rollup_mentor_stats
+AFTER INSERT OR DELETE OR UPDATE OF worker_id, net_profit ON profits
+FOR EACH ROW EXECUTE FUNCTION mentor_stats_on_profit();
+
+-- Заполнение: строки всех наставников и счётчики mentors по фактическим данным
+SELECT refresh_mentor_stats(user_id) FROM (SELECT DISTINCT user_id FROM mentors) m;
+
+UPDATE mentors m SET students_count = (SELECT COUNT(*) FROM users u WHERE u.mentor_id = m.id);
+
+COMMENT ON FUNCTION refresh_mentor_stats IS 'Пересчитать строку mentor_stats наставника';
@@ -0,0 +1,75 @@
+-- ============================================
+-- MENTOR STUDENTS ROSTER - СТУДЕНТЫ НАСТАВНИКА ПОСТРАНИЧНО
+-- ============================================
+
+-- Считаются только студенты этого наставника: users по mentor_id (индекс),
+-- профит каждого - из profit_daily_rollup по его worker_id (первичный ключ),
+-- доход наставника - из mentor_profits по (mentor_user_id, student_id).
+-- Сортировка и страница выполняются в SQL. Выполнить после profit_daily_rollup.sql.
+CREATE INDEX IF NOT EXISTS idx_users_mentor_id ON users(mentor_id) WHERE mentor_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_mentor_profits_mentor_student ON mentor_profits(mentor_user_id, student_id);
+
+-- p_sort: profit | earnings | activity | tag
+-- total_count - всего студентов (одинаково во всех строках страницы)
+CREATE OR REPLACE FUNCTION get_mentor_students_page(
+    p_mentor_user_id BIGINT,
+    p_sort TEXT DEFAULT 'profit',
+    p_limit INTEGER DEFAULT 5,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    student_id BIGINT,
+    student_tag TEXT,
+    username TEXT,
+    full_name TEXT,
+    total_profit DECIMAL(12,2),
+    last_activity TIMESTAMPTZ,
+    mentor_earnings DECIMAL(12,2),
+    is_deliverable BOOLEAN,
+    total_count BIGINT
+) AS $$
+WITH students AS (
+    SELECT u.id, u.user_tag, u.username, u.full_name, u.last_activity, u.is_deliverable
+    FROM users u
+    WHERE u.mentor_id IN (SELECT m.id FROM mentors m WHERE m.user_id = p_mentor_user_id)
+),
+roster AS (
+    SELECT
+        s.*,
+        COALESCE((SELECT SUM(r.profit_sum) FROM profit_daily_rollup r WHERE r.worker_id = s.id), 0) AS total_profit,
+        COALESCE((SELECT SUM(mp.amount) FROM mentor_profits mp
+                  WHERE mp.mentor_user_id = p_mentor_user_id AND mp.student_id = s.id), 0) AS mentor_earnings
+    FROM students s
+)
+SELECT
+    r.id,
+    r.user_tag,
+    r.username,
+    r.full_name,
+    r.total_profit::DECIMAL(12,2),
+    r.last_activity,
+    r.mentor_earnings::DECIMAL(12,2),
+    r.is_deliverable,
+    COUNT(*) OVER ()
+FROM roster r
+ORDER BY
+    CASE WHEN p_sort = 'earnings' THEN r.mentor_earnings END DESC NULLS LAST,
+    CASE WHEN p_sort = 'activity' THEN r.last_activity END DESC NULLS LAST,
+    CASE WHEN p_sort = 'tag' THEN r.user_tag END ASC,
+    r.total_profit DESC,
+    r.id
+LIMIT p_limit OFFSET p_offset;
+$$ LANGUAGE sql STABLE;
+
+-- ID студентов (получатели рассылки, счётчик в предпросмотре)
+CREATE OR REPLACE FUNCTION get_mentor_student_ids(p_mentor_user_id BIGINT, p_deliverable_only BOOLEAN DEFAULT TRUE)
+RETURNS TABLE (student_id BIGINT) AS $$
+SELECT u.id
+FROM users u
+WHERE u.mentor_id IN (SELECT m.id FROM mentors m WHERE m.user_id = p_mentor_user_id)
+  AND (NOT p_deliverable_only OR u.is_deliverable)
+ORDER BY u.id;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION get_mentor_students_page IS 'Страница студентов наставника с профитом и доходом (только его студенты)';
+COMMENT ON FUNCTION get_mentor_student_ids IS 'ID студентов наставника (по умолчанию только доступные для рассылки)';
@@ -0,0 +1,85 @@
+"""Duplicate update suppression (webhook retries, re-delivery after restart)."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Awaitable, List
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+import config
+from database import claim_update_keys, purge_processed_updates
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDedupMiddleware(BaseMiddleware):
+    """Skips updates whose update_id or callback query id was already seen.
+
+    Keys are kept in memory for `ttl` seconds (at most `max_keys`). With
+    `shared` they are also claimed in the processed_updates table, so
+    another replica or a restarted process skips them too.
+    """
+
+    def __init__(
+        self,
+        ttl: int = config.UPDATE_DEDUP_TTL,
+        max_keys: int = config.UPDATE_DEDUP_MAX_KEYS,
+        shared: bool = config.UPDATE_DEDUP_SHARED
+    ):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.shared = shared
+        self.duplicates = 0
+        self._seen: "OrderedDict[str, float]" = OrderedDict()  # key -> expires_at (insertion order)
+        self._last_purge = 0.0
+
+    @staticmethod
+    def _keys(update: Update) -> List[str]:
+        keys = [f"u:{update.update_id}"]
+        if update.callback_query:
+            keys.append(f"cq:{update.callback_query.id}")
+        return keys
+
+    def _check_and_add(self, keys: List[str]) -> bool:
+        """True if any key was seen within the window; records the keys."""
+        now = time.monotonic()
+        while self._seen:
+            key, expires_at = next(iter(self._seen.items()))
+            if expires_at > now and len(self._seen) < self.max_keys:
+                break
+            self._seen.popitem(last=False)
+
+        duplicate = any(k in self._seen for k in keys)
+        for k in keys:
+            self._seen[k] = now + self.ttl
+        return duplicate
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        keys = self._keys(event)
+        duplicate = self._check_and_add(keys)
+        if not duplicate and self.shared:
+            duplicate = not await claim_update_keys(keys)
+            now = time.monotonic()
+            if now - self._last_purge > self.ttl:
+                self._last_purge = now
+                asyncio.create_task(purge_processed_updates(self.ttl))
+
+        if duplicate:
+            self.duplicates += 1
+            logger.info(f"Duplicate update skipped: {', '.join(keys)}")
+            return None
+
+        return await handler(event, data)
+
+
+# Global instance (registered as outer middleware on dp.update)
+update_dedup = UpdateDedupMiddleware()
@@ -0,0 +1,43 @@
+"""In-flight update tracking for graceful shutdown."""
+import asyncio
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """Counts updates being processed so shutdown can wait for them."""
+    
+    def __init__(self):
+        self.active = 0
+        self.processed = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        self.active += 1
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self.active -= 1
+            self.processed += 1
+            if self.active == 0:
+                self._idle.set()
+    
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait until no updates are in flight. Returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+# Global tracker (registered as outer middleware on dp.update)
+inflight = InFlightMiddleware()
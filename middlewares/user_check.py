@@ -1,4 +1,5 @@
 """Middleware to check user status with caching."""
+import asyncio
 import logging
 import time
 from typing import Callable, Dict, Any, Awaitable, Optional, Tuple
@@ -6,7 +7,7 @@ from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery, TelegramObject
 from aiogram.enums import ChatType
 
-from database import get_user
+from database import get_user, mark_user_deliverable
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +56,22 @@ class UserCheckMiddleware(BaseMiddleware):
             if current_time - ts < self._cache_ttl
         }
     
+    @staticmethod
+    def _in_private_chat(event: TelegramObject) -> bool:
+        """Event came from the user's DM with the bot (group activity says nothing about DMs)."""
+        if isinstance(event, CallbackQuery):
+            return event.message is not None and event.message.chat.type == ChatType.PRIVATE
+        return isinstance(event, Message) and event.chat.type == ChatType.PRIVATE
+    
+    def _reactivate(self, user_id: int, db_user: dict, event: TelegramObject) -> dict:
+        """User interacts again in DM - return them to broadcast audience (fire and forget)."""
+        if db_user.get("is_deliverable") is not False or not self._in_private_chat(event):
+            return db_user
+        db_user = {**db_user, "is_deliverable": True}
+        self._set_cached_user(user_id, db_user)
+        asyncio.create_task(mark_user_deliverable(user_id))
+        return db_user
+    
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
@@ -79,6 +96,8 @@ class UserCheckMiddleware(BaseMiddleware):
         # Allow /start - always fetch fresh
         if isinstance(event, Message) and event.text and event.text.startswith("/start"):
             db_user = await get_user(user.id)
+            if db_user:
+                db_user = self._reactivate(user.id, db_user, event)
             self._set_cached_user(user.id, db_user)
             data["db_user"] = db_user
             return await handler(event, data)
@@ -127,7 +146,7 @@ class UserCheckMiddleware(BaseMiddleware):
             return
         
         # Pass user to handler
-        data["db_user"] = db_user
+        data["db_user"] = self._reactivate(user.id, db_user, event)
         return await handler(event, data)
     
     def invalidate_user(self, user_id: int) -> None:
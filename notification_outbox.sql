@@ -0,0 +1,89 @@
+-- ============================================
+-- NOTIFICATION OUTBOX - НАДЁЖНАЯ ДОСТАВКА УВЕДОМЛЕНИЙ
+-- ============================================
+-- Требует idempotency_system.sql (profits.idempotency_key)
+
+-- Очередь исходящих сообщений. Пишется в той же транзакции, что и профит,
+-- отправляется фоновым диспетчером (utils/outbox.py) с повторами.
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,                       -- profit_worker, profit_mentor, profit_referrer, profit_channel, rank_up
+    chat_id BIGINT NOT NULL,
+    text TEXT NOT NULL,
+    parse_mode TEXT DEFAULT 'HTML',
+    disable_preview BOOLEAN DEFAULT TRUE,
+    dedup_key TEXT UNIQUE,                    -- одно и то же уведомление не ставится дважды
+    profit_id INTEGER REFERENCES profits(id) ON DELETE SET NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    sent_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON notification_outbox(next_attempt_at) WHERE status IN ('pending', 'sending');
+
+COMMENT ON TABLE notification_outbox IS 'Исходящие уведомления (outbox): профиты, повышения ранга, посты в канал';
+COMMENT ON COLUMN notification_outbox.locked_until IS 'Захвачено диспетчером до этого момента (после - считается зависшим и берётся снова)';
+
+-- Профит + его уведомления одной транзакцией.
+-- p_notifications: [{"kind", "chat_id", "text", "disable_preview"}]
+-- Возвращает ID профита или 0, если профит с таким ключом уже есть.
+CREATE OR REPLACE FUNCTION create_profit_with_outbox(
+    p_worker_id BIGINT,
+    p_amount DECIMAL,
+    p_net_profit DECIMAL,
+    p_service_name TEXT,
+    p_idempotency_key TEXT,
+    p_notifications JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+    new_id INTEGER;
+BEGIN
+    INSERT INTO profits (worker_id, amount, net_profit, service_name, status, idempotency_key)
+    VALUES (p_worker_id, p_amount, p_net_profit, p_service_name, 'hold', p_idempotency_key)
+    ON CONFLICT (idempotency_key) DO NOTHING
+    RETURNING id INTO new_id;
+
+    IF new_id IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    INSERT INTO notification_outbox (kind, chat_id, text, disable_preview, dedup_key, profit_id)
+    SELECT n->>'kind',
+           (n->>'chat_id')::BIGINT,
+           n->>'text',
+           COALESCE((n->>'disable_preview')::BOOLEAN, TRUE),
+           'profit:' || new_id || ':' || (n->>'kind') || ':' || (n->>'chat_id'),
+           new_id
+    FROM jsonb_array_elements(COALESCE(p_notifications, '[]'::jsonb)) AS n
+    ON CONFLICT (dedup_key) DO NOTHING;
+
+    RETURN new_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Захват пачки готовых к отправке сообщений. SKIP LOCKED - несколько
+-- реплик бота не получат одно и то же сообщение.
+CREATE OR REPLACE FUNCTION claim_outbox(p_limit INTEGER, p_lock_seconds INTEGER)
+RETURNS SETOF notification_outbox AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE notification_outbox o
+    SET status = 'sending',
+        attempts = o.attempts + 1,
+        locked_until = NOW() + make_interval(secs => p_lock_seconds)
+    WHERE o.id IN (
+        SELECT id FROM notification_outbox
+        WHERE (status = 'pending' AND next_attempt_at <= NOW())
+           OR (status = 'sending' AND locked_until < NOW())
+        ORDER BY id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING o.*;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,293 @@
+-- ============================================
+-- PROFIT DAILY ROLLUP - ДНЕВНЫЕ ИТОГИ ПРОФИТОВ ПО ВОРКЕРАМ
+-- ============================================
+
+-- Одна строка на (воркер, день, сервис). Поддерживается триггером на profits,
+-- поэтому статистика за периоды считается по дням x воркерам, а не по всем
+-- строкам profits. День - DATE(created_at), как CURRENT_DATE в прежних функциях.
+-- Выполнить после user_deliverability.sql и dashboard_summary.sql.
+CREATE TABLE IF NOT EXISTS profit_daily_rollup (
+    worker_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    service_name TEXT NOT NULL DEFAULT '',
+    profit_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    profit_count INTEGER NOT NULL DEFAULT 0,
+    profit_max DECIMAL(12,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (worker_id, day, service_name)
+);
+
+-- Периоды команды (день / неделя / месяц) и топы
+CREATE INDEX IF NOT EXISTS idx_profit_rollup_day ON profit_daily_rollup(day, worker_id);
+
+COMMENT ON TABLE profit_daily_rollup IS 'Дневные итоги net_profit по воркеру и сервису (триггер на profits)';
+
+-- Пересчитать одну ячейку из profits (удаление / изменение профита - редкие операции)
+CREATE OR REPLACE FUNCTION refresh_profit_rollup_bucket(p_worker_id BIGINT, p_day DATE, p_service_name TEXT)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM profit_daily_rollup
+    WHERE worker_id = p_worker_id AND day = p_day AND service_name = COALESCE(p_service_name, '');
+
+    INSERT INTO profit_daily_rollup (worker_id, day, service_name, profit_sum, profit_count, profit_max)
+    SELECT worker_id, DATE(created_at), COALESCE(service_name, ''), SUM(net_profit), COUNT(*), MAX(net_profit)
+    FROM profits
+    WHERE worker_id = p_worker_id
+      AND created_at >= p_day AND created_at < p_day + 1
+      AND COALESCE(service_name, '') = COALESCE(p_service_name, '')
+    GROUP BY worker_id, DATE(created_at), COALESCE(service_name, '');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Вставка - инкрементально (атомарный upsert), изменение и удаление - пересчёт ячейки
+CREATE OR REPLACE FUNCTION profits_rollup_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO profit_daily_rollup (worker_id, day, service_name, profit_sum, profit_count, profit_max)
+        VALUES (NEW.worker_id, DATE(NEW.created_at), COALESCE(NEW.service_name, ''), NEW.net_profit, 1, NEW.net_profit)
+        ON CONFLICT (worker_id, day, service_name) DO UPDATE SET
+            profit_sum = profit_daily_rollup.profit_sum + EXCLUDED.profit_sum,
+            profit_count = profit_daily_rollup.profit_count + 1,
+            profit_max = GREATEST(profit_daily_rollup.profit_max, EXCLUDED.profit_max);
+        RETURN NEW;
+    END IF;
+
+    PERFORM refresh_profit_rollup_bucket(OLD.worker_id, DATE(OLD.created_at), OLD.service_name);
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM refresh_profit_rollup_bucket(NEW.worker_id, DATE(NEW.created_at), NEW.service_name);
+        RETURN NEW;
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_profits_rollup ON profits;
+CREATE TRIGGER trg_profits_rollup
+    AFTER INSERT OR DELETE OR UPDATE OF worker_id, net_profit, service_name, created_at ON profits
+    FOR EACH ROW EXECUTE FUNCTION profits_rollup_trigger();
+
+-- Заполнение / починка итогов за диапазон дней (NULL - без границы)
+CREATE OR REPLACE FUNCTION backfill_profit_daily_rollup(p_from DATE DEFAULT NULL, p_to DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    DELETE FROM profit_daily_rollup
+    WHERE (p_from IS NULL OR day >= p_from) AND (p_to IS NULL OR day <= p_to);
+
+    INSERT INTO profit_daily_rollup (worker_id, day, service_name, profit_sum, profit_count, profit_max)
+    SELECT worker_id, DATE(created_at), COALESCE(service_name, ''), SUM(net_profit), COUNT(*), MAX(net_profit)
+    FROM profits
+    WHERE (p_from IS NULL OR created_at >= p_from) AND (p_to IS NULL OR created_at < p_to + 1)
+    GROUP BY worker_id, DATE(created_at), COALESCE(service_name, '');
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION backfill_profit_daily_rollup IS 'Пересчитать profit_daily_rollup из profits за диапазон дней';
+
+SELECT backfill_profit_daily_rollup();
+
+-- ============================================
+-- ФУНКЦИИ СТАТИСТИКИ ПО ROLLUP
+-- ============================================
+-- Неделя = последние 7 календарных дней включая сегодня (раньше - NOW() - 7 дней по часам)
+
+CREATE OR REPLACE FUNCTION get_user_stats(p_user_id BIGINT)
+RETURNS TABLE (
+    total_count BIGINT,
+    total_profit DECIMAL,
+    avg_profit DECIMAL,
+    max_profit DECIMAL,
+    month_profit DECIMAL,
+    week_profit DECIMAL,
+    day_profit DECIMAL
+) AS $$
+SELECT
+    COALESCE(SUM(profit_count), 0)::BIGINT,
+    COALESCE(SUM(profit_sum), 0)::DECIMAL,
+    COALESCE(SUM(profit_sum) / NULLIF(SUM(profit_count), 0), 0)::DECIMAL,
+    COALESCE(MAX(profit_max), 0)::DECIMAL,
+    COALESCE(SUM(profit_sum) FILTER (WHERE day >= DATE_TRUNC('month', CURRENT_DATE)), 0)::DECIMAL,
+    COALESCE(SUM(profit_sum) FILTER (WHERE day >= CURRENT_DATE - 6), 0)::DECIMAL,
+    COALESCE(SUM(profit_sum) FILTER (WHERE day = CURRENT_DATE), 0)::DECIMAL
+FROM profit_daily_rollup
+WHERE worker_id = p_user_id;
+$$ LANGUAGE sql STABLE;
+
+-- Профит воркера по сервисам (раньше бот скачивал все его профиты)
+CREATE OR REPLACE FUNCTION get_user_service_breakdown(p_user_id BIGINT)
+RETURNS TABLE (
+    service_name TEXT,
+    service_profit DECIMAL
+) AS $$
+SELECT service_name, SUM(profit_sum)::DECIMAL
+FROM profit_daily_rollup
+WHERE worker_id = p_user_id
+GROUP BY service_name
+ORDER BY SUM(profit_sum) DESC;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION get_top_workers(
+    p_period TEXT DEFAULT 'all',
+    p_limit INTEGER DEFAULT 10
+)
+RETURNS TABLE (
+    user_id BIGINT,
+    full_name TEXT,
+    username TEXT,
+    user_tag TEXT,
+    total_profit DECIMAL,
+    profit_count BIGINT
+) AS $$
+WITH totals AS (
+    SELECT worker_id, SUM(profit_sum) AS total_profit, SUM(profit_count) AS profit_count
+    FROM profit_daily_rollup
+    WHERE day >= CASE p_period
+        WHEN 'day' THEN CURRENT_DATE
+        WHEN 'week' THEN CURRENT_DATE - 6
+        WHEN 'month' THEN DATE_TRUNC('month', CURRENT_DATE)::DATE
+        ELSE '-infinity'::DATE
+    END
+    GROUP BY worker_id
+    HAVING SUM(profit_sum) > 0
+)
+SELECT
+    u.id,
+    u.full_name,
+    u.username,
+    u.user_tag,
+    t.total_profit::DECIMAL,
+    t.profit_count::BIGINT
+FROM totals t
+JOIN users u ON u.id = t.worker_id
+WHERE u.status = 'active'
+ORDER BY t.total_profit DESC
+LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION get_user_position(p_user_id BIGINT)
+RETURNS TABLE (
+    overall_rank BIGINT,
+    overall_profit DECIMAL,
+    monthly_rank BIGINT,
+    monthly_profit DECIMAL,
+    total_users BIGINT,
+    user_avg_profit DECIMAL,
+    team_avg_profit DECIMAL,
+    user_tag TEXT
+) AS $$
+WITH totals AS (
+    SELECT
+        worker_id,
+        SUM(profit_sum) AS total_profit,
+        SUM(profit_sum) FILTER (WHERE day >= DATE_TRUNC('month', CURRENT_DATE)) AS month_profit
+    FROM profit_daily_rollup
+    GROUP BY worker_id
+),
+ranked AS (
+    SELECT
+        u.id,
+        u.user_tag,
+        COALESCE(t.total_profit, 0) AS total_profit,
+        COALESCE(t.month_profit, 0) AS month_profit,
+        ROW_NUMBER() OVER (ORDER BY COALESCE(t.total_profit, 0) DESC) AS overall_rank,
+        ROW_NUMBER() OVER (ORDER BY COALESCE(t.month_profit, 0) DESC) AS monthly_rank
+    FROM users u
+    LEFT JOIN totals t ON t.worker_id = u.id
+    WHERE u.status = 'active'
+)
+SELECT
+    r.overall_rank::BIGINT,
+    r.total_profit::DECIMAL,
+    r.monthly_rank::BIGINT,
+    r.month_profit::DECIMAL,
+    (SELECT COUNT(*) FROM ranked)::BIGINT,
+    r.total_profit::DECIMAL,
+    (SELECT AVG(total_profit) FROM ranked)::DECIMAL,
+    r.user_tag
+FROM ranked r
+WHERE r.id = p_user_id;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION get_mentor_students(mentor_user_id_param BIGINT)
+RETURNS TABLE (
+    student_id BIGINT,
+    student_tag TEXT,
+    username TEXT,
+    full_name TEXT,
+    total_profit DECIMAL(12,2),
+    last_activity TIMESTAMPTZ,
+    mentor_earnings DECIMAL(12,2),
+    is_deliverable BOOLEAN
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        u.id,
+        u.user_tag,
+        u.username,
+        u.full_name,
+        COALESCE(stats.total_profit, 0)::DECIMAL(12,2),
+        u.last_activity,
+        COALESCE(mentor_earnings_data.total_earned, 0)::DECIMAL(12,2),
+        u.is_deliverable
+    FROM users u
+    INNER JOIN mentors m ON u.mentor_id = m.id
+    LEFT JOIN LATERAL (
+        SELECT SUM(r.profit_sum) AS total_profit
+        FROM profit_daily_rollup r
+        WHERE r.worker_id = u.id
+    ) stats ON TRUE
+    LEFT JOIN (
+        SELECT
+            mp.student_id as stud_id,
+            SUM(mp.amount) as total_earned
+        FROM mentor_profits mp
+        WHERE mp.mentor_user_id = mentor_user_id_param
+        GROUP BY mp.student_id
+    ) mentor_earnings_data ON u.id = mentor_earnings_data.stud_id
+    WHERE m.user_id = mentor_user_id_param
+    ORDER BY stats.total_profit DESC NULLS LAST;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION get_dashboard_summary(p_top_limit INTEGER DEFAULT 5)
+RETURNS JSONB AS $$
+WITH agg AS (
+    SELECT
+        COALESCE(SUM(r.profit_sum), 0) AS all_total,
+        COALESCE(SUM(r.profit_count), 0) AS all_count,
+        COUNT(DISTINCT r.worker_id) AS all_workers,
+
+        COALESCE(SUM(r.profit_sum) FILTER (WHERE r.day >= DATE_TRUNC('month', CURRENT_DATE)), 0) AS month_total,
+        COALESCE(SUM(r.profit_count) FILTER (WHERE r.day >= DATE_TRUNC('month', CURRENT_DATE)), 0) AS month_count,
+        COUNT(DISTINCT r.worker_id) FILTER (WHERE r.day >= DATE_TRUNC('month', CURRENT_DATE)) AS month_workers,
+
+        COALESCE(SUM(r.profit_sum) FILTER (WHERE r.day >= CURRENT_DATE - 6), 0) AS week_total,
+        COALESCE(SUM(r.profit_count) FILTER (WHERE r.day >= CURRENT_DATE - 6), 0) AS week_count,
+        COUNT(DISTINCT r.worker_id) FILTER (WHERE r.day >= CURRENT_DATE - 6) AS week_workers,
+
+        COALESCE(SUM(r.profit_sum) FILTER (WHERE r.day = CURRENT_DATE), 0) AS day_total,
+        COALESCE(SUM(r.profit_count) FILTER (WHERE r.day = CURRENT_DATE), 0) AS day_count,
+        COUNT(DISTINCT r.worker_id) FILTER (WHERE r.day = CURRENT_DATE) AS day_workers
+    FROM profit_daily_rollup r
+)
+SELECT jsonb_build_object(
+    'active_users', (SELECT COUNT(*) FROM users WHERE status = 'active'),
+    'periods', jsonb_build_object(
+        'all',   jsonb_build_object('total_profit', a.all_total,   'profits_count', a.all_count,   'active_workers', a.all_workers),
+        'month', jsonb_build_object('total_profit', a.month_total, 'profits_count', a.month_count, 'active_workers', a.month_workers),
+        'week',  jsonb_build_object('total_profit', a.week_total,  'profits_count', a.week_count,  'active_workers', a.week_workers),
+        'day',   jsonb_build_object('total_profit', a.day_total,   'profits_count', a.day_count,   'active_workers', a.day_workers)
+    ),
+    'top_workers', COALESCE((
+        SELECT jsonb_agg(to_jsonb(t) ORDER BY t.total_profit DESC)
+        FROM get_top_workers('all', p_top_limit) t
+    ), '[]'::jsonb),
+    'generated_at', NOW()
+)
+FROM agg a;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,170 @@
+-- ============================================
+-- PROFIT SKETCHES - РАСПРЕДЕЛЕНИЕ ПРОФИТОВ (МЕДИАНА, ПЕРЦЕНТИЛИ)
+-- ============================================
+
+-- Для каждой области (вся команда, воркер, сервис, студенты наставника)
+-- хранится гистограмма net_profit в логарифмических корзинах (DDSketch):
+-- корзина i покрывает (gamma^(i-1), gamma^i], gamma = 1.01 / 0.99, так что
+-- любой перцентиль восстанавливается с относительной ошибкой не больше 1%.
+-- Корзины - JSONB {"индекс": количество}; на сотни тысяч профитов это
+-- несколько сотен ключей. Профиты <= 0 считаются в корзине "z".
+-- Обновляется триггерами при каждом профите, бот читает одну строку.
+-- Формула корзины должна совпадать с utils/quantiles.py.
+
+CREATE TABLE IF NOT EXISTS profit_sketches (
+    scope TEXT NOT NULL,                          -- team | worker | service | mentor
+    scope_key TEXT NOT NULL,                      -- 'all' | worker_id | service_name | mentor_user_id
+    buckets JSONB NOT NULL DEFAULT '{}'::jsonb,
+    total_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (scope, scope_key)
+);
+
+CREATE OR REPLACE FUNCTION profit_sketch_bucket(p_value DECIMAL)
+RETURNS TEXT AS $$
+SELECT CASE
+    WHEN p_value IS NULL OR p_value <= 0 THEN 'z'
+    ELSE CEIL(LN(p_value) / LN(1.01 / 0.99))::INTEGER::TEXT
+END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- +1 / -1 к корзине значения p_value в области (p_scope, p_key)
+CREATE OR REPLACE FUNCTION profit_sketch_add(p_scope TEXT, p_key TEXT, p_value DECIMAL, p_delta INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    v_bucket TEXT := profit_sketch_bucket(p_value);
+BEGIN
+    IF p_key IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO profit_sketches (scope, scope_key, buckets, total_count)
+    VALUES (p_scope, p_key, jsonb_build_object(v_bucket, GREATEST(p_delta, 0)), GREATEST(p_delta, 0))
+    ON CONFLICT (scope, scope_key) DO UPDATE SET
+        buckets = CASE
+            WHEN COALESCE((profit_sketches.buckets->>v_bucket)::BIGINT, 0) + p_delta <= 0
+                THEN profit_sketches.buckets - v_bucket
+            ELSE jsonb_set(profit_sketches.buckets, ARRAY[v_bucket],
+                           to_jsonb(COALESCE((profit_sketches.buckets->>v_bucket)::BIGINT, 0) + p_delta))
+        END,
+        total_count = GREATEST(profit_sketches.total_count + p_delta, 0),
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION profit_sketches_on_profit()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM profit_sketch_add('team', 'all', OLD.net_profit, -1);
+        PERFORM profit_sketch_add('worker', OLD.worker_id::TEXT, OLD.net_profit, -1);
+        PERFORM profit_sketch_add('service', OLD.service_name, OLD.net_profit, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM profit_sketch_add('team', 'all', NEW.net_profit, 1);
+        PERFORM profit_sketch_add('worker', NEW.worker_id::TEXT, NEW.net_profit, 1);
+        PERFORM profit_sketch_add('service', NEW.service_name, NEW.net_profit, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_profit_sketches ON profits;
+CREATE TRIGGER trg_profit_sketches
+AFTER INSERT OR DELETE OR UPDATE OF net_profit, worker_id, service_name ON profits
+FOR EACH ROW EXECUTE FUNCTION profit_sketches_on_profit();
+
+-- Студенты наставника: профит студента, за который наставник получил начисление
+-- (вставка и прямое удаление начисления)
+CREATE OR REPLACE FUNCTION profit_sketches_on_mentor_profit()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row mentor_profits%ROWTYPE;
+    v_value DECIMAL;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_row := OLD;
+    ELSE
+        v_row := NEW;
+    END IF;
+    SELECT net_profit INTO v_value FROM profits WHERE id = v_row.profit_id;
+    -- Профит уже удалён (каскад) - корзину наставника уменьшил триггер на profits
+    IF v_value IS NOT NULL THEN
+        PERFORM profit_sketch_add('mentor', v_row.mentor_user_id::TEXT, v_value,
+                                  CASE WHEN TG_OP = 'DELETE' THEN -1 ELSE 1 END);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_profit_sketches_mentor ON mentor_profits;
+CREATE TRIGGER trg_profit_sketches_mentor
+AFTER INSERT OR DELETE ON mentor_profits
+FOR EACH ROW EXECUTE FUNCTION profit_sketches_on_mentor_profit();
+
+-- Удаление профита и изменение суммы: корзины наставников правятся ДО каскада,
+-- пока строки mentor_profits этого профита ещё существуют
+CREATE INDEX IF NOT EXISTS idx_mentor_profits_profit ON mentor_profits(profit_id);
+
+CREATE OR REPLACE FUNCTION profit_sketches_mentor_on_profit()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_mentor BIGINT;
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.net_profit IS NOT DISTINCT FROM OLD.net_profit THEN
+        RETURN NEW;
+    END IF;
+
+    FOR v_mentor IN SELECT mentor_user_id FROM mentor_profits WHERE profit_id = OLD.id LOOP
+        PERFORM profit_sketch_add('mentor', v_mentor::TEXT, OLD.net_profit, -1);
+        IF TG_OP = 'UPDATE' THEN
+            PERFORM profit_sketch_add('mentor', v_mentor::TEXT, NEW.net_profit, 1);
+        END IF;
+    END LOOP;
+
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_profit_sketches_mentor_profit ON profits;
+CREATE TRIGGER trg_profit_sketches_mentor_profit
+BEFORE DELETE OR UPDATE OF net_profit ON profits
+FOR EACH ROW EXECUTE FUNCTION profit_sketches_mentor_on_profit();
+
+-- Полный пересчёт (первый запуск, ручной ремонт)
+CREATE OR REPLACE FUNCTION rebuild_profit_sketches()
+RETURNS BIGINT AS $$
+DECLARE
+    v_rows BIGINT;
+BEGIN
+    DELETE FROM profit_sketches WHERE TRUE;
+
+    INSERT INTO profit_sketches (scope, scope_key, buckets, total_count)
+    SELECT scope, scope_key, jsonb_object_agg(bucket, cnt), SUM(cnt)
+    FROM (
+        SELECT 'team' AS scope, 'all' AS scope_key, profit_sketch_bucket(net_profit) AS bucket, COUNT(*) AS cnt
+        FROM profits GROUP BY 3
+        UNION ALL
+        SELECT 'worker', worker_id::TEXT, profit_sketch_bucket(net_profit), COUNT(*)
+        FROM profits GROUP BY 2, 3
+        UNION ALL
+        SELECT 'service', service_name, profit_sketch_bucket(net_profit), COUNT(*)
+        FROM profits GROUP BY 2, 3
+        UNION ALL
+        SELECT 'mentor', mp.mentor_user_id::TEXT, profit_sketch_bucket(p.net_profit), COUNT(*)
+        FROM mentor_profits mp JOIN profits p ON p.id = mp.profit_id GROUP BY 2, 3
+    ) s
+    GROUP BY scope, scope_key;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_profit_sketches();
+
+COMMENT ON TABLE profit_sketches IS 'Распределение net_profit по областям (логарифмические корзины, ошибка перцентилей до 1%)';
+COMMENT ON FUNCTION rebuild_profit_sketches IS 'Пересчёт всех скетчей из profits и mentor_profits';
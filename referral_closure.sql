@@ -0,0 +1,119 @@
+-- ============================================
+-- REFERRAL CLOSURE - МНОГОУРОВНЕВОЕ РЕФЕРАЛЬНОЕ ДЕРЕВО
+-- ============================================
+
+-- Для каждой пары (предок, потомок) в дереве приглашений хранится одна строка
+-- с глубиной: 1 - прямой реферал, 2 - реферал реферала и т.д. Вся команда
+-- пользователя (любой глубины) читается одним запросом по индексу
+-- (ancestor_id, depth), без обхода уровней. Поддерживается триггером на users
+-- (регистрация с referrer_id, смена или обнуление referrer_id).
+-- Выполнить после profit_daily_rollup.sql.
+CREATE TABLE IF NOT EXISTS referral_closure (
+    ancestor_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    descendant_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL CHECK (depth > 0),
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_referral_closure_ancestor_depth ON referral_closure(ancestor_id, depth);
+CREATE INDEX IF NOT EXISTS idx_referral_closure_descendant ON referral_closure(descendant_id);
+
+COMMENT ON TABLE referral_closure IS 'Транзитивное замыкание users.referrer_id: предок, потомок, глубина';
+
+CREATE OR REPLACE FUNCTION referral_closure_on_user()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        IF NEW.referrer_id IS NOT DISTINCT FROM OLD.referrer_id THEN
+            RETURN NULL;
+        END IF;
+        -- Приглашение самого себя или своего потомка дало бы цикл
+        IF NEW.referrer_id = NEW.id OR EXISTS (
+            SELECT 1 FROM referral_closure WHERE ancestor_id = NEW.id AND descendant_id = NEW.referrer_id
+        ) THEN
+            RAISE EXCEPTION 'referral cycle: % -> %', NEW.id, NEW.referrer_id;
+        END IF;
+        -- Отцепить поддерево (пользователь и его команда) от прежних предков
+        DELETE FROM referral_closure c
+        USING referral_closure up
+        WHERE up.descendant_id = NEW.id
+          AND c.ancestor_id = up.ancestor_id
+          AND (c.descendant_id = NEW.id OR c.descendant_id IN (
+              SELECT descendant_id FROM referral_closure WHERE ancestor_id = NEW.id
+          ));
+    END IF;
+
+    IF NEW.referrer_id IS NOT NULL AND NEW.referrer_id <> NEW.id THEN
+        -- Новый пригласивший и все его предки становятся предками поддерева
+        INSERT INTO referral_closure (ancestor_id, descendant_id, depth)
+        SELECT up.ancestor_id, down.descendant_id, up.depth + down.depth
+        FROM (
+            SELECT NEW.referrer_id AS ancestor_id, 1 AS depth
+            UNION ALL
+            SELECT ancestor_id, depth + 1 FROM referral_closure WHERE descendant_id = NEW.referrer_id
+        ) up
+        CROSS JOIN (
+            SELECT NEW.id AS descendant_id, 0 AS depth
+            UNION ALL
+            SELECT descendant_id, depth FROM referral_closure WHERE ancestor_id = NEW.id
+        ) down
+        ON CONFLICT (ancestor_id, descendant_id) DO UPDATE SET depth = EXCLUDED.depth;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_referral_closure ON users;
+CREATE TRIGGER trg_referral_closure
+AFTER INSERT OR UPDATE OF referrer_id ON users
+FOR EACH ROW EXECUTE FUNCTION referral_closure_on_user();
+
+-- Заполнение по уже существующим пользователям
+TRUNCATE referral_closure;
+
+INSERT INTO referral_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE tree AS (
+    SELECT referrer_id AS ancestor_id, id AS descendant_id, 1 AS depth
+    FROM users
+    WHERE referrer_id IS NOT NULL AND referrer_id <> id
+    UNION ALL
+    SELECT u.referrer_id, t.descendant_id, t.depth + 1
+    FROM tree t
+    JOIN users u ON u.id = t.ancestor_id
+    WHERE u.referrer_id IS NOT NULL AND t.depth < 100
+)
+SELECT ancestor_id, descendant_id, MIN(depth)
+FROM tree
+GROUP BY ancestor_id, descendant_id;
+
+-- Команда пользователя по уровням: участники, активные, профиты команды.
+-- Профиты - из profit_daily_rollup (первичный ключ по worker_id).
+-- Уровни без участников не возвращаются.
+CREATE OR REPLACE FUNCTION get_referral_tree_stats(p_user_id BIGINT, p_max_depth INTEGER DEFAULT 3)
+RETURNS TABLE (
+    depth INTEGER,
+    members BIGINT,
+    active_members BIGINT,
+    profit_count BIGINT,
+    profit_sum DECIMAL(14,2)
+) AS $$
+SELECT
+    c.depth,
+    COUNT(*)::BIGINT,
+    COUNT(*) FILTER (WHERE u.status = 'active')::BIGINT,
+    COALESCE(SUM(r.cnt), 0)::BIGINT,
+    COALESCE(SUM(r.total), 0)::DECIMAL(14,2)
+FROM referral_closure c
+JOIN users u ON u.id = c.descendant_id
+LEFT JOIN LATERAL (
+    SELECT SUM(profit_count) AS cnt, SUM(profit_sum) AS total
+    FROM profit_daily_rollup
+    WHERE worker_id = c.descendant_id
+) r ON TRUE
+WHERE c.ancestor_id = p_user_id
+  AND c.depth <= p_max_depth
+GROUP BY c.depth
+ORDER BY c.depth;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION get_referral_tree_stats IS 'Команда пользователя по уровням: размер, активные, сумма профитов';
@@ -0,0 +1,44 @@
+"""Analytics store startup: an empty store must still load and subscribe."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import config
+from utils import analytics_store
+
+
+def _profit(profit_id: int, net_profit: float) -> dict:
+    return {
+        "id": profit_id, "worker_id": 1, "service_name": "Avito", "amount": net_profit,
+        "net_profit": net_profit, "created_at": "2026-01-01T00:00:00+00:00", "status": "hold",
+    }
+
+
+def test_empty_store_starts_and_loads(monkeypatch):
+    rows = [_profit(1, 5.0), _profit(2, 7.0)]
+
+    async def page(after_id, limit):
+        return [r for r in rows if r["id"] > after_id][:limit]
+
+    monkeypatch.setattr(config, "ANALYTICS_STORE_ENABLED", True)
+    monkeypatch.setattr(analytics_store, "get_profit_rows_page", page)
+    monkeypatch.setattr(analytics_store, "profits_store", None)
+
+    async def scenario():
+        store = analytics_store.init_analytics_store()
+        assert store is not None and len(store) == 0
+
+        task = asyncio.create_task(analytics_store.start_analytics_store())
+        for _ in range(100):
+            if store.ready:
+                break
+            await asyncio.sleep(0.01)
+        analytics_store.stop_analytics_store()
+        await asyncio.wait_for(task, 1)
+        return store
+
+    store = asyncio.run(scenario())
+    assert store.ready and len(store) == 2
+    assert analytics_store.team_period_stats("all")["total_profit"] == 12.0
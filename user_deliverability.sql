@@ -0,0 +1,65 @@
+-- ============================================
+-- DELIVERABILITY - ПОЛЬЗОВАТЕЛИ, КОТОРЫМ НЕЛЬЗЯ ДОСТАВИТЬ СООБЩЕНИЕ
+-- ============================================
+
+-- Помечаются пачкой, когда рассылка получает Forbidden (бот заблокирован,
+-- аккаунт удалён) или "chat not found". Рассылки их пропускают;
+-- флаг снимается, когда пользователь снова пишет боту.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS is_deliverable BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS undeliverable_at TIMESTAMPTZ;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS undeliverable_reason TEXT;
+
+-- Аудитория рассылок: активные и доступные, по возрастанию id (keyset)
+CREATE INDEX IF NOT EXISTS idx_users_broadcast_audience
+    ON users(id) WHERE status = 'active' AND is_deliverable;
+
+COMMENT ON COLUMN users.is_deliverable IS 'FALSE - бот заблокирован / чат не найден, рассылки пропускают';
+COMMENT ON COLUMN users.undeliverable_at IS 'Когда доставка перестала работать';
+COMMENT ON COLUMN users.undeliverable_reason IS 'Последняя ошибка Telegram при доставке';
+
+-- get_mentor_students: добавлен is_deliverable (тип результата меняется - нужен DROP)
+DROP FUNCTION IF EXISTS get_mentor_students(BIGINT);
+
+CREATE OR REPLACE FUNCTION get_mentor_students(mentor_user_id_param BIGINT)
+RETURNS TABLE (
+    student_id BIGINT,
+    student_tag TEXT,
+    username TEXT,
+    full_name TEXT,
+    total_profit DECIMAL(12,2),
+    last_activity TIMESTAMPTZ,
+    mentor_earnings DECIMAL(12,2),
+    is_deliverable BOOLEAN
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT 
+        u.id,
+        u.user_tag,
+        u.username,
+        u.full_name,
+        COALESCE(stats.total_profit, 0),
+        u.last_activity,
+        COALESCE(mentor_earnings_data.total_earned, 0),
+        u.is_deliverable
+    FROM users u
+    INNER JOIN mentors m ON u.mentor_id = m.id
+    LEFT JOIN (
+        SELECT 
+            worker_id,
+            SUM(net_profit) as total_profit
+        FROM profits 
+        GROUP BY worker_id
+    ) stats ON u.id = stats.worker_id
+    LEFT JOIN (
+        SELECT 
+            mp.student_id as stud_id,
+            SUM(mp.amount) as total_earned
+        FROM mentor_profits mp
+        WHERE mp.mentor_user_id = mentor_user_id_param
+        GROUP BY mp.student_id
+    ) mentor_earnings_data ON u.id = mentor_earnings_data.stud_id
+    WHERE m.user_id = mentor_user_id_param
+    ORDER BY stats.total_profit DESC NULLS LAST;
+END;
+$$ LANGUAGE plpgsql;
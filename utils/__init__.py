@@ -1,10 +1,10 @@
 """Utilities package."""
 from utils.design import header, service_card, profit_card, mentor_card
 from utils.messages import answer_with_brand, edit_with_brand
-from utils.ranks import get_rank_info, check_rank_up, get_rank_reward_message
+from utils.ranks import get_rank_info, rank_for, check_rank_up, get_rank_reward_message
 
 __all__ = [
     "header", "service_card", "profit_card", "mentor_card",
     "answer_with_brand", "edit_with_brand",
-    "get_rank_info", "check_rank_up", "get_rank_reward_message",
+    "get_rank_info", "rank_for", "check_rank_up", "get_rank_reward_message",
 ]
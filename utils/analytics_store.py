@@ -0,0 +1,367 @@
+"""In-process columnar profits store with vectorized analytics (optional, needs numpy).
+
+Profits are held as parallel NumPy columns; period / worker / service
+aggregations and top-N run as array operations instead of SQL round-trips.
+
+Columns and memory per row:
+    id          int64    8 B
+    worker_id   int64    8 B
+    service     int32    4 B   (service_name, dictionary-encoded)
+    amount      float64  8 B
+    net_profit  float64  8 B
+    ts          int64    8 B   (created_at, unix seconds UTC)
+    status      int8     1 B   (0 hold, 1 paid)
+    ----------------------
+                        45 B  ->  ~45 MB per million rows
+
+Capacity doubles on growth, so the worst case right after a resize is
+~90 MB per million rows. Service names cost one Python string each.
+
+New profits are appended from the profit_created event, payouts flip
+status from profits_paid. Edits and deletes made outside the bot are
+picked up by a full resync every ANALYTICS_RESYNC_INTERVAL seconds.
+
+Used by the admin team period stats (team_period_stats); everything else
+still reads the database.
+"""
+import logging
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+import config
+from database import get_profit_rows_page, subscribe
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+STATUS_HOLD = 0
+STATUS_PAID = 1
+
+_COLUMNS = {
+    "id": "int64",
+    "worker_id": "int64",
+    "service": "int32",
+    "amount": "float64",
+    "net_profit": "float64",
+    "ts": "int64",
+    "status": "int8",
+}
+
+BYTES_PER_ROW = 45
+
+
+def _to_ts(value: Any) -> int:
+    """created_at from PostgREST (ISO string) -> unix seconds UTC."""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def period_start(period: str, now: Optional[datetime] = None) -> Optional[int]:
+    """Window start (unix seconds) - same boundaries as the SQL stats (UTC, week = today - 6 days)."""
+    now = now or datetime.now(timezone.utc)
+    today = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+    if period == "day":
+        start = today
+    elif period == "week":
+        start = today - timedelta(days=6)
+    elif period == "month":
+        start = today.replace(day=1)
+    else:
+        return None
+    return int(start.timestamp())
+
+
+class ProfitsStore:
+    """Columnar copy of the profits table."""
+
+    def __init__(self, capacity: int = 1024):
+        self._cols: Dict[str, Any] = {}
+        self._size = 0
+        self._services: Dict[str, int] = {}
+        self._service_names: List[str] = []
+        self._max_id = 0
+        self._resync_lock = asyncio.Lock()
+        self._events: Optional[List[Tuple[str, Any]]] = None  # События во время resync (для повтора)
+        self._wakeup = asyncio.Event()
+        self.is_running = False
+        self.ready = False
+        self.last_sync: Optional[datetime] = None
+        if np is not None:
+            self._cols = self._alloc(capacity)
+
+    # ============================================
+    # STORAGE
+    # ============================================
+
+    @staticmethod
+    def _alloc(capacity: int) -> Dict[str, Any]:
+        return {name: np.zeros(capacity, dtype=dtype) for name, dtype in _COLUMNS.items()}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _col(self, name: str):
+        return self._cols[name][:self._size]
+
+    def _service_code(self, name: Optional[str]) -> int:
+        name = name or ""
+        code = self._services.get(name)
+        if code is None:
+            code = len(self._service_names)
+            self._services[name] = code
+            self._service_names.append(name)
+        return code
+
+    def _reserve(self, extra: int) -> None:
+        capacity = len(self._cols["id"])
+        need = self._size + extra
+        if need <= capacity:
+            return
+        while capacity < need:
+            capacity *= 2
+        grown = self._alloc(capacity)
+        for name, col in self._cols.items():
+            grown[name][:self._size] = col[:self._size]
+        self._cols = grown
+
+    def append(self, rows: List[Dict[str, Any]]) -> int:
+        """Add profit rows (skips ids already present). Returns rows added."""
+        # ids are serial: only rows at or below the max seen id can be duplicates
+        old = [r["id"] for r in rows if r["id"] <= self._max_id]
+        if old:
+            seen = set(np.asarray(old)[np.isin(old, self._col("id"))].tolist())
+            rows = [r for r in rows if r["id"] not in seen]
+        if not rows:
+            return 0
+        self._reserve(len(rows))
+        start, end = self._size, self._size + len(rows)
+        c = self._cols
+        c["id"][start:end] = [r["id"] for r in rows]
+        c["worker_id"][start:end] = [r["worker_id"] for r in rows]
+        c["service"][start:end] = [self._service_code(r.get("service_name")) for r in rows]
+        c["amount"][start:end] = [float(r.get("amount") or 0) for r in rows]
+        c["net_profit"][start:end] = [float(r.get("net_profit") or 0) for r in rows]
+        c["ts"][start:end] = [_to_ts(r["created_at"]) for r in rows]
+        c["status"][start:end] = [STATUS_PAID if r.get("status") == "paid" else STATUS_HOLD for r in rows]
+        self._max_id = max(self._max_id, int(c["id"][start:end].max()))
+        self._size = end
+        return len(rows)
+
+    def mark_paid(self, worker_id: int, up_to_id: Optional[int] = None) -> int:
+        """hold -> paid for profits of worker (ids <= up_to_id when given). Returns rows changed."""
+        status = self._col("status")
+        mask = (self._col("worker_id") == worker_id) & (status == STATUS_HOLD)
+        if up_to_id is not None:
+            mask &= self._col("id") <= up_to_id
+        status[mask] = STATUS_PAID
+        return int(mask.sum())
+
+    def memory_bytes(self) -> int:
+        """Allocated bytes of the column arrays."""
+        return sum(col.nbytes for col in self._cols.values())
+
+    # ============================================
+    # QUERIES
+    # ============================================
+
+    def _mask(self, period: str = "all", worker_id: Optional[int] = None, status: Optional[int] = None):
+        mask = np.ones(self._size, dtype=bool)
+        start = period_start(period)
+        if start is not None:
+            mask &= self._col("ts") >= start
+        if worker_id is not None:
+            mask &= self._col("worker_id") == worker_id
+        if status is not None:
+            mask &= self._col("status") == status
+        return mask
+
+    def totals(self, period: str = "all", worker_id: Optional[int] = None) -> Dict[str, Any]:
+        """Same shape as a get_dashboard_summary period: total_profit, profits_count, active_workers."""
+        mask = self._mask(period, worker_id)
+        return {
+            "total_profit": round(float(self._col("net_profit")[mask].sum()), 2),
+            "profits_count": int(mask.sum()),
+            "active_workers": int(np.unique(self._col("worker_id")[mask]).size),
+        }
+
+    def by_worker(self, period: str = "all") -> Tuple[Any, Any, Any]:
+        """(worker_ids, net_profit sums, counts) per worker in period."""
+        mask = self._mask(period)
+        workers, inverse = np.unique(self._col("worker_id")[mask], return_inverse=True)
+        sums = np.bincount(inverse, weights=self._col("net_profit")[mask], minlength=workers.size)
+        counts = np.bincount(inverse, minlength=workers.size)
+        return workers, sums, counts
+
+    def top_workers(self, period: str = "all", limit: int = 10) -> List[Dict[str, Any]]:
+        """Top workers by net profit: [{worker_id, total_profit, profit_count}]."""
+        workers, sums, counts = self.by_worker(period)
+        if workers.size == 0:
+            return []
+        if workers.size > limit:
+            idx = np.argpartition(-sums, limit - 1)[:limit]
+        else:
+            idx = np.arange(workers.size)
+        idx = idx[np.lexsort((workers[idx], -sums[idx]))]
+        return [
+            {"worker_id": int(workers[i]), "total_profit": round(float(sums[i]), 2), "profit_count": int(counts[i])}
+            for i in idx
+        ]
+
+    def by_service(self, period: str = "all", worker_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-service breakdown, biggest first: [{service_name, total_profit, profit_count}]."""
+        mask = self._mask(period, worker_id)
+        codes = self._col("service")[mask]
+        n = len(self._service_names)
+        sums = np.bincount(codes, weights=self._col("net_profit")[mask], minlength=n)
+        counts = np.bincount(codes, minlength=n)
+        order = np.argsort(-sums, kind="stable")
+        return [
+            {"service_name": self._service_names[i], "total_profit": round(float(sums[i]), 2), "profit_count": int(counts[i])}
+            for i in order if counts[i]
+        ]
+
+    def unpaid(self, worker_id: int) -> Dict[str, Any]:
+        """Hold profits of worker: total and count."""
+        mask = self._mask(worker_id=worker_id, status=STATUS_HOLD)
+        return {"total": round(float(self._col("net_profit")[mask].sum()), 2), "count": int(mask.sum())}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "rows": self._size,
+            "memory_mb": round(self.memory_bytes() / 1024 / 1024, 1),
+            "last_sync": self.last_sync.isoformat() if self.last_sync else None,
+        }
+
+    # ============================================
+    # SYNC
+    # ============================================
+
+    async def resync(self) -> int:
+        """Reload all profits into fresh columns, then swap them in. Returns rows loaded."""
+        async with self._resync_lock:
+            self._events = []
+            try:
+                return await self._load_fresh()
+            finally:
+                self._events = None
+
+    async def _load_fresh(self) -> int:
+        fresh = ProfitsStore(capacity=max(1024, len(self._cols["id"])))
+        after_id = 0
+        while True:
+            rows = await get_profit_rows_page(after_id, config.ANALYTICS_PAGE_SIZE)
+            if not rows:
+                break
+            fresh.append(rows)
+            after_id = rows[-1]["id"]
+            if len(rows) < config.ANALYTICS_PAGE_SIZE:
+                break
+
+        # Replay events that arrived while loading (pages read earlier may miss them).
+        # Old rows are not carried over, so deletes in the database take effect.
+        for kind, payload in self._events:
+            if kind == "created":
+                fresh.append([payload])
+            else:
+                fresh.mark_paid(*payload)
+
+        self._cols, self._size = fresh._cols, fresh._size
+        self._services, self._service_names = fresh._services, fresh._service_names
+        self._max_id = fresh._max_id
+        self.ready = True
+        self.last_sync = datetime.utcnow()
+        logger.info(f"Analytics store synced: {self._size} profits, {self.memory_bytes() // 1024} KB")
+        return self._size
+
+    def on_profit_created(self, profit_id: int, worker_id: int, net_profit: float,
+                          amount: float = 0, service_name: str = "", **_) -> None:
+        row = {
+            "id": profit_id,
+            "worker_id": worker_id,
+            "service_name": service_name,
+            "amount": amount,
+            "net_profit": net_profit,
+            "created_at": datetime.now(timezone.utc),
+            "status": "hold",
+        }
+        self.append([row])
+        if self._events is not None:
+            self._events.append(("created", row))
+
+    def on_profits_paid(self, worker_id: int, **_) -> None:
+        self.mark_paid(worker_id)
+        if self._events is not None:
+            # Payout covers profits known at this moment, not ones loaded later
+            self._events.append(("paid", (worker_id, self._max_id)))
+
+    async def run(self) -> None:
+        if self.is_running:
+            return
+        self.is_running = True
+        subscribe("profit_created", self.on_profit_created)
+        subscribe("profits_paid", self.on_profits_paid)
+        logger.info("Analytics store started")
+
+        while self.is_running:
+            try:
+                await self.resync()
+            except Exception as e:
+                logger.error(f"Analytics store resync error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=config.ANALYTICS_RESYNC_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def stop(self) -> None:
+        self.is_running = False
+        self._wakeup.set()
+
+
+# Global store instance (None when disabled or numpy is missing)
+profits_store: Optional[ProfitsStore] = None
+
+
+def init_analytics_store() -> Optional[ProfitsStore]:
+    """Create the store if ANALYTICS_STORE_ENABLED and numpy is installed."""
+    global profits_store
+    if not config.ANALYTICS_STORE_ENABLED:
+        return None
+    if np is None:
+        logger.error("numpy package not installed, analytics store disabled")
+        return None
+    profits_store = ProfitsStore()
+    return profits_store
+
+
+def team_period_stats(period: str) -> Optional[Dict[str, Any]]:
+    """Team totals for today/week/month/all from the store (None until loaded - use the database)."""
+    if profits_store is None or not profits_store.ready:
+        return None
+    stats = profits_store.totals("day" if period == "today" else period)
+    count = stats["profits_count"]
+    stats["avg_profit"] = stats["total_profit"] / count if count else 0
+    return stats
+
+
+async def start_analytics_store():
+    """Initial load + periodic resync."""
+    if profits_store is not None:
+        await profits_store.run()
+
+
+def stop_analytics_store():
+    """Stop resync loop."""
+    if profits_store is not None:
+        profits_store.stop()
@@ -1,14 +1,189 @@
 """Auto-delete messages utility."""
 import asyncio
+import heapq
 import logging
-from typing import Union, Optional
-from functools import wraps
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
 from aiogram import Bot
-from aiogram.types import Message
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, FSInputFile
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+import config
 
 logger = logging.getLogger(__name__)
 
+# Telegram deleteMessages accepts up to 100 ids per call
+DELETE_BATCH_LIMIT = 100
+# Deletions due within this window are sent together
+DELETE_GRACE = 0.5
+
+
+class AutoDeleteScheduler:
+    """Single timer for all scheduled deletions.
+    
+    Pending deletions live in a heap ordered by due time and are mirrored to
+    a local SQLite file, so a restart picks them up again. When entries come
+    due they are grouped per chat and removed with bulk deleteMessages calls.
+    """
+    
+    def __init__(self, store_path: str = config.AUTO_DELETE_STORE):
+        self.bot: Optional[Bot] = None
+        self.store_path = store_path
+        self._heap: List[Tuple[float, int, int]] = []  # (due_at, chat_id, message_id)
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self._db: Optional[sqlite3.Connection] = None
+    
+    # ---------- store ----------
+    
+    def _store(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.store_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.store_path)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pending_deletes ("
+                "chat_id INTEGER NOT NULL, message_id INTEGER NOT NULL, due_at REAL NOT NULL, "
+                "PRIMARY KEY (chat_id, message_id))"
+            )
+        return self._db
+    
+    def _load(self) -> None:
+        rows = self._store().execute("SELECT due_at, chat_id, message_id FROM pending_deletes").fetchall()
+        self._heap = [(due_at, chat_id, message_id) for due_at, chat_id, message_id in rows]
+        heapq.heapify(self._heap)
+    
+    # ---------- API ----------
+    
+    def schedule(self, chat_id: int, message_ids: List[int], delay: float, bot: Optional[Bot] = None) -> None:
+        """Schedule messages for deletion after `delay` seconds."""
+        if bot and not self.bot:
+            self.bot = bot
+        
+        due_at = time.time() + delay
+        rows = [(chat_id, message_id, due_at) for message_id in message_ids]
+        try:
+            with self._store() as db:
+                db.executemany("INSERT OR REPLACE INTO pending_deletes VALUES (?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Auto-delete store error: {e}")
+        
+        earliest = self._heap[0][0] if self._heap else None
+        for message_id in message_ids:
+            heapq.heappush(self._heap, (due_at, chat_id, message_id))
+        if earliest is None or due_at < earliest:
+            self._wakeup.set()
+    
+    def pending_count(self) -> int:
+        """Number of messages waiting for deletion."""
+        return len(self._heap)
+    
+    def pending_by_chat(self) -> Dict[int, int]:
+        """Pending deletions per chat."""
+        counts: Dict[int, int] = {}
+        for _, chat_id, _ in self._heap:
+            counts[chat_id] = counts.get(chat_id, 0) + 1
+        return counts
+    
+    # ---------- loop ----------
+    
+    async def run(self) -> None:
+        """Process deletions until stopped."""
+        if self._running:
+            return
+        self._running = True
+        self._load()
+        if self._heap:
+            logger.info(f"Auto-delete: {len(self._heap)} pending message(s) restored")
+        
+        while self._running:
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, self._heap[0][0] - time.time())
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                continue  # Earlier deletion scheduled or stop requested
+            except asyncio.TimeoutError:
+                pass
+            
+            try:
+                await self._delete_due()
+            except Exception as e:
+                logger.error(f"Auto-delete error: {e}")
+    
+    def stop(self) -> None:
+        self._running = False
+        self._wakeup.set()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+    
+    async def _delete_due(self) -> None:
+        if not self.bot:
+            return
+        limit = time.time() + DELETE_GRACE
+        due: Dict[int, List[int]] = {}
+        while self._heap and self._heap[0][0] <= limit:
+            _, chat_id, message_id = heapq.heappop(self._heap)
+            due.setdefault(chat_id, []).append(message_id)
+        
+        done: List[Tuple[int, int]] = []
+        for chat_id, message_ids in due.items():
+            for i in range(0, len(message_ids), DELETE_BATCH_LIMIT):
+                batch = message_ids[i:i + DELETE_BATCH_LIMIT]
+                if await self._delete_batch(chat_id, batch):
+                    done.extend((chat_id, message_id) for message_id in batch)
+        
+        if done:
+            try:
+                with self._store() as db:
+                    db.executemany("DELETE FROM pending_deletes WHERE chat_id = ? AND message_id = ?", done)
+            except sqlite3.Error as e:
+                logger.warning(f"Auto-delete store error: {e}")
+    
+    async def _delete_batch(self, chat_id: int, message_ids: List[int]) -> bool:
+        """Delete batch. Returns False if it was re-queued."""
+        try:
+            await self.bot.delete_messages(chat_id, message_ids)
+            logger.debug(f"Deleted {len(message_ids)} message(s) in chat {chat_id}")
+        except TelegramRetryAfter as e:
+            due_at = time.time() + e.retry_after
+            for message_id in message_ids:
+                heapq.heappush(self._heap, (due_at, chat_id, message_id))
+            return False
+        except TelegramBadRequest as e:
+            # Messages already gone or too old to delete - nothing to retry
+            logger.debug(f"Failed to delete messages in chat {chat_id}: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to delete messages in chat {chat_id}: {e}")
+        return True
+
+
+# Global scheduler instance
+auto_delete_scheduler = AutoDeleteScheduler()
+
+
+def init_auto_delete(bot: Bot):
+    """Bind scheduler to bot."""
+    auto_delete_scheduler.bot = bot
+
+
+async def start_auto_delete():
+    """Start deletion loop (restores pending deletions)."""
+    await auto_delete_scheduler.run()
+
+
+def stop_auto_delete():
+    """Stop deletion loop."""
+    auto_delete_scheduler.stop()
+
 
 def is_group_chat(message: Message) -> bool:
     """Check if message is from a group chat."""
@@ -21,19 +196,8 @@ async def delete_messages_after_delay(
     message_ids: list,
     delay: int = 10
 ):
-    """Delete messages after delay."""
-    try:
-        await asyncio.sleep(delay)
-        
-        for message_id in message_ids:
-            try:
-                await bot.delete_message(chat_id, message_id)
-                logger.debug(f"Deleted message {message_id} in chat {chat_id}")
-            except TelegramBadRequest as e:
-                if "message to delete not found" not in str(e).lower():
-                    logger.warning(f"Failed to delete message {message_id}: {e}")
-    except Exception as e:
-        logger.error(f"Error in delete_messages_after_delay: {e}")
+    """Schedule messages for deletion after delay."""
+    auto_delete_scheduler.schedule(chat_id, message_ids, delay, bot=bot)
 
 
 async def reply_with_auto_delete(
@@ -42,7 +206,7 @@ async def reply_with_auto_delete(
     delay: int = 10,
     delete_original: bool = True,
     use_photo: bool = True,
-    default_photo_path: str = "images/irl.jpg",
+    default_photo_path: str = config.BRAND_IMAGE_LOGO,
     **kwargs
 ) -> Message:
     """
@@ -63,11 +227,10 @@ async def reply_with_auto_delete(
     # Try to send with photo first if use_photo is True
     if use_photo:
         try:
-            from aiogram.types import FSInputFile
-            photo = FSInputFile(default_photo_path)
+            from utils.media import media_registry
             return await reply_photo_with_auto_delete(
                 message, 
-                photo=photo, 
+                photo=media_registry.photo(default_photo_path), 
                 caption=text, 
                 delay=delay, 
                 delete_original=delete_original,
@@ -85,14 +248,7 @@ async def reply_with_auto_delete(
         if delete_original:
             messages_to_delete.append(message.message_id)
         
-        asyncio.create_task(
-            delete_messages_after_delay(
-                message.bot,
-                message.chat.id,
-                messages_to_delete,
-                delay
-            )
-        )
+        auto_delete_scheduler.schedule(message.chat.id, messages_to_delete, delay, bot=message.bot)
     
     return sent_message
 
@@ -122,19 +278,17 @@ async def reply_photo_with_auto_delete(
     # Send photo reply
     sent_message = await message.reply_photo(photo, caption=caption, **kwargs)
     
+    # Remember file_id of uploaded brand images
+    if isinstance(photo, FSInputFile):
+        from utils.media import media_registry
+        await media_registry.remember(str(photo.path), sent_message)
+    
     # Schedule auto-deletion only in group chats
     if is_group_chat(message):
         messages_to_delete = [sent_message.message_id]
         if delete_original:
             messages_to_delete.append(message.message_id)
         
-        asyncio.create_task(
-            delete_messages_after_delay(
-                message.bot,
-                message.chat.id,
-                messages_to_delete,
-                delay
-            )
-        )
+        auto_delete_scheduler.schedule(message.chat.id, messages_to_delete, delay, bot=message.bot)
     
     return sent_message
\ No newline at end of file
@@ -0,0 +1,274 @@
+"""Admin broadcast engine: persisted, resumable, concurrent."""
+import logging
+import asyncio
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter,
+    TelegramNetworkError, TelegramServerError
+)
+
+import config
+from database import (
+    get_broadcast_job, get_unfinished_broadcast_jobs, update_broadcast_job,
+    get_active_user_ids_page, get_broadcast_job_done_ids, get_broadcast_job_counts,
+    save_broadcast_job_results, mark_users_undeliverable, log_admin_action
+)
+from utils.progress import ProgressReporter
+from utils.rate_limiter import RateLimiter, telegram_limiter
+
+logger = logging.getLogger(__name__)
+
+# BadRequest errors meaning the chat is gone for good (treated like Forbidden)
+UNDELIVERABLE_ERRORS = ("chat not found", "user is deactivated", "peer_id_invalid")
+
+
+def is_undeliverable(error: Exception) -> bool:
+    """Bot is blocked / chat does not exist - retrying this recipient is useless."""
+    if isinstance(error, TelegramForbiddenError):
+        return True
+    return isinstance(error, TelegramBadRequest) and any(e in str(error).lower() for e in UNDELIVERABLE_ERRORS)
+
+
+def build_job_keyboard(job: Dict[str, Any]) -> Optional[InlineKeyboardMarkup]:
+    """Build broadcast button from job row."""
+    if not job.get("button_text") or not job.get("button_url"):
+        return None
+    if job.get("button_type") == "callback":
+        button = InlineKeyboardButton(text=job["button_text"], callback_data=job["button_url"])
+    else:
+        button = InlineKeyboardButton(text=job["button_text"], url=job["button_url"])
+    return InlineKeyboardMarkup(inline_keyboard=[[button]])
+
+
+async def deliver_message(bot: Bot, chat_id: int, text: str, photo_id: Optional[str] = None,
+                          reply_markup: Optional[InlineKeyboardMarkup] = None,
+                          limiter: RateLimiter = telegram_limiter) -> Tuple[str, Optional[str]]:
+    """Send one bulk message with retries. Returns (status, error), status is sent/blocked/failed.
+    
+    "blocked" means the recipient is undeliverable (bot blocked, chat not found).
+    """
+    error = None
+    for attempt in range(config.BROADCAST_MAX_RETRIES + 1):
+        await limiter.acquire()
+        try:
+            if photo_id:
+                await bot.send_photo(chat_id, photo=photo_id, caption=text,
+                                     reply_markup=reply_markup, parse_mode="HTML")
+            else:
+                await bot.send_message(chat_id, text, reply_markup=reply_markup, parse_mode="HTML")
+            return "sent", None
+        except TelegramRetryAfter as e:
+            limiter.pause(e.retry_after)
+            error = f"RetryAfter {e.retry_after}s"
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            return ("blocked" if is_undeliverable(e) else "failed"), str(e)[:200]
+        except (TelegramNetworkError, TelegramServerError) as e:
+            error = str(e)[:200]
+            await asyncio.sleep(2 ** attempt)
+        except Exception as e:
+            return "failed", str(e)[:200]
+    return "failed", error
+
+
+class BroadcastEngine:
+    """Runs admin broadcast jobs.
+
+    Recipients are walked by ascending user id one page at a time. Delivery
+    results are stored in small batches while the page is being sent (and the
+    unsaved rest when the job is cancelled); the job cursor advances after each
+    page. A restart resumes from the last finished page and skips users that
+    already have a result, so only messages in flight at a crash can repeat.
+    """
+
+    def __init__(self, bot: Bot, workers: int = config.BROADCAST_WORKERS,
+                 limiter: RateLimiter = telegram_limiter):
+        self.bot = bot
+        self.workers = workers
+        self.limiter = limiter
+        self._jobs: Dict[int, asyncio.Task] = {}
+
+    # ---------- lifecycle ----------
+
+    async def resume(self) -> None:
+        """Resume jobs interrupted by a restart."""
+        jobs = await get_unfinished_broadcast_jobs()
+        for job in jobs:
+            self.submit(job["id"])
+        if jobs:
+            logger.info(f"Resumed {len(jobs)} broadcast job(s)")
+
+    def submit(self, job_id: int) -> None:
+        """Start processing a job in background."""
+        task = self._jobs.get(job_id)
+        if task and not task.done():
+            return
+        task = asyncio.create_task(self._run_job(job_id))
+        self._jobs[job_id] = task
+        task.add_done_callback(lambda _: self._jobs.pop(job_id, None))
+
+    async def stop(self) -> None:
+        """Cancel running jobs (they stay 'sending' and resume on next start)."""
+        tasks = list(self._jobs.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def active_jobs(self) -> List[int]:
+        return list(self._jobs)
+
+    # ---------- job processing ----------
+
+    async def _run_job(self, job_id: int) -> None:
+        try:
+            job = await get_broadcast_job(job_id)
+            if not job or job["status"] not in ("pending", "sending"):
+                return
+
+            if job["status"] == "pending":
+                await update_broadcast_job(job_id, status="sending")
+
+            counts = await get_broadcast_job_counts(job_id)
+            progress = ProgressReporter(
+                self.bot, job.get("progress_chat_id"), job.get("progress_message_id"),
+                is_photo=job.get("progress_is_photo") or False
+            )
+
+            await self._send_all(job, counts, progress)
+
+            await update_broadcast_job(
+                job_id, status="completed",
+                sent_count=counts["sent"], blocked_count=counts["blocked"], failed_count=counts["failed"]
+            )
+            await log_admin_action(
+                job["admin_id"], job.get("admin_username"), "broadcast",
+                f"{counts['sent']}/{job.get('total_count') or 0}: {job['title'][:30]}"
+            )
+            from keyboards.admin_kb import get_back_to_admin_keyboard
+            await progress.finish(self._progress_text(job, counts, done=True), get_back_to_admin_keyboard())
+            logger.info(f"Broadcast job {job_id} completed: {counts}")
+
+        except asyncio.CancelledError:
+            logger.info(f"Broadcast job {job_id} paused")
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast job {job_id} failed: {e}", exc_info=True)
+            await update_broadcast_job(job_id, status="failed")
+
+    async def _send_all(self, job: Dict[str, Any], counts: Dict[str, int], progress: ProgressReporter) -> None:
+        job_id = job["id"]
+        keyboard = build_job_keyboard(job)
+        cursor = job.get("cursor") or 0
+
+        while True:
+            user_ids = await get_active_user_ids_page(cursor, config.BROADCAST_PAGE_SIZE)
+            if not user_ids:
+                break
+
+            done = await get_broadcast_job_done_ids(job_id, user_ids)
+            pending = [uid for uid in user_ids if uid not in done]
+            await self._send_page(job, keyboard, pending, counts, progress)
+
+            cursor = user_ids[-1]
+            await update_broadcast_job(
+                job_id, cursor=cursor,
+                sent_count=counts["sent"], blocked_count=counts["blocked"], failed_count=counts["failed"]
+            )
+
+    async def _send_page(self, job: Dict[str, Any], keyboard: Optional[InlineKeyboardMarkup],
+                         user_ids: List[int], counts: Dict[str, int],
+                         progress: ProgressReporter) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        for uid in user_ids:
+            queue.put_nowait(uid)
+
+        buffer: List[Dict[str, Any]] = []
+        saves: Set[asyncio.Task] = set()
+
+        def flush() -> asyncio.Task:
+            batch = buffer[:]
+            buffer.clear()
+            task = asyncio.ensure_future(self._save_results(job["id"], batch))
+            saves.add(task)
+            task.add_done_callback(saves.discard)
+            return task
+
+        async def worker():
+            while True:
+                try:
+                    uid = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                status, error = await deliver_message(
+                    self.bot, uid, job["message_text"], photo_id=job.get("photo_id"),
+                    reply_markup=keyboard, limiter=self.limiter
+                )
+                counts[status] += 1
+                buffer.append({"user_id": uid, "status": status, "error_message": error})
+                progress.update(self._progress_text(job, counts))
+                if len(buffer) >= config.BROADCAST_FLUSH_SIZE:
+                    # Shielded: a cancelled job must not lose a batch half-way
+                    await asyncio.shield(flush())
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.workers, len(user_ids)))))
+        finally:
+            # Also runs on stop(): results of sent messages are kept for resume
+            if buffer:
+                flush()
+            if saves:
+                await asyncio.shield(asyncio.gather(*saves))
+
+    @staticmethod
+    async def _save_results(job_id: int, results: List[Dict[str, Any]]) -> None:
+        """Store delivery results and exclude blocked users (grouped by error)."""
+        await save_broadcast_job_results(job_id, results)
+        blocked: Dict[str, List[int]] = defaultdict(list)
+        for r in results:
+            if r["status"] == "blocked":
+                blocked[r["error_message"] or ""].append(r["user_id"])
+        for reason, user_ids in blocked.items():
+            await mark_users_undeliverable(user_ids, reason)
+
+    # ---------- progress ----------
+
+    @staticmethod
+    def _progress_text(job: Dict[str, Any], counts: Dict[str, int], done: bool = False) -> str:
+        total = job.get("total_count") or 0
+        processed = counts["sent"] + counts["blocked"] + counts["failed"]
+        if done:
+            pct = (counts["sent"] / total * 100) if total else 0
+            return (
+                f"✅ <b>ГОТОВО!</b>\n\n👥 {total}\n✅ {counts['sent']}\n"
+                f"❌ {counts['failed']}\n🚫 {counts['blocked']}\n📊 {pct:.1f}%"
+            )
+        return (
+            f"📤 <b>ОТПРАВКА</b>\n\n👥 {total}\n✅ {counts['sent']}\n"
+            f"❌ {counts['failed']}\n🚫 {counts['blocked']}\n⏳ {processed}/{total}"
+        )
+
+
+# Global broadcast engine instance
+broadcast_engine: BroadcastEngine = None
+
+
+def init_broadcast_engine(bot: Bot):
+    """Initialize broadcast engine."""
+    global broadcast_engine
+    broadcast_engine = BroadcastEngine(bot)
+
+
+async def start_broadcast_engine():
+    """Resume unfinished broadcast jobs."""
+    if broadcast_engine:
+        await broadcast_engine.resume()
+
+
+async def stop_broadcast_engine():
+    """Pause running broadcast jobs."""
+    if broadcast_engine:
+        await broadcast_engine.stop()
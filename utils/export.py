@@ -0,0 +1,168 @@
+"""Streaming export of profits / referral / mentor accruals to CSV or Parquet.
+
+Rows are read in keyset pages (id > last id) and written page by page to a
+temporary file, so memory stays at one page whatever the row count.
+Parquet needs pyarrow (optional).
+"""
+import os
+import csv
+import logging
+import tempfile
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator, Callable, NamedTuple
+
+import config
+from database import get_export_page
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+
+class ExportSpec(NamedTuple):
+    title: str
+    select: str
+    fields: Tuple[Tuple[str, str], ...]   # (column, kind): int | float | str | time
+
+
+_USER = "(user_tag, username)"
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "profits": ExportSpec(
+        "Профиты",
+        f"id, worker_id, worker:worker_id{_USER}, service_name, amount, net_profit, status, created_at, paid_at",
+        (("id", "int"), ("worker_id", "int"), ("worker_user_tag", "str"), ("worker_username", "str"),
+         ("service_name", "str"), ("amount", "float"), ("net_profit", "float"), ("status", "str"),
+         ("created_at", "time"), ("paid_at", "time")),
+    ),
+    "referral_profits": ExportSpec(
+        "Реферальные начисления",
+        f"id, referrer_id, referrer:referrer_id{_USER}, referral_id, profit_id, amount, status, created_at, paid_at",
+        (("id", "int"), ("referrer_id", "int"), ("referrer_user_tag", "str"), ("referrer_username", "str"),
+         ("referral_id", "int"), ("profit_id", "int"), ("amount", "float"), ("status", "str"),
+         ("created_at", "time"), ("paid_at", "time")),
+    ),
+    "mentor_profits": ExportSpec(
+        "Начисления наставникам",
+        f"id, mentor_user_id, mentor:mentor_user_id{_USER}, student_id, profit_id, amount, percent, status, created_at, paid_at",
+        (("id", "int"), ("mentor_user_id", "int"), ("mentor_user_tag", "str"), ("mentor_username", "str"),
+         ("student_id", "int"), ("profit_id", "int"), ("amount", "float"), ("percent", "int"),
+         ("status", "str"), ("created_at", "time"), ("paid_at", "time")),
+    ),
+}
+
+FORMATS = ("csv", "parquet")
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+def flatten(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Embedded users ({"worker": {"user_tag": ...}}) -> worker_user_tag columns."""
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            for sub, sub_value in value.items():
+                flat[f"{key}_{sub}"] = sub_value
+        elif value is not None or key not in flat:
+            flat[key] = value
+    return flat
+
+
+async def iter_pages(table: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     status: Optional[str] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Flattened pages of rows in id order."""
+    spec = EXPORTS[table]
+    after_id = 0
+    while True:
+        rows = await get_export_page(table, spec.select, after_id, config.EXPORT_PAGE_SIZE,
+                                     date_from=date_from, date_to=date_to, status=status)
+        if not rows:
+            return
+        after_id = rows[-1]["id"]
+        yield [flatten(r) for r in rows]
+        if len(rows) < config.EXPORT_PAGE_SIZE:
+            return
+
+
+# ============================================
+# WRITERS
+# ============================================
+
+class CsvSink:
+    def __init__(self, path: str, spec: ExportSpec):
+        # utf-8-sig: Excel opens Cyrillic correctly
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.DictWriter(self._file, fieldnames=[name for name, _ in spec.fields], extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+class ParquetSink:
+    """One row group per page."""
+
+    _TYPES = {"int": "int64", "float": "float64", "str": "string"}
+
+    def __init__(self, path: str, spec: ExportSpec):
+        self._fields = spec.fields
+        self._schema = pa.schema([
+            (name, pa.timestamp("us", tz="UTC") if kind == "time" else pa.type_for_alias(self._TYPES[kind]))
+            for name, kind in spec.fields
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        columns = {}
+        for name, kind in self._fields:
+            values = [r.get(name) for r in rows]
+            if kind == "time":
+                values = [_parse_time(v) for v in values]
+            elif kind == "float":
+                values = [None if v is None else float(v) for v in values]
+            columns[name] = values
+        self._writer.write_table(pa.table(columns, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+async def export_to_file(table: str, fmt: str = "csv", date_from: Optional[str] = None,
+                         date_to: Optional[str] = None, status: Optional[str] = None,
+                         on_progress: Optional[Callable[[int], None]] = None) -> Tuple[str, int]:
+    """Write rows to a temp file. Returns (path, rows). Caller removes the file."""
+    spec = EXPORTS[table]
+    if fmt == "parquet" and not parquet_available():
+        raise RuntimeError("pyarrow is not installed")
+
+    fd, path = tempfile.mkstemp(prefix=f"{table}_", suffix=f".{fmt}")
+    os.close(fd)
+    sink = ParquetSink(path, spec) if fmt == "parquet" else CsvSink(path, spec)
+    count = 0
+    try:
+        async for rows in iter_pages(table, date_from, date_to, status):
+            sink.write(rows)
+            count += len(rows)
+            if on_progress:
+                on_progress(count)
+    except Exception:
+        sink.close()
+        os.remove(path)
+        raise
+    sink.close()
+    return path, count
@@ -0,0 +1,209 @@
+"""Tuned HTTP connection pools for Telegram (aiohttp) and Supabase (httpx)."""
+import logging
+import time
+from typing import Dict, Any, Optional
+
+import httpx
+from aiohttp import ClientSession, TraceConfig
+from aiohttp.http import SERVER_SOFTWARE
+from aiogram import __version__ as aiogram_version
+from aiogram.client.session.aiohttp import AiohttpSession
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Request / connection counters for one client."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.in_flight = 0
+        self.new_connections = 0
+        self.queued = 0               # requests that had to wait for a free connection
+        self.wait_total = 0.0         # seconds spent waiting for a connection
+        self.wait_max = 0.0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    def record_wait(self, seconds: float) -> None:
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, **extra: Any) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "new_connections": self.new_connections,
+            "queued": self.queued,
+            "avg_wait_ms": round(self.wait_total / self.requests * 1000, 3) if self.requests else 0,
+            "max_wait_ms": round(self.wait_max * 1000, 3),
+            "dns_hits": self.dns_hits,
+            "dns_misses": self.dns_misses,
+            **extra,
+        }
+
+
+# ============================================
+# TELEGRAM (aiohttp)
+# ============================================
+
+class TunedAiohttpSession(AiohttpSession):
+    """aiogram session with configurable connector and pool tracing.
+
+    aiohttp has no HTTP/2; throughput comes from keep-alive reuse, the
+    connection limit and the DNS cache.
+    """
+
+    def __init__(
+        self,
+        limit: int = config.BOT_HTTP_POOL_SIZE,
+        limit_per_host: int = config.BOT_HTTP_POOL_PER_HOST,
+        keepalive_timeout: float = config.BOT_HTTP_KEEPALIVE,
+        dns_ttl: int = config.BOT_HTTP_DNS_TTL,
+        **kwargs: Any
+    ):
+        kwargs.setdefault("timeout", config.BOT_HTTP_TIMEOUT)
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update({
+            "limit_per_host": limit_per_host,
+            "keepalive_timeout": keepalive_timeout,
+            "ttl_dns_cache": dns_ttl,
+            "enable_cleanup_closed": True,
+        })
+        self.stats = PoolStats("telegram")
+
+    def _trace_config(self) -> TraceConfig:
+        stats = self.stats
+        trace = TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            stats.requests += 1
+            stats.in_flight += 1
+
+        async def on_request_done(session, ctx, params):
+            stats.in_flight -= 1
+
+        async def on_queued_start(session, ctx, params):
+            stats.queued += 1
+            ctx.queued_at = time.perf_counter()
+
+        async def on_queued_end(session, ctx, params):
+            stats.record_wait(time.perf_counter() - ctx.queued_at)
+
+        async def on_connection_create(session, ctx, params):
+            stats.new_connections += 1
+
+        async def on_dns_hit(session, ctx, params):
+            stats.dns_hits += 1
+
+        async def on_dns_miss(session, ctx, params):
+            stats.dns_misses += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_done)
+        trace.on_request_exception.append(on_request_done)
+        trace.on_connection_queued_start.append(on_queued_start)
+        trace.on_connection_queued_end.append(on_queued_end)
+        trace.on_connection_create_end.append(on_connection_create)
+        trace.on_dns_cache_hit.append(on_dns_hit)
+        trace.on_dns_cache_miss.append(on_dns_miss)
+        return trace
+
+    async def create_session(self) -> ClientSession:
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={"User-Agent": f"{SERVER_SOFTWARE} aiogram/{aiogram_version}"},
+                trace_configs=[self._trace_config()],
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+    def pool_stats(self) -> Dict[str, Any]:
+        connector = self._session.connector if self._session and not self._session.closed else None
+        in_use = len(getattr(connector, "_acquired", ())) if connector else 0
+        limit = self._connector_init["limit"]
+        return self.stats.snapshot(
+            pool_size=limit, in_use=in_use,
+            utilization=round(in_use / limit, 3) if limit else None
+        )
+
+
+def create_bot_session(**kwargs: Any) -> TunedAiohttpSession:
+    """Bot API session configured from config.BOT_HTTP_*."""
+    return TunedAiohttpSession(**kwargs)
+
+
+# ============================================
+# SUPABASE / POSTGREST (httpx)
+# ============================================
+
+db_stats = PoolStats("postgrest")
+
+
+def _on_db_request(request: httpx.Request) -> None:
+    """Time from request start to the first transport event ~ pool wait."""
+    started = time.perf_counter()
+    first_event = []
+
+    def trace(event_name: str, info: Dict[str, Any]) -> None:
+        if not first_event:
+            first_event.append(event_name)
+            wait = time.perf_counter() - started
+            db_stats.record_wait(wait)
+        if event_name == "connection.connect_tcp.complete":
+            db_stats.new_connections += 1
+
+    db_stats.requests += 1
+    request.extensions["trace"] = trace
+
+
+def create_db_http_client(base_url: str, headers: Dict[str, str], timeout: Optional[float] = None,
+                          **overrides: Any) -> httpx.Client:
+    """httpx client for PostgREST configured from config.DB_HTTP_*."""
+    limits = httpx.Limits(
+        max_connections=overrides.pop("max_connections", config.DB_HTTP_POOL_SIZE),
+        max_keepalive_connections=overrides.pop("max_keepalive_connections", config.DB_HTTP_KEEPALIVE_CONNECTIONS),
+        keepalive_expiry=overrides.pop("keepalive_expiry", config.DB_HTTP_KEEPALIVE_EXPIRY),
+    )
+    return httpx.Client(
+        base_url=base_url,
+        headers=headers,
+        timeout=timeout or config.DB_HTTP_TIMEOUT,
+        limits=limits,
+        http2=overrides.pop("http2", config.DB_HTTP2),
+        follow_redirects=True,
+        event_hooks={"request": [_on_db_request]},
+        **overrides
+    )
+
+
+def db_pool_stats(client: Optional[httpx.Client]) -> Dict[str, Any]:
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for c in connections if c.is_idle())
+    return db_stats.snapshot(
+        pool_size=config.DB_HTTP_POOL_SIZE,
+        open=len(connections), idle=idle, in_use=len(connections) - idle,
+        utilization=round((len(connections) - idle) / config.DB_HTTP_POOL_SIZE, 3)
+    )
+
+
+def pool_stats(bot_session: Optional[AiohttpSession] = None) -> Dict[str, Any]:
+    """Stats of both pools (for /health)."""
+    stats: Dict[str, Any] = {}
+    if isinstance(bot_session, TunedAiohttpSession):
+        stats["telegram"] = bot_session.pool_stats()
+    try:
+        from database import get_db
+        stats["postgrest"] = db_pool_stats(get_db().postgrest.session)
+    except Exception as e:
+        stats["postgrest"] = {"error": str(e)}
+    return stats
@@ -0,0 +1,129 @@
+"""Prerendered leaderboard captions for /top, /topm, /topw, /topd."""
+import logging
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+import config
+from database import get_top_workers, subscribe
+
+logger = logging.getLogger(__name__)
+
+# period -> title in caption
+PERIODS: Dict[str, str] = {
+    "all": "ЗА ВСЁ ВРЕМЯ",
+    "month": "ЗА МЕСЯЦ",
+    "week": "ЗА НЕДЕЛЮ",
+    "day": "ЗА ДЕНЬ",
+}
+
+MEDALS = ["🥇", "🥈", "🥉"]
+
+
+def render_top(period: str, workers: List[Dict[str, Any]]) -> str:
+    """Caption for top workers of period."""
+    title = PERIODS[period]
+    if not workers:
+        return f"🏆 Топ {title.lower()}\n\nНет данных."
+
+    text = f"🏆 <b>ТОП-{config.LEADERBOARD_SIZE} {title}</b>\n\n"
+    for i, w in enumerate(workers[:config.LEADERBOARD_SIZE], 1):
+        medal = MEDALS[i-1] if i <= 3 else f"{i}."
+        # Показываем тег вместо имени
+        display_name = w.get('user_tag', '#irl_???')
+        text += f"{medal} <b>{display_name}</b>\n   💰 {w['total_profit']:.2f} RUB • {w['profit_count']} шт\n"
+    return text
+
+
+def next_boundary(now: datetime) -> datetime:
+    """Next UTC midnight - day and month windows in the DB (CURRENT_DATE, DATE_TRUNC) start there."""
+    return datetime(now.year, now.month, now.day) + timedelta(days=1)
+
+
+class Leaderboard:
+    """Keeps leaderboard captions per period ready to send.
+
+    Captions are rebuilt when a profit is created or paid (bursts are
+    coalesced over LEADERBOARD_DEBOUNCE seconds), at UTC midnight (day,
+    month and week windows move) and every LEADERBOARD_REFRESH_INTERVAL
+    seconds as a safety net for the rolling 7-day window.
+    """
+
+    def __init__(self):
+        self._captions: Dict[str, str] = {}
+        self._wakeup = asyncio.Event()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.is_running = False
+        self.refreshes = 0
+
+    async def caption(self, period: str) -> str:
+        """Ready caption for period (built on demand if the service is not running yet)."""
+        text = self._captions.get(period)
+        if text is None:
+            await self.refresh([period])
+            text = self._captions.get(period) or render_top(period, [])
+        return text
+
+    async def refresh(self, periods: Optional[List[str]] = None) -> None:
+        """Rebuild captions from the database."""
+        periods = periods or list(PERIODS)
+        results = await asyncio.gather(
+            *(get_top_workers(p, config.LEADERBOARD_SIZE) for p in periods), return_exceptions=True
+        )
+        for period, workers in zip(periods, results):
+            if isinstance(workers, Exception):
+                logger.error(f"Leaderboard refresh failed ({period}): {workers}")
+                continue
+            self._captions[period] = render_top(period, workers)
+        self.refreshes += 1
+
+    def invalidate(self, **_) -> None:
+        """Schedule a refresh (called on profit events)."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_later())
+
+    async def _refresh_later(self) -> None:
+        await asyncio.sleep(config.LEADERBOARD_DEBOUNCE)
+        await self.refresh()
+
+    async def run(self) -> None:
+        if self.is_running:
+            return
+        self.is_running = True
+        subscribe("profit_created", self.invalidate)
+        subscribe("profits_paid", self.invalidate)
+        logger.info("Leaderboard started")
+
+        while self.is_running:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Leaderboard refresh error: {e}")
+
+            now = datetime.utcnow()
+            timeout = min((next_boundary(now) - now).total_seconds() + 1, config.LEADERBOARD_REFRESH_INTERVAL)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def stop(self) -> None:
+        self.is_running = False
+        self._wakeup.set()
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+
+
+# Global leaderboard instance
+leaderboard = Leaderboard()
+
+
+async def start_leaderboard():
+    """Start leaderboard refresh loop."""
+    await leaderboard.run()
+
+
+def stop_leaderboard():
+    """Stop leaderboard refresh loop."""
+    leaderboard.stop()
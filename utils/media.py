@@ -0,0 +1,140 @@
+"""Brand image registry: local file -> Telegram file_id."""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from contextlib import suppress
+from typing import Dict, List, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.types import FSInputFile, Message
+
+import config
+from database import get_setting, set_setting
+
+logger = logging.getLogger(__name__)
+
+# bot_settings key holding {path: {"hash": ..., "file_id": ...}}
+SETTING_KEY = "media_file_ids"
+
+
+def brand_image_paths() -> List[str]:
+    """All distinct image paths from config.BRAND_IMAGE_*."""
+    return sorted({
+        value for name, value in vars(config).items()
+        if name.startswith("BRAND_IMAGE_") and isinstance(value, str)
+    })
+
+
+class MediaRegistry:
+    """Maps image path + content hash to an uploaded Telegram file_id.
+
+    The mapping is stored in bot_settings, so uploads survive restarts and
+    are shared between instances. A file is uploaded again only when its
+    content hash changes.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, str]] = {}
+        self._hashes: Dict[str, Tuple[float, int, str]] = {}  # path -> (mtime, size, sha256)
+        self._lock = asyncio.Lock()
+
+    # ---------- hashing ----------
+
+    def file_hash(self, path: str) -> Optional[str]:
+        """Content hash of file (recomputed only when mtime/size change)."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        known = self._hashes.get(path)
+        if known and known[0] == stat.st_mtime and known[1] == stat.st_size:
+            return known[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+        self._hashes[path] = (stat.st_mtime, stat.st_size, file_hash)
+        return file_hash
+
+    # ---------- lookup ----------
+
+    def file_id(self, path: str) -> Optional[str]:
+        """Registered file_id if it matches current file content."""
+        entry = self._entries.get(path)
+        if entry and entry.get("hash") == self.file_hash(path):
+            return entry.get("file_id")
+        return None
+
+    def photo(self, path: str) -> Union[str, FSInputFile]:
+        """Photo argument for send_photo: file_id when known, upload otherwise."""
+        return self.file_id(path) or FSInputFile(path)
+
+    async def remember(self, path: str, message: Optional[Message]) -> None:
+        """Store file_id from a message that uploaded `path`."""
+        if not message or not message.photo:
+            return
+        file_hash = self.file_hash(path)
+        if not file_hash:
+            return
+        file_id = message.photo[-1].file_id
+        entry = self._entries.get(path)
+        if entry and entry.get("file_id") == file_id and entry.get("hash") == file_hash:
+            return
+        self._entries[path] = {"hash": file_hash, "file_id": file_id}
+        await self._save()
+
+    # ---------- persistence ----------
+
+    async def load(self) -> None:
+        try:
+            raw = await get_setting(SETTING_KEY)
+            self._entries = json.loads(raw) if raw else {}
+        except Exception as e:
+            logger.warning(f"Media registry load failed: {e}")
+            self._entries = {}
+
+    async def _save(self) -> None:
+        try:
+            await set_setting(SETTING_KEY, json.dumps(self._entries, ensure_ascii=False))
+        except Exception as e:
+            logger.warning(f"Media registry save failed: {e}")
+
+    async def preload(self, bot: Bot, chat_id: int = config.MEDIA_UPLOAD_CHAT_ID) -> None:
+        """Upload brand images that are new or changed since last upload."""
+        async with self._lock:
+            await self.load()
+            changed = False
+
+            for path in brand_image_paths():
+                if not os.path.exists(path):
+                    logger.warning(f"Brand image missing: {path}")
+                    continue
+                if self.file_id(path):
+                    continue
+
+                try:
+                    sent = await bot.send_photo(chat_id, photo=FSInputFile(path), disable_notification=True)
+                    self._entries[path] = {"hash": self.file_hash(path), "file_id": sent.photo[-1].file_id}
+                    changed = True
+                    with suppress(Exception):
+                        await sent.delete()
+                    logger.info(f"Uploaded brand image {path}")
+                except Exception as e:
+                    logger.warning(f"Brand image upload failed ({path}): {e}")
+
+            if changed:
+                await self._save()
+
+
+# Global registry instance
+media_registry = MediaRegistry()
+
+
+async def preload_media(bot: Bot):
+    """Load registry and upload missing brand images."""
+    await media_registry.preload(bot)
@@ -1,26 +1,42 @@
 """Mentor broadcast system."""
 import logging
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set
 
 from aiogram import Bot
-from aiogram.types import FSInputFile
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
+import config
 from database import (
-    get_pending_broadcasts, get_broadcast_recipients, 
-    update_broadcast_recipient_status, update_broadcast_status
+    get_pending_broadcasts, get_pending_recipient_ids, save_broadcast_recipient_statuses,
+    update_broadcast_status, mark_users_undeliverable, subscribe
 )
+from utils.progress import ProgressReporter
+from utils.rate_limiter import RateLimiter, telegram_limiter
 
 logger = logging.getLogger(__name__)
 
 
 class MentorBroadcastManager:
-    """Manager for mentor broadcasts."""
+    """Manager for mentor broadcasts.
     
-    def __init__(self, bot: Bot):
+    Sleeps until `create_mentor_broadcast` signals a new broadcast (with a
+    slow fallback poll), then runs broadcasts of different mentors
+    concurrently. All sends go through the shared rate limiter and recipient
+    statuses are written in bulk.
+    """
+    
+    def __init__(self, bot: Bot, limiter: RateLimiter = telegram_limiter):
         self.bot = bot
+        self.limiter = limiter
         self.is_running = False
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(config.MENTOR_BROADCAST_CONCURRENCY)
+        self._active: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+    
+    def notify(self, **_) -> None:
+        """Wake the manager (called on new broadcast)."""
+        self._wakeup.set()
     
     async def start_processing(self):
         """Start broadcast processing loop."""
@@ -28,100 +44,139 @@ class MentorBroadcastManager:
             return
         
         self.is_running = True
+        subscribe("mentor_broadcast_created", self.notify)
         logger.info("Mentor broadcast manager started")
         
+        # Resume broadcasts interrupted by restart
+        include_sending = True
+        
         while self.is_running:
             try:
-                await self._process_pending_broadcasts()
-                await asyncio.sleep(10)  # Check every 10 seconds
+                await self._process_pending_broadcasts(include_sending)
+                include_sending = False
             except Exception as e:
                 logger.error(f"Error in broadcast processing: {e}")
-                await asyncio.sleep(30)  # Wait longer on error
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=config.MENTOR_BROADCAST_FALLBACK_POLL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
     
-    def stop_processing(self):
-        """Stop broadcast processing."""
+    async def stop_processing(self):
+        """Stop broadcast processing (running broadcasts save progress and resume on next start)."""
         self.is_running = False
+        self._wakeup.set()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         logger.info("Mentor broadcast manager stopped")
     
-    async def _process_pending_broadcasts(self):
-        """Process pending broadcasts."""
-        broadcasts = await get_pending_broadcasts()
+    async def _process_pending_broadcasts(self, include_sending: bool = False):
+        """Start background processing for new broadcasts."""
+        broadcasts = await get_pending_broadcasts(include_sending)
         
         for broadcast in broadcasts:
-            try:
+            if broadcast['id'] in self._active:
+                continue
+            self._active.add(broadcast['id'])
+            task = asyncio.create_task(self._run_broadcast(broadcast))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run_broadcast(self, broadcast: Dict[str, Any]):
+        try:
+            async with self._slots:
                 await self._process_broadcast(broadcast)
-            except Exception as e:
-                logger.error(f"Error processing broadcast {broadcast['id']}: {e}")
-                await update_broadcast_status(broadcast['id'], 'failed')
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing broadcast {broadcast['id']}: {e}")
+            await update_broadcast_status(broadcast['id'], 'failed')
+        finally:
+            self._active.discard(broadcast['id'])
     
     async def _process_broadcast(self, broadcast: Dict[str, Any]):
         """Process single broadcast."""
+        from utils.broadcast_engine import deliver_message
+        
         broadcast_id = broadcast['id']
         message_text = broadcast['message_text']
-        message_type = broadcast['message_type']
-        media_file_id = broadcast.get('media_file_id')
+        media_file_id = broadcast.get('media_file_id') if broadcast['message_type'] == 'photo' else None
+        sent_count = broadcast.get('sent_count') or 0
+        failed_count = 0
+        total = broadcast.get('total_count') or 0
+        progress = ProgressReporter(
+            self.bot, broadcast.get('progress_chat_id'), broadcast.get('progress_message_id'),
+            is_photo=broadcast.get('progress_is_photo') or False
+        )
+        
+        def progress_text(done: bool = False) -> str:
+            title = "✅ <b>РАССЫЛКА ЗАВЕРШЕНА</b>" if done else "📤 <b>РАССЫЛКА ИДЁТ</b>"
+            return (
+                f"{title}\n\n📢 Рассылка #{broadcast_id}\n👥 {total}\n"
+                f"✅ {sent_count}\n❌ {failed_count}\n⏳ {sent_count + failed_count}/{total}"
+            )
         
         logger.info(f"Processing broadcast {broadcast_id}")
         
-        # Update status to sending
-        await update_broadcast_status(broadcast_id, 'sending')
+        if broadcast['status'] != 'sending':
+            await update_broadcast_status(broadcast_id, 'sending')
         
-        # Get recipients
-        recipients = await get_broadcast_recipients(broadcast_id)
-        sent_count = 0
+        queue: asyncio.Queue = asyncio.Queue()
+        for student_id in await get_pending_recipient_ids(broadcast_id):
+            queue.put_nowait(student_id)
         
-        for recipient in recipients:
-            if recipient['status'] != 'pending':
-                continue
-            
-            student_id = recipient['student_id']
-            
-            try:
-                # Send message based on type
-                if message_type == 'photo' and media_file_id:
-                    await self.bot.send_photo(
-                        chat_id=student_id,
-                        photo=media_file_id,
-                        caption=message_text,
-                        parse_mode='HTML'
-                    )
-                else:
-                    await self.bot.send_message(
-                        chat_id=student_id,
-                        text=message_text,
-                        parse_mode='HTML'
-                    )
-                
-                # Mark as sent
-                await update_broadcast_recipient_status(broadcast_id, student_id, 'sent')
-                sent_count += 1
-                
-                # Small delay to avoid rate limits
-                await asyncio.sleep(0.1)
-                
-            except TelegramForbiddenError:
-                # User blocked the bot
-                await update_broadcast_recipient_status(
-                    broadcast_id, student_id, 'failed', 'Пользователь заблокировал бота'
-                )
-                logger.warning(f"User {student_id} blocked the bot")
+        buffer: List[Dict[str, Any]] = []
+        blocked: List[int] = []
+        
+        async def flush():
+            nonlocal buffer, blocked
+            if not buffer and not blocked:
+                return
+            statuses, buffer = buffer, []
+            undeliverable, blocked = blocked, []
+            await save_broadcast_recipient_statuses(broadcast_id, statuses)
+            await mark_users_undeliverable(undeliverable, 'mentor broadcast: blocked')
+            await update_broadcast_status(broadcast_id, 'sending', sent_count)
+        
+        async def worker():
+            nonlocal sent_count, failed_count
+            while True:
+                try:
+                    student_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
                 
-            except TelegramBadRequest as e:
-                # Invalid user or other error
-                await update_broadcast_recipient_status(
-                    broadcast_id, student_id, 'failed', str(e)
+                status, error = await deliver_message(
+                    self.bot, student_id, message_text, photo_id=media_file_id, limiter=self.limiter
                 )
-                logger.warning(f"Failed to send to {student_id}: {e}")
+                if status == 'sent':
+                    sent_count += 1
+                    buffer.append({"student_id": student_id, "status": "sent", "error_message": None})
+                else:
+                    failed_count += 1
+                    if status == 'blocked':
+                        blocked.append(student_id)
+                        error = 'Пользователь заблокировал бота'
+                    buffer.append({"student_id": student_id, "status": "failed", "error_message": error})
+                    logger.warning(f"Failed to send to {student_id}: {error}")
+                progress.update(progress_text())
                 
-            except Exception as e:
-                # Other errors
-                await update_broadcast_recipient_status(
-                    broadcast_id, student_id, 'failed', str(e)
-                )
-                logger.error(f"Unexpected error sending to {student_id}: {e}")
+                if len(buffer) >= config.MENTOR_BROADCAST_FLUSH_SIZE:
+                    await asyncio.shield(flush())
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(config.MENTOR_BROADCAST_WORKERS)))
+        finally:
+            # Also runs on stop: statuses of sent messages survive, resume skips them
+            await asyncio.shield(flush())
         
         # Update final status
         await update_broadcast_status(broadcast_id, 'completed', sent_count)
+        from keyboards.mentor_kb import get_back_to_mentor_panel_keyboard
+        await progress.finish(progress_text(done=True), get_back_to_mentor_panel_keyboard())
         logger.info(f"Broadcast {broadcast_id} completed: {sent_count} sent")
 
 
@@ -141,7 +196,7 @@ async def start_broadcast_manager():
         await broadcast_manager.start_processing()
 
 
-def stop_broadcast_manager():
+async def stop_broadcast_manager():
     """Stop broadcast manager."""
     if broadcast_manager:
-        broadcast_manager.stop_processing()
\ No newline at end of file
+        await broadcast_manager.stop_processing()
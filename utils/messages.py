@@ -1,18 +1,71 @@
 """Optimized message utilities - always show brand image."""
 import asyncio
+import hashlib
 import logging
-from typing import Optional, Union, Dict
+from collections import OrderedDict
+from typing import Optional, Union, Tuple
 from contextlib import suppress
 
 from aiogram.types import Message, CallbackQuery, FSInputFile, InlineKeyboardMarkup, InputMediaPhoto
 from aiogram.exceptions import TelegramBadRequest
 
 from config import BRAND_IMAGE_LOGO
+from utils.media import media_registry
 
 logger = logging.getLogger(__name__)
 
-# Global cache for uploaded file IDs
-_image_cache: Dict[str, str] = {}
+# Messages whose rendered content is remembered (oldest are forgotten first)
+RENDER_CACHE_SIZE = 10000
+
+
+class RenderCache:
+    """Remembers what edit_with_brand/send_with_brand last rendered into each message.
+    
+    Entry per (chat_id, message_id): fingerprint of our HTML text + keyboard and
+    the plain text Telegram showed for it. An edit is skipped only when the
+    fingerprint matches and the callback's message still shows that plain text
+    and keyboard, so edits made elsewhere never cause a wrong skip.
+    """
+    
+    def __init__(self, maxsize: int = RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple[int, int], Tuple[str, Optional[str]]]" = OrderedDict()
+        self.skipped = 0
+    
+    @staticmethod
+    def fingerprint(text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> str:
+        markup = reply_markup.model_dump_json(exclude_none=True) if reply_markup else ""
+        return hashlib.blake2b(f"{text}\x00{markup}".encode(), digest_size=16).hexdigest()
+    
+    def is_shown(self, message: Message, fp: str, reply_markup: Optional[InlineKeyboardMarkup]) -> bool:
+        """True if `message` already displays the render with fingerprint `fp`."""
+        key = (message.chat.id, message.message_id)
+        entry = self._data.get(key)
+        if not entry or entry[0] != fp:
+            return False
+        self._data.move_to_end(key)
+        return entry[1] == (message.caption or message.text) and message.reply_markup == reply_markup
+    
+    def remember(self, message: Optional[Message], fp: str, shown: Optional[Message] = None) -> None:
+        """Record render `fp` for `message`; `shown` is the message as Telegram returned it."""
+        if not isinstance(message, Message):
+            return
+        shown = shown if isinstance(shown, Message) else message
+        key = (message.chat.id, message.message_id)
+        self._data[key] = (fp, shown.caption or shown.text)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def forget(self, message: Message) -> None:
+        self._data.pop((message.chat.id, message.message_id), None)
+
+
+render_cache = RenderCache()
+
+
+def _not_modified(error: TelegramBadRequest) -> bool:
+    return "message is not modified" in str(error)
 
 
 async def send_with_brand(
@@ -33,18 +86,8 @@ async def send_with_brand(
         
         img_path = image_path or BRAND_IMAGE_LOGO
         
-        # Use cached file_id if available (faster)
-        if img_path in _image_cache:
-            return await bot.send_photo(
-                chat_id=chat_id,
-                photo=_image_cache[img_path],
-                caption=text,
-                reply_markup=reply_markup,
-                parse_mode=parse_mode
-            )
-        
-        # First time - upload and cache
-        photo = FSInputFile(img_path)
+        # Registered file_id if available, upload otherwise
+        photo = media_registry.photo(img_path)
         sent = await bot.send_photo(
             chat_id=chat_id,
             photo=photo,
@@ -53,9 +96,10 @@ async def send_with_brand(
             parse_mode=parse_mode
         )
         
-        if sent and sent.photo:
-            _image_cache[img_path] = sent.photo[-1].file_id
+        if isinstance(photo, FSInputFile):
+            await media_registry.remember(img_path, sent)
         
+        render_cache.remember(sent, render_cache.fingerprint(text, reply_markup))
         return sent
         
     except Exception as e:
@@ -75,26 +119,35 @@ async def edit_with_brand(
     parse_mode: str = "HTML",
     image_path: Optional[str] = None
 ) -> bool:
-    """Edit message - keep the same photo, just change caption and keyboard."""
+    """Edit message - keep the same photo, just change caption and keyboard.
+    
+    Skips the API call when the message already shows this text and keyboard.
+    """
+    msg = callback.message
+    fp = render_cache.fingerprint(text, reply_markup)
+    if render_cache.is_shown(msg, fp, reply_markup):
+        render_cache.skipped += 1
+        return True
+    
     try:
-        msg = callback.message
-        
         # If message has photo - edit caption
         if msg.photo:
-            await msg.edit_caption(
+            edited = await msg.edit_caption(
                 caption=text,
                 reply_markup=reply_markup,
                 parse_mode=parse_mode
             )
+            render_cache.remember(msg, fp, edited)
             return True
         
         # If message has text only - edit text
         if msg.text:
-            await msg.edit_text(
+            edited = await msg.edit_text(
                 text=text,
                 reply_markup=reply_markup,
                 parse_mode=parse_mode
             )
+            render_cache.remember(msg, fp, edited)
             return True
         
         # Fallback - delete and send new (shouldn't happen normally)
@@ -105,8 +158,14 @@ async def edit_with_brand(
         return True
         
     except TelegramBadRequest as e:
-        # If edit fails (e.g., message is too old or content is the same)
+        # Content is already the same - nothing to do
+        if _not_modified(e):
+            render_cache.remember(msg, fp)
+            return True
+        
+        # Edit failed (e.g., message is too old or deleted)
         logger.warning(f"edit_with_brand TelegramBadRequest: {e}")
+        render_cache.forget(msg)
         
         # Try to delete and send new as fallback
         try:
@@ -145,10 +204,5 @@ async def answer_with_brand(
 
 
 def get_cached_file_id(image_path: str) -> Optional[str]:
-    """Get cached file_id."""
-    return _image_cache.get(image_path)
-
-
-def set_cached_file_id(image_path: str, file_id: str) -> None:
-    """Set cached file_id."""
-    _image_cache[image_path] = file_id
+    """Get registered file_id."""
+    return media_registry.file_id(image_path)
@@ -0,0 +1,177 @@
+"""Notification outbox dispatcher."""
+import logging
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+import config
+from database import (
+    claim_outbox_batch, complete_outbox_items, fail_outbox_item, mark_users_undeliverable, subscribe
+)
+from utils.broadcast_engine import is_undeliverable
+from utils.rate_limiter import RateLimiter, telegram_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDispatcher:
+    """Sends messages queued in notification_outbox.
+
+    Wakes up when new messages are enqueued (with a slow fallback poll),
+    claims due messages in batches and sends them concurrently through the
+    shared rate limiter. Transient errors are retried with exponential
+    backoff; blocked chats and bad requests fail at once.
+    """
+
+    def __init__(self, bot: Bot, workers: int = config.OUTBOX_WORKERS,
+                 limiter: RateLimiter = telegram_limiter):
+        self.bot = bot
+        self.workers = workers
+        self.limiter = limiter
+        self.is_running = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # kind -> {"sent", "retried", "failed", "latency_total"}
+        self.metrics: Dict[str, Dict[str, float]] = defaultdict(lambda: {"sent": 0, "retried": 0, "failed": 0, "latency_total": 0.0})
+
+    def notify(self, **_) -> None:
+        """Wake the dispatcher (called on enqueue)."""
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Delivery metrics per notification kind."""
+        return {
+            kind: {
+                "sent": int(m["sent"]), "retried": int(m["retried"]), "failed": int(m["failed"]),
+                "avg_latency": round(m["latency_total"] / m["sent"], 2) if m["sent"] else None
+            }
+            for kind, m in self.metrics.items()
+        }
+
+    async def run(self) -> None:
+        if self.is_running:
+            return
+        self.is_running = True
+        self._task = asyncio.current_task()
+        subscribe("outbox_enqueued", self.notify)
+        logger.info("Outbox dispatcher started")
+
+        while self.is_running:
+            self._wakeup.clear()
+            try:
+                batch = await claim_outbox_batch(config.OUTBOX_BATCH_SIZE, config.OUTBOX_LOCK_SECONDS)
+                if batch:
+                    await self._send_batch(batch)
+                    if len(batch) >= config.OUTBOX_BATCH_SIZE:
+                        continue
+            except Exception as e:
+                logger.error(f"Outbox dispatch error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=config.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self) -> None:
+        """Stop after the batch in flight (its sent messages get marked before the session closes)."""
+        self.is_running = False
+        self._wakeup.set()
+        if self._task and not self._task.done():
+            await asyncio.wait({self._task}, timeout=config.SHUTDOWN_DRAIN_TIMEOUT)
+
+    async def _send_batch(self, batch: List[Dict[str, Any]]) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in batch:
+            queue.put_nowait(item)
+
+        async def worker():
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if await self._deliver(item):
+                    # Mark at once: after a crash the lock expires and only unmarked items are resent
+                    try:
+                        await complete_outbox_items([item["id"]])
+                    except Exception as e:
+                        logger.error(f"Outbox #{item['id']} sent but not marked: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(batch)))))
+
+    async def _deliver(self, item: Dict[str, Any]) -> bool:
+        """Send one message. True if sent; otherwise a retry or failure is recorded."""
+        metrics = self.metrics[item["kind"]]
+        await self.limiter.acquire()
+        try:
+            await self.bot.send_message(
+                item["chat_id"], item["text"],
+                parse_mode=item.get("parse_mode") or "HTML",
+                disable_web_page_preview=item.get("disable_preview", True)
+            )
+        except TelegramRetryAfter as e:
+            self.limiter.pause(e.retry_after)
+            await self._retry(item, f"RetryAfter {e.retry_after}s", e.retry_after)
+            return False
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Retrying won't help (bot blocked, chat not found, bad markup)
+            metrics["failed"] += 1
+            logger.warning(f"Outbox #{item['id']} ({item['kind']}) failed: {e}")
+            await fail_outbox_item(item["id"], str(e))
+            if item["chat_id"] > 0 and is_undeliverable(e):
+                await mark_users_undeliverable([item["chat_id"]], str(e))
+            return False
+        except Exception as e:
+            await self._retry(item, str(e))
+            return False
+
+        metrics["sent"] += 1
+        metrics["latency_total"] += self._age(item)
+        return True
+
+    async def _retry(self, item: Dict[str, Any], error: str, delay: Optional[float] = None) -> None:
+        metrics = self.metrics[item["kind"]]
+        attempts = item.get("attempts") or 1
+        if attempts >= config.OUTBOX_MAX_ATTEMPTS:
+            metrics["failed"] += 1
+            logger.error(f"Outbox #{item['id']} ({item['kind']}) gave up after {attempts} attempts: {error}")
+            await fail_outbox_item(item["id"], error)
+            return
+        metrics["retried"] += 1
+        delay = delay or config.OUTBOX_RETRY_BASE * 2 ** (attempts - 1)
+        await fail_outbox_item(item["id"], error, retry_in=delay)
+
+    @staticmethod
+    def _age(item: Dict[str, Any]) -> float:
+        """Seconds since the message was enqueued."""
+        try:
+            created = datetime.fromisoformat(item["created_at"].replace("Z", "+00:00"))
+            return max(0.0, (datetime.now(timezone.utc) - created).total_seconds())
+        except Exception:
+            return 0.0
+
+
+# Global outbox dispatcher instance
+outbox_dispatcher: OutboxDispatcher = None
+
+
+def init_outbox(bot: Bot):
+    """Initialize outbox dispatcher."""
+    global outbox_dispatcher
+    outbox_dispatcher = OutboxDispatcher(bot)
+
+
+async def start_outbox():
+    """Start outbox dispatcher."""
+    if outbox_dispatcher:
+        await outbox_dispatcher.run()
+
+
+async def stop_outbox():
+    """Stop outbox dispatcher (waits for the batch in flight)."""
+    if outbox_dispatcher:
+        await outbox_dispatcher.stop()
@@ -0,0 +1,98 @@
+"""Debounced progress message for long-running operations."""
+import logging
+import asyncio
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup, Message
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """Keeps one status message up to date without flooding Telegram.
+
+    `update()` only stores the latest text; the message is edited at most once
+    per `min_interval` seconds and only when the text changed. `finish()`
+    cancels any pending edit and always writes the final text (sending a new
+    message if the original one is gone).
+    """
+
+    def __init__(self, bot: Bot, chat_id: Optional[int], message_id: Optional[int],
+                 is_photo: bool = False, min_interval: float = config.PROGRESS_MIN_INTERVAL):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.is_photo = is_photo
+        self.min_interval = min_interval
+        self._text: Optional[str] = None       # latest requested
+        self._shown: Optional[str] = None      # currently in the message
+        self._next_edit_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def for_message(cls, bot: Bot, message: Message, **kwargs) -> "ProgressReporter":
+        """Reporter that edits `message` (e.g. callback.message)."""
+        return cls(bot, message.chat.id, message.message_id, is_photo=bool(message.photo), **kwargs)
+
+    def update(self, text: str) -> None:
+        """Request new progress text (cheap; the edit happens later)."""
+        if not self.chat_id or not self.message_id:
+            return
+        self._text = text
+        if text != self._shown and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        while self._text != self._shown:
+            delay = self._next_edit_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._edit(self._text)
+
+    async def finish(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+        """Write final text immediately."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._text = text
+        if not self.chat_id or not self.message_id:
+            return
+        if not await self._edit(text, reply_markup, final=True):
+            # Message is gone or cannot be edited - report in a new one
+            try:
+                await self.bot.send_message(self.chat_id, text, reply_markup=reply_markup)
+            except Exception as e:
+                logger.debug(f"Progress final send failed: {e}")
+
+    async def _edit(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                    final: bool = False) -> bool:
+        self._next_edit_at = time.monotonic() + self.min_interval
+        try:
+            if self.is_photo:
+                await self.bot.edit_message_caption(chat_id=self.chat_id, message_id=self.message_id,
+                                                    caption=text, reply_markup=reply_markup)
+            else:
+                await self.bot.edit_message_text(text=text, chat_id=self.chat_id, message_id=self.message_id,
+                                                 reply_markup=reply_markup)
+        except TelegramRetryAfter as e:
+            self._next_edit_at = time.monotonic() + e.retry_after
+            if final:
+                await asyncio.sleep(e.retry_after)
+                return await self._edit(text, reply_markup, final=True)
+            return True
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                logger.debug(f"Progress edit failed: {e}")
+                # Stop retrying intermediate updates for this text
+                self._shown = text
+                return False
+        except Exception as e:
+            logger.debug(f"Progress edit failed: {e}")
+            self._shown = text
+            return False
+        self._shown = text
+        return True
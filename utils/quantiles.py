@@ -0,0 +1,120 @@
+"""Profit distribution sketches: percentiles and histograms from log buckets.
+
+A sketch is a histogram over logarithmic buckets (DDSketch): bucket i holds
+values in (GAMMA^(i-1), GAMMA^i], so any percentile is known to within
+ALPHA relative error whatever the number of profits. Sketches are kept
+up to date by triggers in the database (profit_sketches.sql); the bucket
+formula here must match profit_sketch_bucket() there.
+"""
+import math
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+ALPHA = 0.01                          # relative error of percentiles
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+_LOG_GAMMA = math.log(GAMMA)
+ZERO_BUCKET = "z"                     # profits <= 0
+
+# Ranges for profit histograms (RUB): (upper bound, label)
+PROFIT_RANGES: Tuple[Tuple[float, str], ...] = (
+    (1000, "до 1K"),
+    (5000, "1-5K"),
+    (10000, "5-10K"),
+    (50000, "10-50K"),
+    (float("inf"), "50K+"),
+)
+
+
+def bucket_of(value: float) -> Optional[int]:
+    """Bucket index of value (None for value <= 0)."""
+    if value <= 0:
+        return None
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+
+def bucket_value(index: int) -> float:
+    """Representative value of bucket (relative error <= ALPHA for all values in it)."""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class QuantileSketch:
+    """Mergeable log-bucket histogram of profit amounts."""
+
+    __slots__ = ("buckets", "zero_count")
+
+    def __init__(self, buckets: Optional[Dict[int, int]] = None, zero_count: int = 0):
+        self.buckets: Dict[int, int] = dict(buckets or {})
+        self.zero_count = zero_count
+
+    @classmethod
+    def from_row(cls, row: Optional[Dict[str, Any]]) -> "QuantileSketch":
+        """From a profit_sketches row ({"buckets": {"123": 4, "z": 1}, ...})."""
+        sketch = cls()
+        for key, count in ((row or {}).get("buckets") or {}).items():
+            if key == ZERO_BUCKET:
+                sketch.zero_count += int(count)
+            else:
+                sketch.buckets[int(key)] = int(count)
+        return sketch
+
+    def to_buckets(self) -> Dict[str, int]:
+        """Same JSON shape as profit_sketches.buckets."""
+        data = {str(i): c for i, c in self.buckets.items() if c > 0}
+        if self.zero_count:
+            data[ZERO_BUCKET] = self.zero_count
+        return data
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.buckets.values())
+
+    def add(self, value: float, count: int = 1) -> None:
+        index = bucket_of(value)
+        if index is None:
+            self.zero_count += count
+        else:
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile q (0..1), 0 for an empty sketch."""
+        total = self.count
+        if not total:
+            return 0.0
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return bucket_value(index)
+        return bucket_value(max(self.buckets))
+
+    def quantiles(self, *qs: float) -> List[float]:
+        return [self.quantile(q) for q in qs]
+
+    def histogram(self, ranges: Sequence[Tuple[float, str]] = PROFIT_RANGES) -> List[Tuple[str, int]]:
+        """Profit counts per range: [(label, count)]."""
+        counts = [0] * len(ranges)
+        counts[0] += self.zero_count
+        bounds = [upper for upper, _ in ranges]
+        for index, count in self.buckets.items():
+            value = bucket_value(index)
+            slot = next(i for i, upper in enumerate(bounds) if value < upper)
+            counts[slot] += count
+        return [(label, n) for (_, label), n in zip(ranges, counts)]
+
+
+def format_histogram(histogram: List[Tuple[str, int]], width: int = 10) -> str:
+    """Text bars for a histogram, one line per range."""
+    top = max((n for _, n in histogram), default=0)
+    lines = []
+    for label, n in histogram:
+        bar = "▇" * (round(n / top * width) if top else 0)
+        lines.append(f"<code>{label:>6}</code> {bar} {n}")
+    return "\n".join(lines)
@@ -1,50 +1,72 @@
 """Rank system utilities."""
-from typing import Dict, Tuple, Optional
+from bisect import bisect_right
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import config
+
+
+class Rank(NamedTuple):
+    name: str
+    emoji: str
+    color: str
+    level: int
+    min_profit: float
+    max_profit: float   # inclusive for whole rubles, inf for the last rank
+    bonus: int
+
+
+def _build_ranks() -> Tuple[Rank, ...]:
+    rows = sorted(config.RANKS, key=lambda r: r[3])
+    ranks = []
+    for level, (name, emoji, color, min_profit, bonus) in enumerate(rows, start=1):
+        max_profit = rows[level][3] - 1 if level < len(rows) else float('inf')
+        ranks.append(Rank(name, emoji, color, level, min_profit, max_profit, bonus))
+    return tuple(ranks)
+
+
+# Rank table is immutable and built once; lookups bisect over the thresholds
+RANKS: Tuple[Rank, ...] = _build_ranks()
+_THRESHOLDS: Tuple[float, ...] = tuple(r.min_profit for r in RANKS)
+
+
+def rank_for(total_profit: float) -> Rank:
+    """Rank for total profit, O(log n)."""
+    return RANKS[max(0, bisect_right(_THRESHOLDS, total_profit) - 1)]
 
 
 def get_rank_info(total_profit: float) -> Dict[str, any]:
     """
     Get rank information based on total profit.
     
-    Ranks (updated - higher thresholds, lower bonuses):
+    Ranks (config.RANKS):
     - Новичок: 0-99,999 (0%)
     - Воркер: 100,000-249,999 (+1%)
     - Профи: 250,000-499,999 (+2%)
     - Эксперт: 500,000-999,999 (+3%)
     - Легенда: 1,000,000+ (+5%)
     """
-    ranks = [
-        {"name": "Новичок", "emoji": "🌱", "min": 0, "max": 99999, "bonus": 0, "color": "🟢", "level": 1},
-        {"name": "Воркер", "emoji": "⚡", "min": 100000, "max": 249999, "bonus": 1, "color": "🔵", "level": 2},
-        {"name": "Профи", "emoji": "💎", "min": 250000, "max": 499999, "bonus": 2, "color": "🟣", "level": 3},
-        {"name": "Эксперт", "emoji": "👑", "min": 500000, "max": 999999, "bonus": 3, "color": "🟡", "level": 4},
-        {"name": "Легенда", "emoji": "🔥", "min": 1000000, "max": float('inf'), "bonus": 5, "color": "🔴", "level": 5}
-    ]
+    rank = rank_for(total_profit)
     
-    for rank in ranks:
-        if rank["min"] <= total_profit <= rank["max"]:
-            # Calculate progress to next rank
-            if rank["max"] != float('inf'):
-                progress = ((total_profit - rank["min"]) / (rank["max"] - rank["min"] + 1)) * 100
-                next_rank_needed = rank["max"] + 1 - total_profit
-            else:
-                progress = 100
-                next_rank_needed = 0
-            
-            return {
-                "name": rank["name"],
-                "emoji": rank["emoji"],
-                "bonus": rank["bonus"],
-                "color": rank["color"],
-                "level": rank["level"],
-                "progress": progress,
-                "next_rank_needed": next_rank_needed,
-                "current_profit": total_profit,
-                "min_profit": rank["min"],
-                "max_profit": rank["max"]
-            }
+    # Calculate progress to next rank
+    if rank.max_profit != float('inf'):
+        progress = ((total_profit - rank.min_profit) / (rank.max_profit - rank.min_profit + 1)) * 100
+        next_rank_needed = rank.max_profit + 1 - total_profit
+    else:
+        progress = 100
+        next_rank_needed = 0
     
-    return ranks[0]  # Default to Новичок
+    return {
+        "name": rank.name,
+        "emoji": rank.emoji,
+        "bonus": rank.bonus,
+        "color": rank.color,
+        "level": rank.level,
+        "progress": progress,
+        "next_rank_needed": next_rank_needed,
+        "current_profit": total_profit,
+        "min_profit": rank.min_profit,
+        "max_profit": rank.max_profit
+    }
 
 
 def get_rank_badge(total_profit: float) -> str:
@@ -65,11 +87,8 @@ def check_rank_up(old_profit: float, new_profit: float) -> Optional[Dict[str, an
     Check if user ranked up.
     Returns new rank info if ranked up, None otherwise.
     """
-    old_rank = get_rank_info(old_profit)
-    new_rank = get_rank_info(new_profit)
-    
-    if new_rank["level"] > old_rank["level"]:
-        return new_rank
+    if rank_for(new_profit).level > rank_for(old_profit).level:
+        return get_rank_info(new_profit)
     
     return None
 
@@ -125,9 +144,6 @@ def get_rank_reward_message(rank_info: Dict[str, any]) -> str:
 def get_all_ranks() -> list:
     """Get list of all ranks."""
     return [
-        {"name": "Новичок", "emoji": "🌱", "min": 0, "max": 99999, "bonus": 0, "level": 1},
-        {"name": "Воркер", "emoji": "⚡", "min": 100000, "max": 249999, "bonus": 1, "level": 2},
-        {"name": "Профи", "emoji": "💎", "min": 250000, "max": 499999, "bonus": 2, "level": 3},
-        {"name": "Эксперт", "emoji": "👑", "min": 500000, "max": 999999, "bonus": 3, "level": 4},
-        {"name": "Легенда", "emoji": "🔥", "min": 1000000, "max": float('inf'), "bonus": 5, "level": 5}
+        {"name": r.name, "emoji": r.emoji, "min": r.min_profit, "max": r.max_profit, "bonus": r.bonus, "level": r.level}
+        for r in RANKS
     ]
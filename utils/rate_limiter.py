@@ -0,0 +1,48 @@
+"""Shared send rate limiter for bulk messaging."""
+import asyncio
+import time
+from typing import Optional
+
+import config
+
+
+class RateLimiter:
+    """Token bucket shared by all bulk senders.
+
+    `pause()` freezes the whole bucket, so a RetryAfter seen by one sender
+    backs off every sender instead of each one hitting the limit again.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait for a send slot."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out slots for `seconds` (Telegram RetryAfter)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+
+# Global limiter for broadcasts and other bulk sends
+telegram_limiter = RateLimiter(config.BROADCAST_RATE_LIMIT)
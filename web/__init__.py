@@ -0,0 +1,4 @@
+"""HTTP server: webhook and health endpoint."""
+from web.server import create_app, start_server, run_webhook, drain
+
+__all__ = ["create_app", "start_server", "run_webhook", "drain"]
@@ -0,0 +1,241 @@
+"""JSON API for the Telegram mini apps (/api/*).
+
+Requests are authenticated with Telegram WebApp initData (header
+`Authorization: tma <initData>`), so the pages no longer need Supabase
+keys. Responses are small precomputed aggregates from the data layer
+(and its caches), with ETag revalidation and gzip.
+"""
+import gzip
+import hmac
+import json
+import hashlib
+import logging
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional
+from urllib.parse import parse_qsl
+
+from aiohttp import web
+
+import config
+from database import (
+    cache, get_user, get_user_stats, get_user_position, get_dashboard_summary, get_top_workers,
+    get_user_profits_page, get_user_profit_statuses, get_daily_profit_series, get_referral_roster, get_referral_tree, get_services, get_resources,
+    get_profit_sketch
+)
+from utils.quantiles import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+SERIES_DAYS = 366  # Календарь и серии в аналитике (год по дням)
+
+
+# ============================================
+# AUTH (Telegram WebApp initData)
+# ============================================
+
+def check_init_data(init_data: str, bot_token: str = config.BOT_TOKEN,
+                    max_age: int = config.API_INIT_DATA_MAX_AGE) -> Optional[Dict[str, Any]]:
+    """Telegram user from signed initData, None if the signature is wrong or it is too old."""
+    try:
+        fields = dict(parse_qsl(init_data, strict_parsing=True))
+    except ValueError:
+        return None
+    received = fields.pop("hash", None)
+    if not received:
+        return None
+
+    check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    expected = hmac.new(secret, check_string.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, received):
+        return None
+
+    if max_age and time.time() - int(fields.get("auth_date", 0)) > max_age:
+        return None
+    try:
+        return json.loads(fields["user"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _cors_headers(request: web.Request) -> Dict[str, str]:
+    origin = request.headers.get("Origin")
+    if not origin or origin not in config.API_CORS_ORIGINS:
+        return {}
+    return {
+        "Access-Control-Allow-Origin": origin,
+        "Access-Control-Allow-Headers": "Authorization, If-None-Match",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Expose-Headers": "ETag",
+        "Access-Control-Max-Age": "86400",
+    }
+
+
+@web.middleware
+async def api_middleware(request: web.Request, handler):
+    """CORS, preflight, initData auth and active-member check for /api/* routes."""
+    if not request.path.startswith("/api/"):
+        return await handler(request)
+
+    cors = _cors_headers(request)
+    if request.method == "OPTIONS":
+        return web.Response(status=204, headers=cors)
+
+    auth = request.headers.get("Authorization", "")
+    user = check_init_data(auth[4:]) if auth.startswith("tma ") else None
+    if not user or not user.get("id"):
+        return web.json_response({"error": "unauthorized"}, status=401, headers=cors)
+    # Только участники команды (не заявки, не забаненные)
+    member = await get_user(user["id"])
+    if not member or member.get("status") != "active":
+        return web.json_response({"error": "forbidden"}, status=403, headers=cors)
+    request["tg_user"] = user
+
+    try:
+        response = await handler(request)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"API {request.path} failed: {e}")
+        response = web.json_response({"error": "internal"}, status=500)
+    response.headers.update(cors)
+    vary = response.headers.get("Vary")
+    response.headers["Vary"] = f"{vary}, Origin" if vary else "Origin"
+    return response
+
+
+# ============================================
+# RESPONSES (ETag + gzip)
+# ============================================
+
+def json_response(request: web.Request, payload: Any, max_age: int = config.API_MAX_AGE) -> web.Response:
+    """Compact JSON with ETag (304 on match) and gzip for larger bodies."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={max_age}",
+        "Vary": "Authorization, Accept-Encoding",
+    }
+    if etag in request.headers.get("If-None-Match", ""):
+        return web.Response(status=304, headers=headers)
+
+    if len(body) >= config.API_GZIP_MIN_SIZE and "gzip" in request.headers.get("Accept-Encoding", ""):
+        # Same payload for many users (services, team) - compress once
+        key = f"api_gz:{etag}"
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = gzip.compress(body, compresslevel=6)
+            cache.set(key, compressed, config.API_MAX_AGE * 2)
+        body = compressed
+        headers["Content-Encoding"] = "gzip"
+
+    return web.Response(body=body, content_type="application/json", headers=headers)
+
+
+def _int_param(request: web.Request, name: str, default: int, low: int, high: int) -> int:
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        value = default
+    return max(low, min(value, high))
+
+
+def streaks(series: List[Dict[str, Any]], today: Optional[date] = None) -> Dict[str, int]:
+    """Current and best run of consecutive days with profits."""
+    today = today or datetime.utcnow().date()
+    days = {date.fromisoformat(str(r["day"])) for r in series}
+    best = run = 0
+    prev = None
+    for day in sorted(days):
+        run = run + 1 if prev and day - prev == timedelta(days=1) else 1
+        best = max(best, run)
+        prev = day
+    current = 0
+    # Серия не прерывается, пока сегодняшний день не закончился
+    day = today if today in days else today - timedelta(days=1)
+    while day in days:
+        current += 1
+        day -= timedelta(days=1)
+    return {"current": current, "best": best}
+
+
+# ============================================
+# ENDPOINTS
+# ============================================
+
+async def analytics(request: web.Request) -> web.Response:
+    """Team overview, own stats, daily series and leaderboards."""
+    user_id = request["tg_user"]["id"]
+    summary, user, stats, position, sketch, my_series, team_week, *tops = await asyncio.gather(
+        get_dashboard_summary(5), get_user(user_id), get_user_stats(user_id), get_user_position(user_id),
+        get_profit_sketch("worker", user_id),
+        get_daily_profit_series(user_id, SERIES_DAYS), get_daily_profit_series(None, 7),
+        *(get_top_workers(p, config.LEADERBOARD_SIZE) for p in ("all", "month", "week", "day"))
+    )
+    return json_response(request, {
+        "team": {"active_users": summary["active_users"], "periods": summary["periods"]},
+        "me": {
+            "full_name": (user or {}).get("full_name"),
+            "user_tag": (user or {}).get("user_tag"),
+            "stats": stats,
+            "position": position,
+            "streak": streaks(my_series),
+            "percentiles": dict(zip(("p50", "p90"), QuantileSketch.from_row(sketch).quantiles(0.5, 0.9))),
+        },
+        "series": {"me": my_series, "team_week": team_week},
+        "top": {
+            period: [{"user_tag": w.get("user_tag"), "total_profit": float(w["total_profit"]),
+                      "profit_count": w["profit_count"], "is_me": w.get("user_id") == user_id}
+                     for w in workers]
+            for period, workers in zip(("all", "month", "week", "day"), tops)
+        },
+    })
+
+
+async def profits(request: web.Request) -> web.Response:
+    """Own profit history, one page at a time, with totals."""
+    user_id = request["tg_user"]["id"]
+    page = _int_param(request, "page", 0, 0, 10_000)
+    per_page = _int_param(request, "per_page", config.API_PAGE_SIZE, 1, 100)
+    (rows, total), stats, statuses = await asyncio.gather(
+        get_user_profits_page(user_id, page, per_page), get_user_stats(user_id), get_user_profit_statuses(user_id)
+    )
+    return json_response(request, {
+        "items": rows, "total": total, "page": page, "per_page": per_page,
+        "has_more": (page + 1) * per_page < total,
+        "stats": {**stats, "statuses": statuses},
+    })
+
+
+async def referrals(request: web.Request) -> web.Response:
+    """Own referrals with earnings from each, and the whole team by level."""
+    user_id = request["tg_user"]["id"]
+    user, roster, tree = await asyncio.gather(get_user(user_id), get_referral_roster(user_id), get_referral_tree(user_id))
+    return json_response(request, {
+        "referrals": roster,
+        "stats": {
+            "count": len(roster),
+            "active": sum(1 for r in roster if r.get("status") == "active"),
+            "earnings": float((user or {}).get("referral_earnings") or 0),
+            "profits_count": sum(r.get("profits_count") or 0 for r in roster),
+        },
+        "team": tree,
+    })
+
+
+async def services(request: web.Request) -> web.Response:
+    """Active services and resources."""
+    service_list, resource_list = await asyncio.gather(get_services(), get_resources())
+    return json_response(request, {"services": service_list, "resources": resource_list}, max_age=300)
+
+
+def setup_api(app: web.Application) -> None:
+    """Register /api/* routes and their middleware."""
+    app.middlewares.append(api_middleware)
+    app.router.add_get("/api/analytics", analytics)
+    app.router.add_get("/api/profits", profits)
+    app.router.add_get("/api/referrals", referrals)
+    app.router.add_get("/api/services", services)
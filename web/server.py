@@ -0,0 +1,150 @@
+"""HTTP server: Telegram webhook and health endpoint."""
+import asyncio
+import hashlib
+import logging
+import signal
+import time
+from contextlib import suppress
+from typing import Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+import config
+from middlewares.inflight import inflight
+from middlewares.dedup import update_dedup
+from utils.messages import render_cache
+
+logger = logging.getLogger(__name__)
+
+_started_at = time.time()
+_draining = False
+
+
+def webhook_secret() -> str:
+    """Secret token for X-Telegram-Bot-Api-Secret-Token (stable across replicas)."""
+    if config.WEBHOOK_SECRET:
+        return config.WEBHOOK_SECRET
+    return hashlib.sha256(config.BOT_TOKEN.encode()).hexdigest()[:32]
+
+
+class DrainingRequestHandler(SimpleRequestHandler):
+    """Webhook handler that refuses new updates while draining.
+
+    Telegram retries a 503 later, so updates that arrive during shutdown are
+    delivered again to whichever instance is up.
+    """
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if _draining:
+            return web.Response(status=503, text="Draining")
+        return await super().handle(request)
+
+
+async def health(request: web.Request) -> web.Response:
+    """Liveness / readiness probe. `?deep=1` also pings the database."""
+    body = {
+        "status": "draining" if _draining else "ok",
+        "mode": config.RUN_MODE,
+        "uptime": int(time.time() - _started_at),
+        "in_flight": inflight.active,
+        "processed": inflight.processed,
+        "duplicates": update_dedup.duplicates,
+        "edits_skipped": render_cache.skipped,
+    }
+    
+    from utils.outbox import outbox_dispatcher
+    if outbox_dispatcher:
+        body["outbox"] = outbox_dispatcher.stats()
+    
+    from utils.analytics_store import profits_store
+    if profits_store is not None:
+        body["analytics"] = profits_store.stats()
+    
+    from utils.http_pools import pool_stats
+    body["pools"] = pool_stats(request.app.get("bot_session"))
+
+    if request.query.get("deep"):
+        try:
+            from database import get_db
+            get_db().table("bot_settings").select("key").limit(1).execute()
+            body["db"] = "ok"
+        except Exception as e:
+            body["db"] = f"error: {e}"
+            body["status"] = "degraded"
+
+    status = 200 if body["status"] == "ok" else 503
+    return web.json_response(body, status=status)
+
+
+def create_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    """Build aiohttp application (webhook route only in webhook mode)."""
+    app = web.Application()
+    app["bot_session"] = bot.session
+    app.router.add_get("/health", health)
+    
+    if config.API_ENABLED:
+        from web.api import setup_api
+        setup_api(app)
+
+    if config.RUN_MODE == "webhook":
+        handler = DrainingRequestHandler(
+            dispatcher=dp, bot=bot,
+            secret_token=webhook_secret(),
+            handle_in_background=True
+        )
+        handler.register(app, path=config.WEBHOOK_PATH)
+
+    return app
+
+
+async def start_server(app: web.Application) -> web.AppRunner:
+    """Start listening on WEB_SERVER_HOST:WEB_SERVER_PORT."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, config.WEB_SERVER_HOST, config.WEB_SERVER_PORT)
+    await site.start()
+    logger.info(f"🌐 HTTP server on {config.WEB_SERVER_HOST}:{config.WEB_SERVER_PORT}")
+    return runner
+
+
+async def drain(timeout: float = config.SHUTDOWN_DRAIN_TIMEOUT) -> None:
+    """Stop taking updates and wait for the ones in progress."""
+    global _draining
+    _draining = True
+    if inflight.active:
+        logger.info(f"Draining {inflight.active} update(s)...")
+    if not await inflight.wait_idle(timeout):
+        logger.warning(f"Drain timeout, {inflight.active} update(s) still running")
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, runner: Optional[web.AppRunner] = None) -> None:
+    """Run in webhook mode until SIGTERM/SIGINT, then drain."""
+    if not config.WEBHOOK_BASE_URL:
+        raise ValueError("WEBHOOK_BASE_URL required for webhook mode")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    runner = runner or await start_server(create_app(dp, bot))
+
+    await bot.set_webhook(
+        url=config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH,
+        secret_token=webhook_secret(),
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=config.DROP_PENDING_UPDATES
+    )
+    logger.info("✅ Webhook set")
+
+    await dp.emit_startup(bot=bot)
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Shutting down...")
+        await drain()
+        await dp.emit_shutdown(bot=bot)
+        await runner.cleanup()
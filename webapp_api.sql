@@ -0,0 +1,68 @@
+-- ============================================
+-- WEBAPP API - АГРЕГАТЫ ДЛЯ МИНИ-ПРИЛОЖЕНИЙ
+-- ============================================
+
+-- Мини-приложения больше не читают таблицы напрямую: бот отдаёт готовые
+-- агрегаты через /api/*. Выполнить после profit_daily_rollup.sql.
+
+-- Профит по дням за последние p_days дней (график недели, календарь, серии).
+-- p_worker_id = NULL - вся команда. Дни без профитов не возвращаются.
+CREATE OR REPLACE FUNCTION get_daily_profit_series(p_worker_id BIGINT DEFAULT NULL, p_days INTEGER DEFAULT 42)
+RETURNS TABLE (
+    day DATE,
+    profit_sum DECIMAL(12,2),
+    profit_count BIGINT
+) AS $$
+SELECT r.day, SUM(r.profit_sum)::DECIMAL(12,2), SUM(r.profit_count)::BIGINT
+FROM profit_daily_rollup r
+WHERE r.day > CURRENT_DATE - p_days
+  AND (p_worker_id IS NULL OR r.worker_id = p_worker_id)
+GROUP BY r.day
+ORDER BY r.day;
+$$ LANGUAGE sql STABLE;
+
+-- Профиты воркера по статусам (hold / paid): количество и сумма
+CREATE OR REPLACE FUNCTION get_user_profit_statuses(p_user_id BIGINT)
+RETURNS TABLE (
+    status TEXT,
+    profit_count BIGINT,
+    profit_sum DECIMAL(12,2)
+) AS $$
+SELECT p.status, COUNT(*)::BIGINT, COALESCE(SUM(p.net_profit), 0)::DECIMAL(12,2)
+FROM profits p
+WHERE p.worker_id = p_user_id
+GROUP BY p.status;
+$$ LANGUAGE sql STABLE;
+
+-- Рефералы пользователя с доходом от каждого
+CREATE INDEX IF NOT EXISTS idx_users_referrer_id ON users(referrer_id) WHERE referrer_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_referral_profits_referrer_referral ON referral_profits(referrer_id, referral_id);
+
+CREATE OR REPLACE FUNCTION get_referral_roster(p_referrer_id BIGINT)
+RETURNS TABLE (
+    id BIGINT,
+    username TEXT,
+    full_name TEXT,
+    status TEXT,
+    created_at TIMESTAMPTZ,
+    earnings DECIMAL(12,2),
+    profits_count BIGINT
+) AS $$
+SELECT
+    u.id, u.username, u.full_name, u.status, u.created_at,
+    COALESCE(rp.earnings, 0)::DECIMAL(12,2),
+    COALESCE(rp.cnt, 0)::BIGINT
+FROM users u
+LEFT JOIN (
+    SELECT referral_id, SUM(amount) AS earnings, COUNT(*) AS cnt
+    FROM referral_profits
+    WHERE referrer_id = p_referrer_id
+    GROUP BY referral_id
+) rp ON rp.referral_id = u.id
+WHERE u.referrer_id = p_referrer_id
+ORDER BY u.created_at DESC;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION get_daily_profit_series IS 'Профит по дням (воркер или команда) из profit_daily_rollup';
+COMMENT ON FUNCTION get_user_profit_statuses IS 'Количество и сумма профитов воркера по статусам';
+COMMENT ON FUNCTION get_referral_roster IS 'Рефералы пользователя с доходом от каждого';